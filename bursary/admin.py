@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, StudentProfile, Application, ApplicationDocument, Payment, AuditLog, Testimony, DevelopmentProject, BoardMember, BursaryCycle, DownloadableDocument
+from .models import User, StudentProfile, Application, ApplicationDocument, Payment, AuditLog, Testimony, DevelopmentProject, BoardMember, BursaryCycle, DownloadableDocument, ScreeningPolicy, RescoreRequest, IdentityFingerprint, AllocationRun, BackgroundJob, ReconciliationRun, NotificationOutbox, NotificationRun
 
 class CustomUserAdmin(UserAdmin):
     model = User
@@ -23,3 +23,11 @@ admin.site.register(DevelopmentProject)
 admin.site.register(BoardMember)
 admin.site.register(BursaryCycle)
 admin.site.register(DownloadableDocument)
+admin.site.register(ScreeningPolicy)
+admin.site.register(RescoreRequest)
+admin.site.register(IdentityFingerprint)
+admin.site.register(AllocationRun)
+admin.site.register(BackgroundJob)
+admin.site.register(ReconciliationRun)
+admin.site.register(NotificationOutbox)
+admin.site.register(NotificationRun)
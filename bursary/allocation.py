@@ -0,0 +1,207 @@
+from array import array
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Application, AllocationRun, AllocationItem, AuditLog
+
+# Columns loaded for every recommended application in the cycle
+ALLOCATION_COLUMNS = ('pk', 'score', 'amount_requested', 'created_at', 'student__student_profile__guardian_income')
+
+def _priority_order(pks, scores, requests, created, incomes, tie_break):
+    """
+    Indices of the candidates in funding order: highest score first, then
+    the tie-break rule, then application id for a stable result.
+    """
+    if tie_break == 'smallest':
+        secondary = requests
+    elif tie_break == 'lowest_income':
+        secondary = incomes
+    else:
+        secondary = created
+    return sorted(range(len(pks)), key=lambda i: (-scores[i], secondary[i], pks[i]))
+
+def compute_allocation(requests, order, budget, strategy='score_order', max_award=None, min_award=0):
+    """
+    Splits ``budget`` (whole KES) across candidates.
+
+    ``requests`` is an array of whole-KES requests and ``order`` the funding
+    priority as indices into it. Returns an array of awards aligned with
+    ``requests``.
+
+    - score_order: candidates are funded in priority order, capped at
+      ``max_award``. When the next award no longer fits, the remainder is
+      given as a partial award if it reaches ``min_award``, and funding stops.
+    - proportional: every capped request is scaled by the same factor so the
+      total fits the budget. Awards that would fall below ``min_award`` are
+      dropped and the factor recomputed; leftover shillings from rounding go
+      one each to the highest-priority candidates.
+    """
+    capped = array('q', (min(r, max_award) if max_award else r for r in requests))
+    awards = array('q', [0]) * len(requests)
+
+    if strategy == 'proportional':
+        included = [i for i in order if capped[i] > 0]
+        while included:
+            total = sum(capped[i] for i in included)
+            if total <= budget:
+                for i in included:
+                    awards[i] = capped[i]
+                return awards
+            kept = [i for i in included if capped[i] * budget // total >= min_award]
+            if len(kept) == len(included):
+                break
+            included = kept
+        if not included:
+            return awards
+        total = sum(capped[i] for i in included)
+        allocated = 0
+        for i in included:
+            awards[i] = capped[i] * budget // total
+            allocated += awards[i]
+        leftover = budget - allocated
+        for i in included:
+            if leftover <= 0:
+                break
+            if awards[i] < capped[i]:
+                awards[i] += 1
+                leftover -= 1
+        return awards
+
+    remaining = budget
+    for i in order:
+        if remaining <= 0:
+            break
+        if capped[i] <= remaining:
+            awards[i] = capped[i]
+            remaining -= capped[i]
+        else:
+            if remaining >= max(min_award, 1):
+                awards[i] = remaining
+            break
+    return awards
+
+# Statuses whose award is spent or on its way out
+COMMITTED_STATUSES = ('disbursing', 'paid')
+
+def committed_amount(cycle):
+    """What ``cycle`` has already paid or is paying (whole KES)."""
+    total = (
+        Application.objects
+        .filter(academic_year=cycle.year, status__in=COMMITTED_STATUSES)
+        .aggregate(total=Sum(Coalesce('amount_awarded', 'amount_requested')))['total']
+    )
+    return int(total or 0)
+
+def propose_allocation(cycle, strategy='score_order', tie_break='earliest', max_award=None, min_award=0, user=None, batch_size=5000):
+    """
+    Computes and stores an AllocationRun for every recommended application
+    in ``cycle``, splitting what is left of the planned budget after the
+    amounts already paid or being paid. Nothing is awarded until the run
+    is approved.
+    """
+    rows = list(
+        Application.objects
+        .filter(academic_year=cycle.year, status='recommended')
+        .values_list(*ALLOCATION_COLUMNS)
+    )
+    pks = array('q', (row[0] for row in rows))
+    scores = array('q', (row[1] for row in rows))
+    requests = array('q', (int(row[2]) for row in rows))
+    created = array('d', (row[3].timestamp() for row in rows))
+    incomes = array('d', (float(row[4] or 0) for row in rows))
+    del rows
+
+    order = _priority_order(pks, scores, requests, created, incomes, tie_break)
+    committed = committed_amount(cycle)
+    budget = max(int(cycle.planned_budget) - committed, 0)
+    awards = compute_allocation(
+        requests,
+        order,
+        budget,
+        strategy=strategy,
+        max_award=int(max_award) if max_award else None,
+        min_award=int(min_award or 0),
+    )
+
+    with transaction.atomic():
+        run = AllocationRun.objects.create(
+            cycle=cycle,
+            strategy=strategy,
+            tie_break=tie_break,
+            max_award=max_award or None,
+            min_award=min_award or 0,
+            budget=cycle.planned_budget,
+            committed=committed,
+            total_allocated=sum(awards),
+            funded_count=sum(1 for award in awards if award > 0),
+            candidate_count=len(pks),
+            created_by=user,
+        )
+        AllocationItem.objects.bulk_create(
+            (AllocationItem(run=run, application_id=pks[i], rank=rank, amount=Decimal(awards[i])) for rank, i in enumerate(order, start=1)),
+            batch_size=batch_size,
+        )
+    return run
+
+def approved_allocation_years(years):
+    """The academic years among ``years`` whose cycle has an approved allocation."""
+    return set(
+        AllocationRun.objects
+        .filter(cycle__year__in=set(years), status='approved')
+        .values_list('cycle__year', flat=True)
+    )
+
+def approve_allocation(run, user=None, batch_size=5000):
+    """
+    Copies a proposed run's amounts onto Application.amount_awarded in bulk,
+    discards any other proposals for the same cycle and supersedes the run
+    approved before it. Applications of the cycle left out of the run lose
+    any award from an earlier one unless they are being or have been paid.
+
+    A run whose candidates are no longer all recommended (claimed for
+    payment, paid or re-reviewed since it was proposed) is refused: its
+    split no longer matches what is left of the budget.
+    """
+    if run.status != 'proposed':
+        raise ValueError(f"Allocation #{run.pk} is {run.get_status_display().lower()}, not proposed.")
+
+    now = timezone.now()
+    with transaction.atomic():
+        changed = run.items.exclude(application__status='recommended').count()
+        if changed:
+            raise ValueError(f"Allocation #{run.pk} is out of date: {changed} of its applications changed status since it was proposed. Propose a new allocation.")
+        (
+            Application.objects
+            .filter(academic_year=run.cycle.year, amount_awarded__isnull=False)
+            .exclude(status__in=COMMITTED_STATUSES)
+            .exclude(pk__in=run.items.values('application_id'))
+            .update(amount_awarded=None, updated_at=now)
+        )
+        items = run.items.order_by('pk').values_list('pk', 'application_id', 'amount')
+        last_pk = 0
+        while True:
+            batch = list(items.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            # The status filter is part of each UPDATE, so an application
+            # claimed for payment after the check above keeps its award
+            Application.objects.filter(status='recommended').bulk_update(
+                [Application(pk=application_id, amount_awarded=amount, updated_at=now) for pk, application_id, amount in batch],
+                ['amount_awarded', 'updated_at'],
+                batch_size=batch_size,
+            )
+        run.status = 'approved'
+        run.approved_by = user
+        run.approved_at = now
+        run.save(update_fields=['status', 'approved_by', 'approved_at'])
+        AllocationRun.objects.filter(cycle=run.cycle, status='proposed').exclude(pk=run.pk).update(status='discarded')
+        AllocationRun.objects.filter(cycle=run.cycle, status='approved').exclude(pk=run.pk).update(status='superseded')
+        AuditLog.objects.create(
+            user=user,
+            action=f"Approved budget allocation #{run.pk} for {run.cycle.year}",
+            details=f"{run.funded_count} of {run.candidate_count} applications funded, KES {run.total_allocated} of {run.available} available ({run.committed} of {run.budget} already committed)"
+        )
+    return run
@@ -0,0 +1,162 @@
+"""
+Cache of generated export files.
+
+An export is identified by its format and normalised filters (params_key)
+and is valid for one data fingerprint: the row count, highest pk and latest
+updated_at of the matching applications. Any insert, delete or save of a
+matching application changes the fingerprint, so a stored file is only
+served while it is still exactly what a fresh export would produce.
+Student and profile columns do not move Application.updated_at; changes to
+them expire every artifact instead (see signals).
+"""
+import hashlib
+import json
+import secrets
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.http import FileResponse
+from django.utils import timezone
+from .models import ExportArtifact
+from .utils import EXPORT_COLUMNS, EXPORT_STATUSES, export_columns
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+def _source_fields(prefix):
+    return {
+        lookup[len(prefix):] for header, lookups, formatter in EXPORT_COLUMNS.values()
+        for lookup in lookups
+        if lookup.startswith(prefix) and '__' not in lookup[len(prefix):]
+    }
+
+# User and StudentProfile fields that appear in exports
+EXPORTED_USER_FIELDS = _source_fields('student__')
+EXPORTED_PROFILE_FIELDS = _source_fields('student__student_profile__')
+
+def normalize_params(params):
+    """Canonical form of export filters, so equivalent requests share a key."""
+    params = params or {}
+    normalized = {
+        'academic_year': params.get('academic_year') or None,
+        'statuses': sorted(params.get('statuses') or EXPORT_STATUSES),
+        'columns': export_columns(params.get('columns')),
+    }
+    if params.get('group_by'):
+        normalized['group_by'] = params['group_by']
+    return normalized
+
+def make_params_key(format, params):
+    payload = json.dumps({'format': format, **normalize_params(params)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def data_fingerprint(queryset):
+    """(fingerprint, row count) of the applications in ``queryset``; one aggregate query."""
+    state = queryset.order_by().aggregate(rows=Count('pk'), last_id=Max('pk'), last_update=Max('updated_at'))
+    last_update = state['last_update'].isoformat() if state['last_update'] else ''
+    return f"{state['rows']}:{state['last_id'] or 0}:{last_update}", state['rows']
+
+def delete_artifacts(artifacts):
+    """Deletes artifact rows and their files."""
+    artifacts = list(artifacts)
+    for artifact in artifacts:
+        artifact.file.delete(save=False)
+    ExportArtifact.objects.filter(pk__in=[artifact.pk for artifact in artifacts]).delete()
+    return len(artifacts)
+
+def expire_export_artifacts():
+    """Drops every cached export (used when exported student data changes)."""
+    return delete_artifacts(ExportArtifact.objects.all())
+
+def prune_export_artifacts(max_age=None, max_bytes=None):
+    """
+    Evicts artifacts not used within ``max_age`` seconds, then the least
+    recently used ones until the total size is at most ``max_bytes``.
+    Returns how many were deleted.
+    """
+    max_age = max_age if max_age is not None else getattr(settings, 'EXPORT_ARTIFACT_MAX_AGE', 86400)
+    max_bytes = max_bytes if max_bytes is not None else getattr(settings, 'EXPORT_ARTIFACT_MAX_BYTES', 500 * 1024 * 1024)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    deleted = delete_artifacts(ExportArtifact.objects.filter(last_accessed_at__lt=cutoff))
+
+    total = ExportArtifact.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total > max_bytes:
+        evict = []
+        for artifact in ExportArtifact.objects.order_by('last_accessed_at', 'pk').only('pk', 'file', 'size'):
+            if total <= max_bytes:
+                break
+            evict.append(artifact)
+            total -= artifact.size
+        deleted += delete_artifacts(evict)
+    return deleted
+
+class ExportCache:
+    """
+    Cached exports for one format and set of filters over ``queryset``.
+
+    ``artifact`` is the stored file matching the current data, if any.
+    Otherwise the export is generated as usual and handed to store() or
+    tee() so the next identical request is a file read.
+    """
+    def __init__(self, format, queryset, params):
+        self.format = format
+        self.params = normalize_params(params)
+        self.params_key = make_params_key(format, params)
+        self.fingerprint, self.rows = data_fingerprint(queryset)
+        self.artifact = self.lookup()
+
+    def lookup(self):
+        artifact = ExportArtifact.objects.filter(format=self.format, params_key=self.params_key, fingerprint=self.fingerprint).first()
+        if artifact is None:
+            return None
+        if not artifact.file.storage.exists(artifact.file.name):
+            artifact.delete()
+            return None
+        ExportArtifact.objects.filter(pk=artifact.pk).update(hits=F('hits') + 1, last_accessed_at=timezone.now())
+        return artifact
+
+    def response(self, filename):
+        return FileResponse(self.artifact.file.open('rb'), as_attachment=True, filename=filename, content_type=CONTENT_TYPES[self.format])
+
+    def store(self, handle):
+        """Saves the finished export in ``handle`` (rewound first) as the artifact for this fingerprint."""
+        handle.seek(0)
+        artifact = ExportArtifact(format=self.format, params_key=self.params_key, fingerprint=self.fingerprint, params=self.params, rows=self.rows)
+        # A random name, not params_key, which anyone can derive from the
+        # filters: the file is only reachable through the export views
+        artifact.file.save(f"{secrets.token_hex(16)}.{self.format}", File(handle), save=False)
+        artifact.size = artifact.file.size
+        try:
+            with transaction.atomic():
+                artifact.save()
+        except IntegrityError:
+            # A concurrent request stored the same export first
+            artifact.file.delete(save=False)
+            return None
+        # Files for older data under the same filters can never match again
+        delete_artifacts(
+            ExportArtifact.objects
+            .filter(format=self.format, params_key=self.params_key)
+            .exclude(pk=artifact.pk)
+        )
+        prune_export_artifacts()
+        self.artifact = artifact
+        return artifact
+
+    def tee(self, chunks):
+        """
+        Passes streamed text ``chunks`` through while spooling them to a
+        temporary file, stored once the stream completes. A client that
+        disconnects early leaves nothing behind.
+        """
+        with tempfile.TemporaryFile() as handle:
+            for chunk in chunks:
+                handle.write(chunk.encode('utf-8'))
+                yield chunk
+            self.store(handle)
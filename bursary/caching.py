@@ -0,0 +1,166 @@
+"""
+Cache of the public pages.
+
+Each public view names the groups of data it shows (PUBLIC_PAGE_GROUPS).
+A group has a generation token in the page cache, and page and fragment
+keys include the tokens of their groups. Saving or deleting one of the
+group's models (see signals) replaces the token, so every page built from
+the old data stops matching at once without having to know its keys.
+PUBLIC_PAGE_CACHE_TIMEOUT bounds how long anything not covered by a signal
+can stay stale.
+
+Whole pages are cached for anonymous GET requests only. Signed-in users get
+the same pages rendered around cached fragments ({% cache %} keyed by
+``page_cache_key``).
+
+Anonymous responses also carry an ETag derived from the same tokens and a
+public Cache-Control, so a revalidating browser or proxy gets a 304 without
+the page being looked up or rendered.
+
+All of this needs a cache shared by every worker process: with a
+per-process backend a save in one worker would leave the others serving
+(and validating ETags of) the old pages. Under LocMemCache the mixin
+therefore renders every request and caches nothing.
+"""
+import hashlib
+import uuid
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+# Group -> models whose changes invalidate it
+PUBLIC_PAGE_GROUPS = {
+    'testimonies': ('bursary.Testimony',),
+    'board': ('bursary.BoardMember',),
+    'downloads': ('bursary.DownloadableDocument',),
+    'developments': ('bursary.DevelopmentProject',),
+    # CycleStatistics is written with update() and bulk_create(), which send
+    # no signals, so cycle_stats invalidates this group itself
+    'disbursements': ('bursary.BursaryCycle',),
+}
+
+def page_cache_alias():
+    return getattr(settings, 'PUBLIC_PAGE_CACHE_ALIAS', 'default')
+
+def page_cache():
+    return caches[page_cache_alias()]
+
+def page_cache_is_shared():
+    """False for a per-process page cache, whose invalidation stays local."""
+    return not isinstance(page_cache(), LocMemCache)
+
+def page_cache_timeout():
+    return getattr(settings, 'PUBLIC_PAGE_CACHE_TIMEOUT', 600)
+
+def page_max_age():
+    return getattr(settings, 'PUBLIC_PAGE_MAX_AGE', 60)
+
+def generation_key(group):
+    return f"public_page_generation:{group}"
+
+def page_generation(groups):
+    """Combined generation token of ``groups``; starts missing groups."""
+    cache = page_cache()
+    keys = [generation_key(group) for group in groups]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # add() so concurrent first requests agree on one token
+            cache.add(key, uuid.uuid4().hex, None)
+            tokens[key] = cache.get(key)
+    return ":".join(str(tokens[key]) for key in keys)
+
+def _new_generations(groups):
+    page_cache().set_many({generation_key(group): uuid.uuid4().hex for group in groups}, None)
+
+def invalidate_public_pages(*groups):
+    """
+    Gives ``groups`` new generations; pages cached for the old ones are
+    never read again. Repeated on commit, since a request may have cached
+    the pre-commit data under the first new generation.
+    """
+    _new_generations(groups)
+    transaction.on_commit(lambda: _new_generations(groups))
+
+def document_etag(document):
+    """
+    ETag of a downloadable file from its row alone: a replaced file gets a
+    new storage name, and a re-issued one a new version.
+    """
+    token = f"{document.pk}:{document.file.name}:{document.version}:{document.uploaded_at.isoformat()}"
+    return quote_etag(hashlib.md5(token.encode()).hexdigest())
+
+def document_max_age():
+    return getattr(settings, 'PUBLIC_DOCUMENT_MAX_AGE', 3600)
+
+def groups_for_model(model):
+    label = model._meta.label
+    return [group for group, models in PUBLIC_PAGE_GROUPS.items() if label in models]
+
+class PublicPageCacheMixin:
+    """
+    Serves anonymous GET requests from the page cache, answering matching
+    If-None-Match requests with 304. ``cache_groups`` lists the
+    PUBLIC_PAGE_GROUPS the page is built from.
+    """
+    cache_groups = ()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_cache_key'] = self.generation
+        # A zero timeout makes {% cache %} render the fragment every time
+        context['page_cache_timeout'] = page_cache_timeout() if page_cache_is_shared() else 0
+        context['page_cache_alias'] = page_cache_alias()
+        return context
+
+    def is_page_cacheable(self, request):
+        if not page_cache_is_shared():
+            return False
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return False
+        # Flash messages are rendered into the page and belong to this visitor
+        storage = messages.get_messages(request)
+        pending = len(storage) > 0
+        storage.used = False
+        return not pending
+
+    def dispatch(self, request, *args, **kwargs):
+        self.generation = page_generation(self.cache_groups)
+        if not self.is_page_cacheable(request):
+            response = super().dispatch(request, *args, **kwargs)
+            # Personalised (navigation, messages): never stored by shared caches
+            patch_cache_control(response, private=True)
+            return response
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f"public_page:{type(self).__name__}:{path}:{self.generation}"
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.cached_response(request, key, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_cache_control(response, public=True, max_age=page_max_age())
+        return response
+
+    def cached_response(self, request, key, *args, **kwargs):
+        cache = page_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200:
+                cache.set(key, (response.content, response['Content-Type']), page_cache_timeout())
+        if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
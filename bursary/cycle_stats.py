@@ -0,0 +1,152 @@
+"""
+Maintenance of the CycleStatistics read model.
+
+Single saves and deletes adjust the cycle's counters with F() expressions
+in the same transaction as the change (see signals). Bulk writes skip model
+signals, so bulk operations either apply their own deltas or call
+refresh_cycle_statistics() for the cycles they touched. The
+rebuild_cycle_statistics command recomputes every row from scratch.
+"""
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from .caching import invalidate_public_pages
+from .models import Application, CycleStatistics, Payment
+
+STATUSES = [status for status, label in Application.STATUS_CHOICES]
+
+# Application fields whose values feed the counters
+SOURCE_FIELDS = ('status', 'score', 'amount_requested', 'academic_year', 'admin_comments')
+
+COUNTER_FIELDS = [
+    'total_applications',
+    *[f"{status}_count" for status in STATUSES],
+    'auto_rejected_count',
+    'score_total',
+    *[f"scores_upto_{band}" for band in CycleStatistics.SCORE_BANDS],
+    'amount_requested_total',
+    'payments_count',
+    'disbursed_total',
+]
+
+# Counters shown on the public disbursement page
+PUBLIC_FIELDS = {'paid_count', 'payments_count', 'disbursed_total'}
+
+def score_band_field(score):
+    for band in CycleStatistics.SCORE_BANDS:
+        if score <= band:
+            return f"scores_upto_{band}"
+    return f"scores_upto_{CycleStatistics.SCORE_BANDS[-1]}"
+
+def is_auto_rejected(status, admin_comments):
+    return status == 'rejected' and 'AUTO-REJECTION' in (admin_comments or '').upper()
+
+def contribution(state):
+    """Counter values one application with ``state`` (SOURCE_FIELDS) adds to its cycle."""
+    score = state['score'] or 0
+    return {
+        'total_applications': 1,
+        f"{state['status']}_count": 1,
+        'auto_rejected_count': int(is_auto_rejected(state['status'], state['admin_comments'])),
+        'score_total': score,
+        score_band_field(score): 1,
+        'amount_requested_total': state['amount_requested'] or 0,
+    }
+
+def apply_deltas(academic_year, deltas):
+    """Adds ``deltas`` to the cycle's counters in one UPDATE."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            updated = CycleStatistics.objects.filter(academic_year=academic_year).update(
+                **{field: F(field) + value for field, value in deltas.items()}
+            )
+    except IntegrityError:
+        # A counter would go negative: the row drifted (e.g. through a
+        # queryset update(), which fires no signals), so recount the cycle
+        updated = 0
+    if deltas.keys() & PUBLIC_FIELDS:
+        invalidate_public_pages('disbursements')
+    if not updated:
+        # First change seen for this cycle (or a drifted row): rebuild it
+        # from the data, which already includes the change being recorded
+        refresh_cycle_statistics([academic_year])
+
+def record_application_change(old, new):
+    """
+    Applies the difference between two application states; either may be
+    None (created / deleted).
+    """
+    per_year = defaultdict(lambda: defaultdict(int))
+    if old is not None:
+        for field, value in contribution(old).items():
+            per_year[old['academic_year']][field] -= value
+    if new is not None:
+        for field, value in contribution(new).items():
+            per_year[new['academic_year']][field] += value
+    for academic_year, deltas in per_year.items():
+        apply_deltas(academic_year, deltas)
+
+def application_state(application):
+    return {field: getattr(application, field) for field in SOURCE_FIELDS}
+
+def refresh_cycle_statistics(academic_years=None):
+    """
+    Recomputes the rows for ``academic_years`` (all cycles when None) with
+    one grouped aggregate over applications and one over payments, and
+    upserts them in a single statement. Returns the number of cycles.
+    """
+    applications = Application.objects.order_by()
+    payments = Payment.objects.order_by()
+    if academic_years is not None:
+        academic_years = set(academic_years)
+        applications = applications.filter(academic_year__in=academic_years)
+        payments = payments.filter(application__academic_year__in=academic_years)
+
+    aggregates = {
+        'total_applications': Count('pk'),
+        **{f"{status}_count": Count('pk', filter=Q(status=status)) for status in STATUSES},
+        'auto_rejected_count': Count('pk', filter=Q(status='rejected', admin_comments__icontains='AUTO-REJECTION')),
+        'score_total': Sum('score'),
+        'amount_requested_total': Sum('amount_requested'),
+    }
+    lower = None
+    for band in CycleStatistics.SCORE_BANDS:
+        band_filter = Q() if lower is None else Q(score__gt=lower)
+        if band != CycleStatistics.SCORE_BANDS[-1]:
+            band_filter &= Q(score__lte=band)
+        aggregates[f"scores_upto_{band}"] = Count('pk', filter=band_filter)
+        lower = band
+
+    rows = {}
+    for values in applications.values('academic_year').annotate(**aggregates):
+        rows[values['academic_year']] = CycleStatistics(**{field: value or 0 for field, value in values.items() if field != 'academic_year'}, academic_year=values['academic_year'])
+    for academic_year, count, total in payments.values_list('application__academic_year').annotate(Count('pk'), Sum('amount_awarded')):
+        row = rows.setdefault(academic_year, CycleStatistics(academic_year=academic_year))
+        row.payments_count, row.disbursed_total = count, total or 0
+
+    CycleStatistics.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['academic_year'],
+        update_fields=COUNTER_FIELDS + ['updated_at'],
+    )
+    stale = CycleStatistics.objects.exclude(academic_year__in=rows.keys())
+    if academic_years is not None:
+        stale = stale.filter(academic_year__in=academic_years)
+    stale.delete()
+    invalidate_public_pages('disbursements')
+    return len(rows)
+
+def cycle_statistics(academic_year=None):
+    """
+    Counters for one cycle, or summed over every cycle when
+    ``academic_year`` is None (one row per cycle, so this stays cheap).
+    Returns an unsaved CycleStatistics when there is no data.
+    """
+    if academic_year is not None:
+        return CycleStatistics.objects.filter(academic_year=academic_year).first() or CycleStatistics(academic_year=academic_year)
+    totals = CycleStatistics.objects.aggregate(**{field: Sum(field) for field in COUNTER_FIELDS})
+    return CycleStatistics(academic_year='', **{field: value or 0 for field, value in totals.items()})
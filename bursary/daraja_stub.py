@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Safaricom Daraja API, used by tests and the
+bench_mpesa_client command. Serves the OAuth and B2C endpoints over
+HTTP/1.1 keep-alive and can simulate per-connection setup cost (the TLS
+handshake a real client pays) and per-request latency.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class DarajaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY, Nagle's
+    # algorithm and delayed ACKs would add ~40 ms to every keep-alive reply.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # One handler instance serves every request on a connection
+        self.server.record('connections')
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.startswith('/oauth/v1/generate'):
+            return self.send_json(404, {'errorMessage': 'Not found'})
+        self.server.record('token_requests')
+        token = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.tokens.add(token)
+        self.send_json(200, {'access_token': token, 'expires_in': str(self.server.token_ttl)})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path != '/mpesa/b2c/v3/paymentrequest':
+            return self.send_json(404, {'errorMessage': 'Not found'})
+        token = (self.headers.get('Authorization') or '').removeprefix('Bearer ')
+        with self.server.lock:
+            valid = token in self.server.tokens
+        if not valid:
+            return self.send_json(401, {'errorMessage': 'Invalid Access Token'})
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        payload = json.loads(body)
+        self.server.record('payments')
+        if payload.get('PartyB') in self.server.fail_numbers:
+            return self.send_json(200, {
+                'OriginatorConversationID': payload['OriginatorConversationID'],
+                'ResponseCode': '2001',
+                'ResponseDescription': 'The initiator information is invalid.',
+            })
+        self.send_json(200, {
+            'ConversationID': f"AG_{uuid.uuid4().hex[:20].upper()}",
+            'OriginatorConversationID': payload['OriginatorConversationID'],
+            'ResponseCode': '0',
+            'ResponseDescription': 'Accept the service request successfully.',
+        })
+
+class DarajaStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), connect_delay=0.0, latency=0.0, token_ttl=3599, fail_numbers=()):
+        super().__init__(address, DarajaStubHandler)
+        self.connect_delay = connect_delay
+        self.latency = latency
+        self.token_ttl = token_ttl
+        self.fail_numbers = set(fail_numbers)
+        self.tokens = set()
+        self.counters = {'connections': 0, 'token_requests': 0, 'payments': 0}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def revoke_tokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from .allocation import approved_allocation_years
+from .cycle_stats import apply_deltas
+from .models import Application, AuditLog, Payment
+from .mpesa import disbursement_amount, get_mpesa_client
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` requests per second with bursts of up
+    to ``capacity``. A falsy rate disables limiting.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate or 0)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def claim_applications(application_ids):
+    """
+    Moves the recommended applications among ``application_ids`` to
+    'disbursing' in one conditional UPDATE and returns the ones this call
+    claimed, each with its own disbursement_reference. An application
+    claimed by a concurrent disbursement is not returned, so it is never
+    sent to B2C twice.
+    """
+    token = f"{uuid.uuid4().hex}-"
+    with transaction.atomic():
+        claimed = (
+            Application.objects
+            .filter(pk__in=application_ids, status='recommended')
+            .exclude(pk__in=Payment.objects.values('application_id'))
+            .update(
+                status='disbursing',
+                disbursement_reference=Concat(Value(token), Cast('pk', CharField())),
+                updated_at=timezone.now(),
+            )
+        )
+        if not claimed:
+            return []
+        applications = list(
+            Application.objects
+            .for_finance()
+            .filter(pk__in=application_ids, status='disbursing', disbursement_reference__startswith=token)
+        )
+        # update() skips post_save: move the counters (recommended -> disbursing)
+        for academic_year, count in Counter(application.academic_year for application in applications).items():
+            apply_deltas(academic_year, {'recommended_count': -count, 'disbursing_count': count})
+    return applications
+
+def release_claims(applications):
+    """Returns claimed applications whose payment did not go out to 'recommended'."""
+    with transaction.atomic():
+        released = Counter()
+        for application in applications:
+            released[application.academic_year] += (
+                Application.objects
+                .filter(pk=application.pk, status='disbursing', disbursement_reference=application.disbursement_reference)
+                .update(status='recommended', disbursement_reference='', updated_at=timezone.now())
+            )
+        for academic_year, count in released.items():
+            apply_deltas(academic_year, {'recommended_count': count, 'disbursing_count': -count})
+
+def record_payment(application, amount, reference, user=None):
+    """Settles a claimed application: Payment under ``reference`` (the M-Pesa receipt), then 'paid'."""
+    with transaction.atomic():
+        # Single saves: the post_save signals move the cycle counters
+        # (disbursing -> paid) and queue the student's notification
+        Payment.objects.create(application=application, amount_awarded=amount, payment_reference=reference)
+        application.status = 'paid'
+        application.save(update_fields=['status', 'updated_at'])
+        AuditLog.objects.create(user=user, action=f"Disbursed funds (M-Pesa) for App ID {application.id}", details=f"Ref: {reference}")
+
+def settle_b2c_result(result):
+    """
+    Applies a B2C result callback (see mpesa.parse_b2c_result) to the claim
+    whose disbursement_reference it answers. Success records the payment
+    under the M-Pesa receipt; failure releases the claim for another try.
+    Returns the application, or None when no open claim has that reference
+    (unknown, or settled by an earlier delivery of the same callback).
+    """
+    with transaction.atomic():
+        application = (
+            Application.objects
+            .for_finance()
+            .select_for_update(of=('self',))
+            .filter(status='disbursing', disbursement_reference=result['originator_conversation_id'])
+            .first()
+        )
+        if application is None:
+            return None
+        if result['success']:
+            amount = result['amount']
+            if amount is None:
+                amount = application.amount_awarded if application.amount_awarded is not None else application.amount_requested
+            record_payment(application, amount, result['receipt'])
+        else:
+            release_claims([application])
+            AuditLog.objects.create(
+                action=f"M-Pesa payment failed for App ID {application.id}",
+                details=f"Ref: {application.disbursement_reference}. {result['description']}"
+            )
+    return application
+
+class DisbursementPipeline:
+    """
+    Pays a batch of recommended applications over M-Pesa B2C.
+
+    The batch is claimed (recommended -> disbursing) in one UPDATE before
+    any money goes out, and each claim's disbursement_reference is sent as
+    the B2C OriginatorConversationID. B2C calls run on a bounded thread pool
+    behind a shared token bucket; each result is written as soon as it
+    returns, so a crash loses at most the calls still in flight. A
+    completed payment (the mock client) is recorded at once; a request
+    Daraja accepted stays 'disbursing' until its result callback arrives
+    (settle_b2c_result). Applications that fail validation or that M-Pesa
+    refuses are released to 'recommended'. When the outcome of a call is
+    unknown (timeout, dropped connection) the claim is kept: the money may
+    have gone out, so retries report the application as awaiting
+    reconciliation by its reference instead of sending it again.
+    Worker threads only talk to the M-Pesa client, never to the database.
+    """
+    def __init__(self, client=None, max_workers=None, rate=None):
+        self.client = client or get_mpesa_client()
+        self.max_workers = max_workers or getattr(settings, 'MPESA_B2C_MAX_WORKERS', 8)
+        self.bucket = TokenBucket(rate if rate is not None else getattr(settings, 'MPESA_B2C_RATE_LIMIT', 20))
+
+    def _pay(self, application, amount):
+        """(application, amount, client response or None when the outcome is unknown, error)"""
+        self.bucket.acquire()
+        try:
+            response = self.client.initiate_b2c_payment(
+                application.student.phone, amount, originator_conversation_id=application.disbursement_reference
+            )
+        except Exception as e:
+            logger.error(f"M-PESA B2C failed for App ID {application.id} ({application.disbursement_reference}): {e}")
+            return application, amount, None, str(e)
+        if response.get('status') not in ('Success', 'Accepted'):
+            return application, amount, response, response.get('message') or "M-Pesa payment failed."
+        return application, amount, response, None
+
+    def load(self, application_ids):
+        return claim_applications(application_ids)
+
+    def run(self, application_ids, user=None, progress=None):
+        """
+        Disburses every eligible application in ``application_ids``.
+        ``progress`` is called with (done, total) after each completed call.
+
+        Returns a dict with paid/failed/awaiting/skipped counters and
+        per-application errors.
+        """
+        application_ids = list(application_ids)
+        applications = self.load(application_ids)
+        # Claimed earlier (by a crashed run or one still going) and not settled
+        in_flight = (
+            Application.objects
+            .filter(pk__in=application_ids, status='disbursing')
+            .exclude(pk__in=[application.pk for application in applications])
+            .values_list('pk', 'disbursement_reference')
+        )
+        summary = {'paid': 0, 'failed': 0, 'awaiting': 0, 'skipped': 0, 'errors': {}}
+        for pk, reference in in_flight:
+            summary['awaiting'] += 1
+            summary['errors'][pk] = f"Payment {reference} is already in flight; awaiting reconciliation."
+        summary['skipped'] = len(set(map(str, application_ids))) - len(applications) - summary['awaiting']
+
+        payable, invalid = [], []
+        allocated_years = approved_allocation_years(application.academic_year for application in applications)
+        for application in applications:
+            amount, error = disbursement_amount(application, allocated_years)
+            if error:
+                summary['failed'] += 1
+                summary['errors'][application.id] = error
+                invalid.append(application)
+            else:
+                payable.append((application, amount))
+        release_claims(invalid)
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._pay, application, amount) for application, amount in payable]
+            for future in as_completed(futures):
+                application, amount, response, error = future.result()
+                if response is None:
+                    summary['awaiting'] += 1
+                    summary['errors'][application.id] = f"{error} Payment {application.disbursement_reference} is awaiting reconciliation."
+                elif error:
+                    summary['failed'] += 1
+                    summary['errors'][application.id] = error
+                    release_claims([application])
+                elif response['status'] == 'Accepted':
+                    summary['awaiting'] += 1
+                    AuditLog.objects.create(
+                        user=user,
+                        action=f"Sent M-Pesa payment for App ID {application.id}",
+                        details=f"Ref: {application.disbursement_reference}, conversation {response['conversation_id']}. Awaiting result."
+                    )
+                else:
+                    record_payment(application, amount, response['transaction_id'], user)
+                    summary['paid'] += 1
+                done += 1
+                if progress:
+                    progress(done, len(payable))
+        return summary
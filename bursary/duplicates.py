@@ -0,0 +1,129 @@
+import hashlib
+import re
+from collections import defaultdict, namedtuple
+from django.db import transaction
+from django.db.models import Count
+from .models import IdentityFingerprint
+
+DuplicateCluster = namedtuple('DuplicateCluster', ['kind', 'label', 'application_ids'])
+
+# Columns needed to fingerprint an application (one joined query per batch)
+IDENTITY_COLUMNS = (
+    'pk',
+    'academic_year',
+    'student__phone',
+    'student__student_profile__guardian_id_number',
+    'student__student_profile__guardian_phone',
+    'student__student_profile__admission_number',
+    'student__student_profile__school_name',
+)
+
+def normalize_id_number(value):
+    return re.sub(r'[^0-9A-Za-z]', '', value or '').upper()
+
+def normalize_phone(value):
+    """
+    Reduces Kenyan numbers to their 9-digit subscriber part so that
+    0712..., +254712... and 254 712 ... all collide.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == 12 and digits.startswith('254'):
+        return digits[3:]
+    if len(digits) == 10 and digits.startswith('0'):
+        return digits[1:]
+    return digits
+
+def normalize_admission(admission_number, school_name):
+    admission = re.sub(r'\s+', '', admission_number or '').casefold()
+    if not admission:
+        return ''
+    school = ' '.join((school_name or '').split()).casefold()
+    return f"{school}|{admission}"
+
+def _digest(kind, value):
+    return hashlib.sha1(f"{kind}:{value}".encode()).hexdigest()
+
+def fingerprints_for_row(row):
+    """
+    Yields IdentityFingerprint objects for one IDENTITY_COLUMNS row.
+    Blank identity values are skipped so empty fields never collide.
+    """
+    pk, academic_year, phone, guardian_id, guardian_phone, admission, school = row
+    values = (
+        ('guardian_id', normalize_id_number(guardian_id)),
+        ('guardian_phone', normalize_phone(guardian_phone)),
+        ('student_phone', normalize_phone(phone)),
+        ('admission', normalize_admission(admission, school)),
+    )
+    for kind, value in values:
+        if value:
+            yield IdentityFingerprint(application_id=pk, academic_year=academic_year, kind=kind, digest=_digest(kind, value))
+
+def index_applications(queryset, batch_size=2000):
+    """
+    (Re)builds the identity index for the applications in ``queryset``.
+    Existing fingerprints for each batch are replaced in one transaction.
+    """
+    rows = queryset.order_by('pk').values_list(*IDENTITY_COLUMNS)
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        fingerprints = [fp for row in batch for fp in fingerprints_for_row(row)]
+        with transaction.atomic():
+            IdentityFingerprint.objects.filter(application_id__in=[row[0] for row in batch]).delete()
+            IdentityFingerprint.objects.bulk_create(fingerprints, batch_size=batch_size)
+        indexed += len(batch)
+    return indexed
+
+def find_duplicate_clusters(academic_year):
+    """
+    Returns every identity collision in a cycle (or in each of several
+    cycles: a list or a values() queryset of years) as DuplicateCluster
+    tuples. The collisions are found with a grouped query, so only the
+    fingerprints of clustered applications are read.
+    """
+    years = [academic_year] if isinstance(academic_year, str) else academic_year
+    fingerprints = IdentityFingerprint.objects.filter(academic_year__in=years)
+    collisions = (
+        fingerprints
+        .values('academic_year', 'kind', 'digest')
+        .annotate(n=Count('application', distinct=True))
+        .filter(n__gt=1)
+        .values('digest')
+    )
+    buckets = defaultdict(set)
+    members = fingerprints.filter(digest__in=collisions).values_list('academic_year', 'kind', 'digest', 'application_id')
+    for year, kind, digest, application_id in members:
+        buckets[(year, kind, digest)].add(application_id)
+
+    labels = dict(IdentityFingerprint.KIND_CHOICES)
+    return [
+        DuplicateCluster(kind, labels[kind], sorted(application_ids))
+        for (year, kind, digest), application_ids in sorted(buckets.items())
+        # A digest colliding in one cycle may be alone in another
+        if len(application_ids) > 1
+    ]
+
+def duplicate_matches(application):
+    """
+    Other applications in the same cycle sharing an identity field with
+    ``application``, as a list of (label, [Application, ...]).
+    Digests are salted with their kind, so matching on digest alone is exact.
+    """
+    own_digests = IdentityFingerprint.objects.filter(application=application).values('digest')
+    matches = (
+        IdentityFingerprint.objects
+        .filter(academic_year=application.academic_year, digest__in=own_digests)
+        .exclude(application=application)
+        .select_related('application__student')
+        .order_by('kind', 'application_id')
+    )
+    labels = dict(IdentityFingerprint.KIND_CHOICES)
+    grouped = defaultdict(list)
+    for fingerprint in matches:
+        grouped[fingerprint.kind].append(fingerprint.application)
+    return [(labels[kind], applications) for kind, applications in grouped.items()]
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import User, StudentProfile, Application, ApplicationDocument, Testimony, DevelopmentProject
+from .models import User, StudentProfile, Application, ApplicationDocument, Testimony, DevelopmentProject, AllocationRun, BursaryCycle, ReconciliationRun
 
 class UserRegistrationForm(UserCreationForm):
     ROLE_CHOICES = (
@@ -148,3 +148,89 @@ class DevelopmentProjectForm(forms.ModelForm):
             'estimated_cost': forms.NumberInput(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
         }
+
+def parse_bands(value):
+    """Parses "20000:40, 50000:25" into [[20000, 40], [50000, 25]]."""
+    bands = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            limit, points = part.split(':')
+            bands.append([float(limit), int(points)])
+        except ValueError:
+            raise forms.ValidationError(f'Invalid band "{part}". Use limit:points pairs separated by commas.')
+    return bands
+
+class ScreeningSimulationForm(forms.Form):
+    academic_year = forms.ChoiceField(widget=forms.Select(attrs={'class': 'form-select'}))
+    required_constituency = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Current policy'}))
+    any_constituency = forms.BooleanField(required=False, label="Accept all constituencies", help_text="Simulate removing the constituency restriction", widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+    max_income_threshold = forms.DecimalField(required=False, min_value=0, widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Current policy'}))
+    income_bands = forms.CharField(required=False, help_text="e.g. 20000:40, 50000:25, 80000:10", widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'limit:points, ...'}))
+    household_bands = forms.CharField(required=False, help_text="e.g. 0:5, 4:15, 6:30", widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'min_size:points, ...'}))
+    admission_letter_points = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Current policy'}))
+    continuing_points = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Current policy'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        years = Application.objects.order_by('-academic_year').values_list('academic_year', flat=True).distinct()
+        self.fields['academic_year'].choices = [(year, year) for year in years]
+
+    def clean_income_bands(self):
+        return parse_bands(self.cleaned_data['income_bands'])
+
+    def clean_household_bands(self):
+        return parse_bands(self.cleaned_data['household_bands'])
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('any_constituency') and cleaned_data.get('required_constituency'):
+            self.add_error('any_constituency', "Leave the constituency blank to accept all constituencies.")
+        return cleaned_data
+
+    def overrides(self):
+        """
+        Scenario parameters that differ from the cycle's current policy.
+        Blank fields keep the current value; "Accept all constituencies"
+        overrides the constituency with "".
+        """
+        overrides = {
+            name: value for name, value in self.cleaned_data.items()
+            if name not in ('academic_year', 'any_constituency') and value not in (None, "", [])
+        }
+        if self.cleaned_data.get('any_constituency'):
+            overrides['required_constituency'] = ""
+        return overrides
+
+class AllocationForm(forms.Form):
+    cycle = forms.ModelChoiceField(queryset=BursaryCycle.objects.order_by('-year'), widget=forms.Select(attrs={'class': 'form-select'}))
+    strategy = forms.ChoiceField(choices=AllocationRun.STRATEGY_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    tie_break = forms.ChoiceField(choices=AllocationRun.TIE_BREAK_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    max_award = forms.DecimalField(required=False, min_value=0, widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'No cap'}))
+    min_award = forms.DecimalField(required=False, min_value=0, widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '0'}))
+
+class ReconciliationUploadForm(forms.ModelForm):
+    class Meta:
+        model = ReconciliationRun
+        fields = ['statement', 'period_start', 'period_end']
+        widgets = {
+            'statement': forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv'}),
+            'period_start': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'period_end': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        }
+        labels = {'statement': 'M-Pesa statement (CSV)'}
+
+    def clean_statement(self):
+        statement = self.cleaned_data['statement']
+        if not statement.name.lower().endswith('.csv'):
+            raise forms.ValidationError("Upload the statement as a CSV export.")
+        return statement
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('period_start'), cleaned_data.get('period_end')
+        if start and end and start > end:
+            raise forms.ValidationError("The period start must be before the period end.")
+        return cleaned_data
@@ -0,0 +1,263 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from .artifacts import ExportCache
+from .models import Application, BackgroundJob
+from .reports import report_subtitle, write_cycle_report_pdf
+from .utils import export_applications_queryset, export_filename, stored_export_name, write_applications_csv, write_applications_excel
+
+logger = logging.getLogger(__name__)
+
+# kind -> callable(job, progress) returning a JSON-serialisable result
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """Registers the decorated function as the handler for ``kind`` jobs."""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue_job(kind, params=None, user=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job kind '{kind}'.")
+    return BackgroundJob.objects.create(kind=kind, params=params or {}, created_by=user)
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobProgress:
+    """
+    Progress reporter handed to job handlers.
+
+    Counters are kept in memory and written to the job row at most every
+    ``interval`` seconds (and once at the end), so per-item reporting does not
+    turn into one UPDATE per item. Every write also refreshes the heartbeat
+    used to detect crashed workers (JobHeartbeat covers phases without
+    progress).
+    """
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval if interval is not None else getattr(settings, 'BACKGROUND_JOB_PROGRESS_INTERVAL', 1.0)
+        self.done = job.progress_done
+        self.total = job.progress_total
+        self.flushed_at = 0.0
+
+    def set_total(self, total):
+        self.total = total
+        self.flush(force=True)
+
+    def advance(self, count=1):
+        self.done += count
+        self.flush()
+
+    def update(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < self.interval:
+            return
+        self.flushed_at = now
+        self.job.progress_done = self.done
+        self.job.progress_total = self.total
+        self.job.heartbeat_at = timezone.now()
+        BackgroundJob.objects.filter(pk=self.job.pk, worker=self.job.worker).update(
+            progress_done=self.done,
+            progress_total=self.total,
+            heartbeat_at=self.job.heartbeat_at,
+        )
+
+class JobHeartbeat:
+    """
+    Refreshes a running job's heartbeat from a timer thread, so phases that
+    report no progress (PDF output(), openpyxl save() of a large export) are
+    not taken for a dead worker by requeue_stale_jobs. Stops once the job
+    is no longer this worker's.
+    """
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval if interval is not None else getattr(settings, 'BACKGROUND_JOB_HEARTBEAT_INTERVAL', 60)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"job-{job.pk}-heartbeat", daemon=True)
+
+    def beat(self):
+        """Refreshes the heartbeat; False when another worker owns the job now."""
+        return bool(
+            BackgroundJob.objects
+            .filter(pk=self.job.pk, status='running', worker=self.job.worker)
+            .update(heartbeat_at=timezone.now())
+        )
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                if not self.beat():
+                    break
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+def requeue_stale_jobs(stale_after=None, max_attempts=None):
+    """
+    Puts 'running' jobs whose worker stopped sending heartbeats back on the
+    queue, or fails them once they have used up their attempts.
+    Returns the number of jobs re-queued.
+    """
+    stale_after = stale_after or getattr(settings, 'BACKGROUND_JOB_STALE_AFTER', 300)
+    max_attempts = max_attempts or getattr(settings, 'BACKGROUND_JOB_MAX_ATTEMPTS', 3)
+    now = timezone.now()
+    stale = BackgroundJob.objects.filter(status='running', heartbeat_at__lt=now - timedelta(seconds=stale_after))
+    stale.filter(attempts__gte=max_attempts).update(
+        status='failed',
+        error="Worker stopped responding and the job ran out of attempts.",
+        finished_at=now,
+    )
+    return stale.update(status='queued', worker='')
+
+def claim_next_job(worker=None):
+    """
+    Atomically moves the oldest queued job to 'running' for this worker.
+    The conditional UPDATE makes concurrent workers skip jobs another worker
+    claimed first.
+    """
+    worker = worker or worker_name()
+    while True:
+        pk = BackgroundJob.objects.filter(status='queued').order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=pk, status='queued').update(
+            status='running',
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(pk=pk)
+
+def run_job(job):
+    """
+    Executes a claimed job and stores its result or error. The final write
+    only applies while this worker still owns the job, so a run that was
+    re-queued (and picked up elsewhere) cannot overwrite the newer one.
+    """
+    progress = JobProgress(job)
+    try:
+        with JobHeartbeat(job):
+            result = JOB_HANDLERS[job.kind](job, progress)
+    except Exception as e:
+        logger.exception(f"Background job {job.pk} ({job.kind}) failed")
+        job.status = 'failed'
+        job.error = str(e) or e.__class__.__name__
+    else:
+        progress.flush(force=True)
+        job.status = 'succeeded'
+        job.result = result
+        job.error = ''
+    job.finished_at = timezone.now()
+    owned = BackgroundJob.objects.filter(pk=job.pk, status='running', worker=job.worker).update(
+        status=job.status,
+        result=job.result,
+        result_file=job.result_file.name or None,
+        error=job.error,
+        finished_at=job.finished_at,
+    )
+    if not owned:
+        logger.warning(f"Background job {job.pk} ({job.kind}) was taken over by another worker; discarding this run's result")
+        if job.result_file:
+            job.result_file.delete(save=False)
+    return job
+
+def run_pending_jobs(worker=None, limit=None):
+    """Runs queued jobs until the queue is empty (or ``limit`` jobs ran)."""
+    ran = 0
+    requeue_stale_jobs()
+    while limit is None or ran < limit:
+        job = claim_next_job(worker)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+def export_queryset(params):
+    return export_applications_queryset(params.get('academic_year'), params.get('statuses'))
+
+@job_handler('bulk_disburse')
+def bulk_disburse_job(job, progress):
+    from .disbursement import DisbursementPipeline
+    application_ids = job.params.get('application_ids', [])
+    progress.set_total(len(application_ids))
+    # Applications are claimed before they are paid and every result is
+    # written as it returns, so a re-queued job skips what was paid and
+    # reports claims whose outcome is unknown instead of paying them again.
+    summary = DisbursementPipeline().run(application_ids, user=job.created_by, progress=progress.update)
+    summary['errors'] = {str(pk): error for pk, error in summary['errors'].items()}
+    return summary
+
+@job_handler('export_csv')
+def export_csv_job(job, progress):
+    queryset = export_queryset(job.params)
+    cache = ExportCache('csv', queryset, job.params)
+    progress.set_total(cache.rows)
+    with tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8') as handle:
+        write_applications_csv(queryset, handle, progress=progress.advance, columns=job.params.get('columns'))
+        handle.seek(0)
+        job.result_file.save(stored_export_name(export_filename("bursary_list", "csv")), File(handle), save=False)
+        cache.store(handle)
+    return {'rows': progress.done}
+
+@job_handler('export_excel')
+def export_excel_job(job, progress):
+    queryset = export_queryset(job.params)
+    cache = ExportCache('xlsx', queryset, job.params)
+    progress.set_total(cache.rows)
+    with tempfile.TemporaryFile() as handle:
+        write_applications_excel(queryset, handle, progress=progress.advance, columns=job.params.get('columns'), group_by=job.params.get('group_by'))
+        handle.seek(0)
+        job.result_file.save(stored_export_name(export_filename("bursary_list", "xlsx")), File(handle), save=False)
+        cache.store(handle)
+    return {'rows': progress.done}
+
+@job_handler('pdf_report')
+def pdf_report_job(job, progress):
+    params = {'statuses': [status for status, label in Application.STATUS_CHOICES], **job.params}
+    queryset = export_applications_queryset(params.get('academic_year'), params['statuses'])
+    cache = ExportCache('pdf', queryset, params)
+    progress.set_total(cache.rows)
+    with tempfile.TemporaryFile() as handle:
+        pages = write_cycle_report_pdf(queryset, handle, subtitle=report_subtitle(params.get('academic_year'), params['statuses']), group_by=params.get('group_by'), progress=progress.advance)
+        handle.seek(0)
+        job.result_file.save(stored_export_name(export_filename("alexias_global_tech_report", "pdf")), File(handle), save=False)
+        cache.store(handle)
+    return {'rows': progress.done, 'pages': pages}
+
+@job_handler('reconcile_statement')
+def reconcile_statement_job(job, progress):
+    from .models import ReconciliationRun
+    from .reconciliation import period_payments, reconcile
+    run = ReconciliationRun.objects.get(pk=job.params['run_id'])
+    progress.set_total(period_payments(run.period_start, run.period_end).count())
+    reconcile(run, progress=progress.update)
+    return {'run_id': run.pk, 'matched': run.matched_count, 'issues': run.issue_count}
@@ -0,0 +1,49 @@
+"""Helpers shared by the export benchmark commands (not a command itself)."""
+import os
+import tempfile
+import time
+import tracemalloc
+from bursary.models import Application, StudentProfile, User
+
+BENCH_ACADEMIC_YEAR = '2099/2100'
+
+def seed_applications(start, stop, batch_size=5000):
+    """
+    Adds synthetic students start..stop-1, each with a profile and an
+    application in BENCH_ACADEMIC_YEAR. Callers run this inside a
+    transaction they roll back.
+    """
+    statuses = ['recommended', 'approved', 'paid']
+    for offset in range(start, stop, batch_size):
+        numbers = range(offset, min(offset + batch_size, stop))
+        users = User.objects.bulk_create([
+            User(username=f'bench_{i}', email=f'bench_{i}@example.com', password='!', first_name='Bench', last_name=f'Student {i}', national_id=f'BX{i}')
+            for i in numbers
+        ])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, school_name='Bench University', admission_number=f'BX/{i}', ward=f'Ward {i % 12}')
+            for i, user in zip(numbers, users)
+        ])
+        Application.objects.bulk_create([
+            Application(student=user, academic_year=BENCH_ACADEMIC_YEAR, amount_requested=10000 + i % 40000, status=statuses[i % 3], score=i % 100)
+            for i, user in zip(numbers, users)
+        ])
+
+def measure(write):
+    """
+    Runs ``write(handle)`` twice against temp files and returns
+    (seconds, peak bytes, file bytes, result of write). Wall time comes from
+    an untraced run, since tracemalloc slows many small allocations several
+    times over; the second, traced run records peak memory.
+    """
+    with tempfile.TemporaryFile() as handle:
+        started = time.perf_counter()
+        result = write(handle)
+        elapsed = time.perf_counter() - started
+        size = handle.seek(0, os.SEEK_END)
+    with tempfile.TemporaryFile() as handle:
+        tracemalloc.start()
+        write(handle)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, size, result
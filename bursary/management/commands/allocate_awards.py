@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bursary.allocation import propose_allocation, approve_allocation
+from bursary.models import AllocationRun, BursaryCycle
+
+
+class Command(BaseCommand):
+    help = "Proposes (and optionally approves) a budget-constrained award allocation for a cycle."
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Cycle year, e.g. "2025/2026".')
+        parser.add_argument('--strategy', choices=[choice for choice, label in AllocationRun.STRATEGY_CHOICES], default='score_order')
+        parser.add_argument('--tie-break', choices=[choice for choice, label in AllocationRun.TIE_BREAK_CHOICES], default='earliest')
+        parser.add_argument('--max-award', type=int, help='Per-student cap in KES.')
+        parser.add_argument('--min-award', type=int, default=0, help='Smallest award worth making in KES.')
+        parser.add_argument('--approve', action='store_true', help='Approve the proposal immediately.')
+
+    def handle(self, *args, **options):
+        cycle = BursaryCycle.objects.filter(year=options['academic_year']).order_by('-is_active', '-pk').first()
+        if cycle is None:
+            raise CommandError(f"No bursary cycle for {options['academic_year']}.")
+
+        started = time.perf_counter()
+        run = propose_allocation(
+            cycle,
+            strategy=options['strategy'],
+            tie_break=options['tie_break'],
+            max_award=options['max_award'],
+            min_award=options['min_award'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Allocation #{run.pk}: KES {run.total_allocated} of {run.available} available ({run.committed} committed) to "
+            f"{run.funded_count}/{run.candidate_count} applications in {time.perf_counter() - started:.2f}s."
+        ))
+        if options['approve']:
+            approve_allocation(run)
+            self.stdout.write(self.style.SUCCESS(f"Allocation #{run.pk} approved."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from openpyxl import Workbook
+from bursary.utils import application_rows, export_applications_queryset, export_headers, write_applications_excel
+from ._bench import BENCH_ACADEMIC_YEAR, measure, seed_applications
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the write-only Excel export: peak Python memory (tracemalloc) and wall time "
+        "for each row count. Synthetic applications are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000], help='Row counts to export.')
+        parser.add_argument('--sheets', choices=['status', 'ward'], help='Also split the export into sheets.')
+        parser.add_argument('--baseline', action='store_true', help='Also time a regular (in-memory) openpyxl Workbook for comparison.')
+
+    def write_in_memory(self, queryset, handle):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(export_headers())
+        for row in application_rows(queryset):
+            ws.append(row)
+        wb.save(handle)
+
+    def report(self, engine, rows, result):
+        elapsed, peak, size, _ = result
+        self.stdout.write(
+            f"{engine:<22} {rows:>8} rows  {elapsed:8.2f} s  {rows / elapsed:9.0f} rows/s  "
+            f"peak {peak / 2 ** 20:8.1f} MiB  file {size / 2 ** 20:6.1f} MiB"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seeded = 0
+            for rows in sorted(options['rows']):
+                seed_applications(seeded, rows)
+                seeded = rows
+                queryset = export_applications_queryset(academic_year=BENCH_ACADEMIC_YEAR)
+                self.report("write-only", rows, measure(lambda handle: write_applications_excel(queryset, handle)))
+                if options['sheets']:
+                    self.report(f"write-only by {options['sheets']}", rows, measure(lambda handle: write_applications_excel(queryset, handle, group_by=options['sheets'])))
+                if options['baseline']:
+                    self.report("in-memory Workbook", rows, measure(lambda handle: self.write_in_memory(queryset, handle)))
+            transaction.set_rollback(True)
@@ -0,0 +1,64 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from bursary.daraja_stub import DarajaStubServer
+from bursary.mpesa import DarajaClient
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the Daraja client against the local stand-in server, with and without connection pooling."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200, help='B2C calls per scenario.')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent callers.')
+        parser.add_argument('--connect-delay', type=float, default=0.03, help='Simulated connection/TLS setup cost in seconds.')
+        parser.add_argument('--latency', type=float, default=0.005, help='Simulated server processing time per call in seconds.')
+
+    def client(self, server, pooled):
+        return DarajaClient(server.base_url, 'key', 'secret', '600000', 'bench', 'credential', pooled=pooled)
+
+    def run_threads(self, client, calls, workers):
+        def call(i):
+            started = time.perf_counter()
+            client.initiate_b2c_payment(f"07{i % 100000000:08d}", 1000)
+            return time.perf_counter() - started
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, range(calls)))
+
+    def run_async(self, client, calls, workers):
+        async def main():
+            semaphore = asyncio.Semaphore(workers)
+            async def call(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    await client.initiate_b2c_payment_async(f"07{i % 100000000:08d}", 1000)
+                    return time.perf_counter() - started
+            return await asyncio.gather(*(call(i) for i in range(calls)))
+        return asyncio.run(main())
+
+    def handle(self, *args, **options):
+        scenarios = (
+            ('new connection per call', False, self.run_threads),
+            ('pooled keep-alive', True, self.run_threads),
+            ('pooled keep-alive (async)', True, self.run_async),
+        )
+        self.stdout.write(
+            f"{options['calls']} calls, {options['workers']} workers, "
+            f"{options['connect_delay'] * 1000:.0f} ms connect cost, {options['latency'] * 1000:.0f} ms server latency"
+        )
+        for label, pooled, runner in scenarios:
+            with DarajaStubServer(connect_delay=options['connect_delay'], latency=options['latency']) as server:
+                client = self.client(server, pooled)
+                started = time.perf_counter()
+                latencies = runner(client, options['calls'], options['workers'])
+                elapsed = time.perf_counter() - started
+                latencies.sort()
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label:<28} mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+                    f"p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms  "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+                    f"{options['calls'] / elapsed:7.1f} calls/s  "
+                    f"{server.counters['connections']} connections, {server.counters['token_requests']} token fetches"
+                ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bursary.reports import write_cycle_report_pdf
+from bursary.utils import export_applications_queryset
+from ._bench import BENCH_ACADEMIC_YEAR, measure, seed_applications
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the cycle PDF report: pages/sec, rows/sec and peak Python memory (tracemalloc) "
+        "for each row count. Synthetic applications are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000], help='Row counts to render.')
+        parser.add_argument('--sections', choices=['status', 'ward'], help='Split the report into sections.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seeded = 0
+            for rows in sorted(options['rows']):
+                seed_applications(seeded, rows)
+                seeded = rows
+                queryset = export_applications_queryset(academic_year=BENCH_ACADEMIC_YEAR)
+                elapsed, peak, size, pages = measure(lambda handle: write_cycle_report_pdf(queryset, handle, group_by=options['sections']))
+                self.stdout.write(
+                    f"{rows:>7} rows  {pages:>5} pages  {elapsed:7.2f} s  {pages / elapsed:7.1f} pages/s  "
+                    f"{rows / elapsed:8.0f} rows/s  peak {peak / 2 ** 20:7.1f} MiB  file {size / 2 ** 20:6.1f} MiB"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from bursary.notifications import dispatch_notifications
+
+
+class Command(BaseCommand):
+    help = "Delivers queued email and SMS notifications from the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Notifications claimed and sent per SMTP connection.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = dispatch_notifications(batch_size=options['batch_size'])
+            if summary['batches'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Sent {summary['sent']} notifications in {summary['batches']} batches: "
+                    f"{summary['retried']} to retry, {summary['failed']} failed."
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,77 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from bursary.cycle_stats import refresh_cycle_statistics
+from bursary.models import Application, AuditLog, Payment, StudentProfile, User
+from bursary.query_plans import collect_plans, default_snapshot_path, load_snapshot, plan_regressions, replay_views, write_snapshot
+from ._bench import BENCH_ACADEMIC_YEAR, seed_applications
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays the registered views against a seeded dataset, prints the EXPLAIN plan of every query "
+        "they run, flags full scans and temporary sorts, and suggests indexes. The data is created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Synthetic applications to seed.')
+        parser.add_argument('--snapshot', help='Plan snapshot file (default: QUERY_PLAN_SNAPSHOT_DIR/<vendor>.json).')
+        parser.add_argument('--update', action='store_true', help='Write the current plans to the snapshot.')
+        parser.add_argument('--check', action='store_true', help='Fail when a query has a flag the snapshot does not.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query, not only flagged ones.')
+
+    def seed(self, rows):
+        seed_applications(0, rows)
+        applications = Application.objects.filter(academic_year=BENCH_ACADEMIC_YEAR)
+        applications.filter(score__lt=30).update(status='pending')
+        Payment.objects.bulk_create([
+            Payment(application_id=pk, amount_awarded=10000, payment_reference=f'PLAN{pk}')
+            for pk in applications.filter(status='paid').values_list('pk', flat=True)
+        ])
+        AuditLog.objects.bulk_create([AuditLog(action=f"Plan action {i}") for i in range(rows)])
+        refresh_cycle_statistics([BENCH_ACADEMIC_YEAR])
+        student = applications.first().student
+        # A complete profile, or the dashboard redirects to profile setup
+        StudentProfile.objects.filter(user=student).update(guardian_name='Plan Guardian', guardian_id_copy='documents/guardian.png')
+        users = {
+            'staff': User.objects.create(username='plan_admin', email='plan_admin@example.com', role='admin', is_superuser=True, is_staff=True),
+            'student': User.objects.get(pk=student.pk),
+        }
+        return users, {'application': applications.filter(status='pending').first()}
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users, objects = self.seed(options['rows'])
+            plans, suggestions = collect_plans(replay_views(users, objects))
+            transaction.set_rollback(True)
+
+        flagged = 0
+        for name, view_plans in plans.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {len(view_plans)} queries"))
+            for sql, entry in view_plans.items():
+                if not entry['flags'] and not options['verbose_plans']:
+                    continue
+                flagged += bool(entry['flags'])
+                self.stdout.write(f"  {sql}")
+                for step in entry['plan']:
+                    self.stdout.write(f"    {step}")
+                for flag in entry['flags']:
+                    self.stdout.write(self.style.WARNING(f"    ! {flag}"))
+        self.stdout.write(f"{flagged} flagged queries.")
+        for suggestion, names in suggestions.items():
+            self.stdout.write(f"Suggested index {suggestion}  ({', '.join(sorted(set(names)))})")
+
+        path = Path(options['snapshot']) if options['snapshot'] else default_snapshot_path()
+        if options['update']:
+            write_snapshot(path, plans)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
+        if options['check']:
+            try:
+                snapshot = load_snapshot(path)
+            except FileNotFoundError:
+                raise CommandError(f"No plan snapshot at {path}; run with --update first.")
+            regressions = plan_regressions(snapshot, plans)
+            if regressions:
+                raise CommandError("Query plan regressions:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No plan regressions."))
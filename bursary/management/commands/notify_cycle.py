@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from bursary.models import BursaryCycle, NotificationRun
+from bursary.notifications import send_mass_notification
+
+
+class Command(BaseCommand):
+    help = "Sends a cycle-wide email/SMS notification (cycle opened, closing or closed) to students."
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Cycle year, e.g. "2025/2026".')
+        parser.add_argument('--event', choices=[choice for choice, label in NotificationRun.EVENT_CHOICES], required=True)
+        parser.add_argument('--audience', choices=[choice for choice, label in NotificationRun.AUDIENCE_CHOICES], default='students')
+        parser.add_argument('--no-email', action='store_true', help='Only send SMS.')
+        parser.add_argument('--no-sms', action='store_true', help='Only send email.')
+        parser.add_argument('--note', default='', help='Extra text appended to every message, e.g. the deadline.')
+        parser.add_argument('--batch-size', type=int, help='Emails per SMTP batch and SMS handed to the gateway per call.')
+
+    def handle(self, *args, **options):
+        cycle = BursaryCycle.objects.filter(year=options['academic_year']).order_by('-is_active', '-pk').first()
+        if cycle is None:
+            raise CommandError(f"No bursary cycle for {options['academic_year']}.")
+        if options['no_email'] and options['no_sms']:
+            raise CommandError("Nothing to send: both email and SMS are disabled.")
+
+        run = send_mass_notification(
+            cycle,
+            options['event'],
+            audience=options['audience'],
+            send_email=not options['no_email'],
+            send_sms=not options['no_sms'],
+            note=options['note'],
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"  {done} recipients processed..."),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Notification run #{run.pk}: {run.recipients} recipients in {run.duration_seconds:.2f}s "
+            f"({run.messages_per_second:.0f} messages/s)."
+        ))
+        self.stdout.write(f"  Email: {run.emails_sent} sent, {run.emails_failed} failed")
+        self.stdout.write(f"  SMS:   {run.sms_sent} sent, {run.sms_failed} failed in {run.sms_batches} gateway batches")
+        for error in run.errors[:10]:
+            self.stdout.write(self.style.WARNING(f"  {error['recipient']}: {error['error']}"))
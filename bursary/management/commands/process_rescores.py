@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from bursary.services import ScreeningService
+
+
+class Command(BaseCommand):
+    help = "Re-scores applications queued by profile and document edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Queued requests processed per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = ScreeningService.rescore_queued(chunk_size=options['chunk_size'])
+            if summary['screened'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Re-scored {summary['screened']} applications: "
+                    f"{summary['rejected']} rejected, {summary['updated']} updated."
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
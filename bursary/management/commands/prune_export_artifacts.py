@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from bursary.artifacts import expire_export_artifacts, prune_export_artifacts
+from bursary.models import ExportArtifact
+
+
+class Command(BaseCommand):
+    help = "Evicts cached export files by age and total size (defaults: EXPORT_ARTIFACT_MAX_AGE / EXPORT_ARTIFACT_MAX_BYTES)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, help='Evict artifacts not used for this many seconds.')
+        parser.add_argument('--max-bytes', type=int, help='Keep at most this many bytes of artifacts.')
+        parser.add_argument('--all', action='store_true', help='Delete every cached export.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            deleted = expire_export_artifacts()
+        else:
+            deleted = prune_export_artifacts(max_age=options['max_age'], max_bytes=options['max_bytes'])
+        remaining = ExportArtifact.objects.aggregate(total=Sum('size'))['total'] or 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} export artifacts; {ExportArtifact.objects.count()} remain ({remaining / 2 ** 20:.1f} MiB)."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bursary.cycle_stats import refresh_cycle_statistics
+
+
+class Command(BaseCommand):
+    help = "Recomputes the CycleStatistics dashboard counters from the application and payment tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', action='append', dest='years', help='Academic year to rebuild (repeatable; default: every cycle).')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cycles = refresh_cycle_statistics(options['years'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {cycles} cycles."))
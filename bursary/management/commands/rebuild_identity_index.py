@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from bursary.duplicates import index_applications, find_duplicate_clusters
+from bursary.models import Application
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the hashed identity index used for duplicate detection and reports collisions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', nargs='?', help='Limit the rebuild to one academic year.')
+
+    def handle(self, *args, **options):
+        applications = Application.objects.all()
+        if options['academic_year']:
+            applications = applications.filter(academic_year=options['academic_year'])
+        indexed = index_applications(applications)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} applications."))
+
+        years = applications.order_by().values_list('academic_year', flat=True).distinct()
+        for academic_year in years:
+            clusters = find_duplicate_clusters(academic_year)
+            self.stdout.write(f"{academic_year}: {len(clusters)} duplicate clusters")
+            for cluster in clusters:
+                self.stdout.write(f"  {cluster.label}: applications {', '.join(map(str, cluster.application_ids))}")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from bursary.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the application search entries and the full-text index over them."
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} applications for search."))
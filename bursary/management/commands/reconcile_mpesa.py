@@ -0,0 +1,51 @@
+import os
+import time
+from datetime import date
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from bursary.models import ReconciliationRun
+from bursary.reconciliation import SORT_CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = "Reconciles an M-Pesa B2C statement CSV against Payment records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Path to the statement CSV export.')
+        parser.add_argument('--from', dest='period_start', type=date.fromisoformat, help='Compare payments made on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='period_end', type=date.fromisoformat, help='Compare payments made on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--reference-column', help='Statement column holding the transaction reference.')
+        parser.add_argument('--amount-column', help='Statement column holding the amount paid out.')
+        parser.add_argument('--chunk-size', type=int, default=SORT_CHUNK_SIZE, help='Statement rows sorted in memory before spilling to disk.')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['statement']):
+            raise CommandError(f"No such file: {options['statement']}")
+
+        run = ReconciliationRun(period_start=options['period_start'], period_end=options['period_end'])
+        with open(options['statement'], 'rb') as handle:
+            run.statement.save(os.path.basename(options['statement']), File(handle))
+
+        started = time.perf_counter()
+        try:
+            reconcile(
+                run,
+                reference_column=options['reference_column'],
+                amount_column=options['amount_column'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as e:
+            raise CommandError(f"Reconciliation #{run.pk} failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciliation #{run.pk}: {run.statement_rows} statement rows vs {run.payment_rows} payments "
+            f"in {time.perf_counter() - started:.2f}s. {run.matched_count} matched."
+        ))
+        for label, count in (
+            ("Paid in system, not on statement", run.missing_in_statement_count),
+            ("On statement, no Payment record", run.missing_in_payments_count),
+            ("Duplicate statement entries", run.duplicate_count),
+            ("Amount mismatches", run.amount_mismatch_count),
+        ):
+            style = self.style.WARNING if count else self.style.SUCCESS
+            self.stdout.write(style(f"  {label}: {count}"))
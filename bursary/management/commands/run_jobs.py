@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from bursary.jobs import claim_next_job, requeue_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (bulk disbursement, exports, PDF reports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty.')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0 = no limit).')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        ran = 0
+        while not options['max_jobs'] or ran < options['max_jobs']:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale jobs."))
+            job = claim_next_job(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            self.stdout.write(f"Running {job} (attempt {job.attempts})...")
+            run_job(job)
+            ran += 1
+            style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+            self.stdout.write(style(f"{job}{': ' + job.error if job.error else ''}"))
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} ran {ran} jobs."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from bursary.services import ScreeningService
+
+
+class Command(BaseCommand):
+    help = "Re-runs automated screening for every pending application in an academic year."
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Academic year to screen, e.g. "2025/2026".')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Applications loaded and written per batch.')
+
+    def handle(self, *args, **options):
+        summary = ScreeningService.screen_cycle(options['academic_year'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Screened {summary['screened']} applications for {options['academic_year']}: "
+            f"{summary['passed']} passed, {summary['rejected']} rejected, {summary['updated']} updated."
+        ))
@@ -0,0 +1,43 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bursary.simulation import ScreeningSimulator, check_overrides
+
+
+class Command(BaseCommand):
+    help = "Evaluates candidate screening parameters against a cycle without modifying any application."
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Academic year to simulate, e.g. "2025/2026".')
+        parser.add_argument('--threshold', type=float, action='append', default=[], help='Income threshold to try (repeatable).')
+        parser.add_argument('--scenario', action='append', default=[], help='JSON object of policy overrides, e.g. \'{"income_bands": [[30000, 40]]}\' (repeatable).')
+
+    def handle(self, *args, **options):
+        scenarios = [{}]
+        scenarios += [{'max_income_threshold': threshold} for threshold in options['threshold']]
+        for raw in options['scenario']:
+            try:
+                overrides = json.loads(raw)
+            except ValueError as e:
+                raise CommandError(f"Invalid --scenario JSON: {e}")
+            try:
+                check_overrides(overrides)
+            except ValueError as e:
+                raise CommandError(f"Invalid --scenario {raw}: {e}")
+            scenarios.append(overrides)
+
+        started = time.perf_counter()
+        simulator = ScreeningSimulator(options['academic_year'])
+        self.stdout.write(f"Loaded {simulator.total} applications in {(time.perf_counter() - started) * 1000:.1f} ms "
+                          f"(planned budget KES {simulator.planned_budget:,.0f})")
+
+        for overrides in scenarios:
+            started = time.perf_counter()
+            result = simulator.run(overrides)
+            elapsed = (time.perf_counter() - started) * 1000
+            label = json.dumps(overrides) if overrides else "current policy"
+            self.stdout.write(
+                f"{label}: {result.passed}/{result.total} pass ({result.pass_rate:.1f}%), "
+                f"spend KES {result.projected_spend:,.0f} (gap {result.budget_gap:,.0f}), "
+                f"histogram {dict(zip(result.histogram_labels, result.score_histogram))} [{elapsed:.2f} ms]"
+            )
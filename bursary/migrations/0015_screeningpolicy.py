@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:38
+
+import bursary.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0014_studentprofile_course_studentprofile_year_of_study'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScreeningPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('required_constituency', models.CharField(blank=True, default='Central', help_text='Leave blank to accept all constituencies', max_length=100)),
+                ('max_income_threshold', models.DecimalField(decimal_places=2, default=150000, max_digits=12)),
+                ('income_bands', models.JSONField(default=bursary.models.default_income_bands, help_text='List of [upper_limit, points]; income below the limit earns the points')),
+                ('household_bands', models.JSONField(default=bursary.models.default_household_bands, help_text='List of [min_size, points]; household size above min_size earns the points')),
+                ('admission_letter_points', models.IntegerField(default=30, help_text='Awarded to first-time applicants with an admission letter')),
+                ('continuing_points', models.IntegerField(default=15, help_text='Awarded to continuing students')),
+                ('version', models.PositiveIntegerField(default=1, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cycle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='screening_policy', to='bursary.bursarycycle')),
+            ],
+            options={
+                'verbose_name_plural': 'Screening policies',
+            },
+        ),
+    ]
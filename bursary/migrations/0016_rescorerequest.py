@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0015_screeningpolicy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RescoreRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rescore_requests', to='bursary.application')),
+            ],
+        ),
+    ]
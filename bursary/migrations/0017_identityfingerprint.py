@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0016_rescorerequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentityFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('kind', models.CharField(choices=[('guardian_id', 'Guardian ID Number'), ('guardian_phone', 'Guardian Phone'), ('student_phone', 'Student Phone'), ('admission', 'Admission No. + School')], max_length=20)),
+                ('digest', models.CharField(max_length=40)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identity_fingerprints', to='bursary.application')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'kind', 'digest'], name='bursary_ide_academi_f979c9_idx')],
+                'unique_together': {('application', 'kind')},
+            },
+        ),
+    ]
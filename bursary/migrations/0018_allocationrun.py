@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0017_identityfingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='amount_awarded',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Set when a budget allocation is approved', max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='AllocationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy', models.CharField(choices=[('score_order', 'Fund in score order'), ('proportional', 'Scale all awards proportionally')], default='score_order', max_length=20)),
+                ('tie_break', models.CharField(choices=[('earliest', 'Earliest submission first'), ('smallest', 'Smallest request first'), ('lowest_income', 'Lowest guardian income first')], default='earliest', max_length=20)),
+                ('max_award', models.DecimalField(blank=True, decimal_places=2, help_text='Per-student cap; blank means the amount requested', max_digits=12, null=True)),
+                ('min_award', models.DecimalField(decimal_places=2, default=0, help_text='Awards below this are not made', max_digits=12)),
+                ('budget', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('total_allocated', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('funded_count', models.PositiveIntegerField(default=0)),
+                ('candidate_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('proposed', 'Proposed'), ('approved', 'Approved'), ('discarded', 'Discarded')], db_index=True, default='proposed', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_runs', to='bursary.bursarycycle')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AllocationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_items', to='bursary.application')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='bursary.allocationrun')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+    ]
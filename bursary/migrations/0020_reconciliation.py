@@ -0,0 +1,60 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0019_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('bulk_disburse', 'Bulk Disbursement'), ('export_csv', 'CSV Export'), ('export_excel', 'Excel Export'), ('pdf_report', 'PDF Report'), ('reconcile_statement', 'M-Pesa Reconciliation')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statement', models.FileField(upload_to='reconciliation/')),
+                ('period_start', models.DateField(blank=True, help_text='Only payments made on or after this date are compared', null=True)),
+                ('period_end', models.DateField(blank=True, help_text='Only payments made on or before this date are compared', null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('statement_rows', models.PositiveIntegerField(default=0)),
+                ('payment_rows', models.PositiveIntegerField(default=0)),
+                ('matched_count', models.PositiveIntegerField(default=0)),
+                ('missing_in_statement_count', models.PositiveIntegerField(default=0)),
+                ('missing_in_payments_count', models.PositiveIntegerField(default=0)),
+                ('duplicate_count', models.PositiveIntegerField(default=0)),
+                ('amount_mismatch_count', models.PositiveIntegerField(default=0)),
+                ('statement_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('payments_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReconciliationIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('missing_in_statement', 'Paid in system, not on statement'), ('missing_in_payments', 'On statement, no Payment record'), ('duplicate', 'Duplicate statement entry'), ('amount_mismatch', 'Amount mismatch')], max_length=30)),
+                ('reference', models.CharField(max_length=100)),
+                ('statement_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('payment_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('statement_line', models.PositiveIntegerField(blank=True, null=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bursary.payment')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issues', to='bursary.reconciliationrun')),
+            ],
+            options={
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['run', 'kind'], name='bursary_rec_run_id_fc5783_idx')],
+            },
+        ),
+    ]
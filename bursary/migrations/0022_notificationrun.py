@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0021_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('cycle_opened', 'Cycle opened'), ('cycle_closing', 'Cycle closing soon'), ('cycle_closed', 'Cycle closed')], max_length=30)),
+                ('audience', models.CharField(choices=[('students', 'All students'), ('applicants', 'Applicants in the cycle'), ('pending', 'Applicants awaiting review')], default='students', max_length=20)),
+                ('send_email', models.BooleanField(default=True)),
+                ('send_sms', models.BooleanField(default=True)),
+                ('note', models.TextField(blank=True, help_text='Extra text included in every message')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('recipients', models.PositiveIntegerField(default=0)),
+                ('emails_sent', models.PositiveIntegerField(default=0)),
+                ('emails_failed', models.PositiveIntegerField(default=0)),
+                ('sms_sent', models.PositiveIntegerField(default=0)),
+                ('sms_failed', models.PositiveIntegerField(default=0)),
+                ('sms_batches', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text='A sample of delivery errors')),
+                ('duration_seconds', models.FloatField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_runs', to='bursary.bursarycycle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0022_notificationrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel')], max_length=10)),
+                ('params_key', models.CharField(max_length=64)),
+                ('fingerprint', models.CharField(max_length=128)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('file', models.FileField(upload_to='exports/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_accessed_at'], name='bursary_exp_last_ac_f9cd1c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('format', 'params_key', 'fingerprint'), name='unique_export_artifact')],
+            },
+        ),
+    ]
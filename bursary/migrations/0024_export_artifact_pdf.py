@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0023_export_artifact'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportartifact',
+            name='format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel'), ('pdf', 'PDF')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0024_export_artifact_pdf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CycleStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20, unique=True)),
+                ('total_applications', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('recommended_count', models.PositiveIntegerField(default=0)),
+                ('approved_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('paid_count', models.PositiveIntegerField(default=0)),
+                ('auto_rejected_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+                ('scores_upto_20', models.PositiveIntegerField(default=0)),
+                ('scores_upto_40', models.PositiveIntegerField(default=0)),
+                ('scores_upto_60', models.PositiveIntegerField(default=0)),
+                ('scores_upto_80', models.PositiveIntegerField(default=0)),
+                ('scores_upto_100', models.PositiveIntegerField(default=0)),
+                ('amount_requested_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('disbursed_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cycle statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'bursary_application_fts'
+ENTRY_TABLE = 'bursary_applicationsearchentry'
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        document, content='{ENTRY_TABLE}', content_rowid='application_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.application_id, new.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.application_id, old.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.application_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.application_id, new.document);
+    END""",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRESQL_INDEX = [f"CREATE INDEX bursary_search_document_gin ON {ENTRY_TABLE} USING gin (to_tsvector('simple', document))"]
+POSTGRESQL_DROP = ["DROP INDEX IF EXISTS bursary_search_document_gin"]
+
+SEARCH_COLUMNS = (
+    'pk',
+    'student__first_name',
+    'student__last_name',
+    'student__username',
+    'student__national_id',
+    'student__student_profile__school_name',
+    'student__student_profile__admission_number',
+    'student__student_profile__guardian_name',
+)
+
+
+def run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    """Native full-text index for the backend, then entries for existing applications."""
+    run(schema_editor, {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRESQL_INDEX})
+    Application = apps.get_model('bursary', 'Application')
+    ApplicationSearchEntry = apps.get_model('bursary', 'ApplicationSearchEntry')
+    ApplicationSearchEntry.objects.bulk_create(
+        (
+            ApplicationSearchEntry(application_id=row[0], document=' '.join(value for value in row[1:] if value))
+            for row in Application.objects.order_by('pk').values_list(*SEARCH_COLUMNS).iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0027_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSearchEntry',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='bursary.application')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
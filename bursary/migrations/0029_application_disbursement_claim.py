@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0028_application_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='disbursement_reference',
+            field=models.CharField(blank=True, db_index=True, help_text='Claim on the B2C payment in flight (see disbursement.py)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cyclestatistics',
+            name='disbursing_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Review'), ('recommended', 'Recommended by Committee'), ('approved', 'Approved for Disbursement'), ('rejected', 'Rejected'), ('disbursing', 'Disbursement in Progress'), ('paid', 'Funds Disbursed')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
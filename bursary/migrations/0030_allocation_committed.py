@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursary', '0029_application_disbursement_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allocationrun',
+            name='committed',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Already being paid or paid in the cycle when proposed', max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='allocationrun',
+            name='status',
+            field=models.CharField(choices=[('proposed', 'Proposed'), ('approved', 'Approved'), ('superseded', 'Superseded'), ('discarded', 'Discarded')], db_index=True, default='proposed', max_length=20),
+        ),
+    ]
@@ -1,9 +1,72 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
 
-class User(AbstractUser):
+class FieldTrackerMixin:
+    """
+    Remembers the loaded values of ``tracked_fields`` so receivers can tell
+    what a save actually changed without re-reading the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
+
+    def _tracked_value(self, name):
+        value = getattr(self, self._meta.get_field(name).attname)
+        if isinstance(value, FieldFile):
+            return value.name or ""
+        return value
+
+    def _snapshot_tracked_fields(self, update_fields=None):
+        loaded = self.__dict__
+        names = self.tracked_fields
+        original = {}
+        if update_fields is not None and hasattr(self, '_tracked_original'):
+            # Fields left out of update_fields still differ from the database
+            names = [name for name in names if name in update_fields]
+            original = self._tracked_original
+        original.update({
+            name: self._tracked_value(name)
+            for name in names
+            if self._meta.get_field(name).attname in loaded
+        })
+        self._tracked_original = original
+
+    def has_original(self, name):
+        """Whether a loaded or saved value of ``name`` is known."""
+        return name in getattr(self, '_tracked_original', {})
+
+    def get_original(self, name, default=None):
+        """Value of a tracked field as last loaded or saved."""
+        return getattr(self, '_tracked_original', {}).get(name, default)
+
+    def changed_fields(self):
+        """Tracked fields whose value differs from the last load or save."""
+        original = getattr(self, '_tracked_original', None)
+        if original is None:
+            return set(self.tracked_fields)
+        return {
+            name for name, value in original.items()
+            if self._tracked_value(name) != value
+        }
+
+    def has_changed(self, name):
+        return name in self.changed_fields()
+
+class User(FieldTrackerMixin, AbstractUser):
     ROLE_CHOICES = (
         ('student', 'Student'),
         ('committee', 'Committee Member'),
@@ -17,6 +80,14 @@ class User(AbstractUser):
     constituency = models.CharField(max_length=100, null=True, blank=True)
     profile_photo = models.ImageField(upload_to='profiles/', null=True, blank=True)
 
+    # Screening inputs watched for incremental re-scoring, identity fields for
+    # duplicate detection and the fields staff search applications by; email
+    # is tracked too because exports include it (see artifacts)
+    screening_fields = ('constituency',)
+    identity_fields = ('phone',)
+    search_fields = ('first_name', 'last_name', 'username', 'national_id')
+    tracked_fields = screening_fields + identity_fields + search_fields + ('email',)
+
     def is_committee(self):
         return self.role == 'committee' or self.is_superuser
 
@@ -49,7 +120,7 @@ class User(AbstractUser):
             
         return int((filled / total) * 100)
 
-class StudentProfile(models.Model):
+class StudentProfile(FieldTrackerMixin, models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_profile')
     school_name = models.CharField(max_length=255)
     admission_number = models.CharField(max_length=50)
@@ -76,15 +147,50 @@ class StudentProfile(models.Model):
     location = models.CharField(max_length=100, default="")
     sub_location = models.CharField(max_length=100, default="")
 
+    # Screening inputs watched for incremental re-scoring, identity fields for
+    # duplicate detection and the fields staff search applications by; ward
+    # is tracked too because exports include it (see artifacts)
+    screening_fields = ('guardian_income', 'household_size')
+    identity_fields = ('guardian_id_number', 'guardian_phone', 'admission_number', 'school_name')
+    search_fields = ('school_name', 'admission_number', 'guardian_name')
+    tracked_fields = screening_fields + identity_fields + ('guardian_name', 'ward')
+
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.school_name}"
 
-class Application(models.Model):
+class ApplicationQuerySet(models.QuerySet):
+    """
+    Named fetch profiles: each joins exactly the relations its screens
+    dereference per row, so listing N applications stays one query.
+    """
+    def for_committee(self):
+        """Review lists and detail: student name, school and documents."""
+        return self.select_related('student', 'student__student_profile', 'document_bundle')
+
+    def for_admin(self):
+        """Approval lists: student name and school, and any payment made."""
+        return self.select_related('student', 'student__student_profile', 'payment_record')
+
+    def for_export(self):
+        """Bulk exports and reports: everything an export column reads, in pk order."""
+        return self.select_related('student', 'student__student_profile', 'payment_record').order_by('pk')
+
+    def for_finance(self):
+        """Disbursement and allocation: the student's phone and name, and the payment."""
+        return self.select_related('student', 'payment_record')
+
+class PaymentQuerySet(models.QuerySet):
+    def for_finance(self):
+        """Payment ledgers: the application and student each payment belongs to."""
+        return self.select_related('application__student')
+
+class Application(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending Review'),
         ('recommended', 'Recommended by Committee'),
         ('approved', 'Approved for Disbursement'),
         ('rejected', 'Rejected'),
+        ('disbursing', 'Disbursement in Progress'),
         ('paid', 'Funds Disbursed'),
     )
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='applications')
@@ -96,29 +202,90 @@ class Application(models.Model):
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
     score = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)])
+    amount_awarded = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Set when a budget allocation is approved")
+    disbursement_reference = models.CharField(max_length=64, blank=True, db_index=True, help_text="Claim on the B2C payment in flight (see disbursement.py)")
     committee_comments = models.TextField(blank=True, null=True)
     admin_comments = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Status transitions drive notifications; all of these feed CycleStatistics
+    tracked_fields = ('status', 'score', 'amount_requested', 'academic_year', 'admin_comments')
+
+    objects = ApplicationQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'academic_year') # Smart Validation: One per year
+        indexes = [
+            # Keyset pagination of the staff list (see pagination.py)
+            models.Index(fields=['created_at', 'id'], name='application_created_id_idx'),
+            # Committee queue: pending applications by score (see explain_views)
+            models.Index(fields=['status', 'score', 'created_at'], name='application_status_score_idx'),
+            # A student's own applications, newest first
+            models.Index(fields=['student', 'created_at'], name='application_student_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.academic_year} ({self.status})"
 
-class ApplicationDocument(models.Model):
+class ApplicationDocument(FieldTrackerMixin, models.Model):
     application = models.OneToOneField(Application, on_delete=models.CASCADE, related_name='document_bundle')
     student_id_card = models.FileField(upload_to='documents/student_ids/', help_text="Mandatory: Valid Student ID")
     fee_structure = models.FileField(upload_to='documents/fee_structures/', help_text="Mandatory: Official Fee Structure")
     admission_letter = models.FileField(upload_to='documents/admission_letters/', null=True, blank=True, help_text="Optional: For first-time applicants")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Screening inputs watched for incremental re-scoring
+    tracked_fields = ('student_id_card', 'fee_structure', 'admission_letter')
+
+class RescoreRequest(models.Model):
+    """Queue of applications whose screening inputs changed since they were scored."""
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='rescore_requests')
+    reason = models.CharField(max_length=255, blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def enqueue(cls, applications, reason=""):
+        """Queues re-scoring for pending applications in ``applications`` (a queryset)."""
+        application_ids = applications.filter(status='pending').values_list('pk', flat=True)
+        return cls.objects.bulk_create([cls(application_id=pk, reason=reason) for pk in application_ids])
+
+class IdentityFingerprint(models.Model):
+    """Normalized, hashed identity value of an application, indexed per cycle for duplicate detection."""
+    KIND_CHOICES = (
+        ('guardian_id', 'Guardian ID Number'),
+        ('guardian_phone', 'Guardian Phone'),
+        ('student_phone', 'Student Phone'),
+        ('admission', 'Admission No. + School'),
+    )
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='identity_fingerprints')
+    academic_year = models.CharField(max_length=20)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    digest = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ('application', 'kind')
+        indexes = [models.Index(fields=['academic_year', 'kind', 'digest'])]
+
+class ApplicationSearchEntry(models.Model):
+    """
+    Searchable text of an application (student, school and guardian), one row
+    per application. The full-text index over ``document`` is created by the
+    migration: an FTS5 table on SQLite, a GIN index on PostgreSQL (see search.py).
+    """
+    application = models.OneToOneField(Application, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search entry for application {self.application_id}"
+
 class Payment(models.Model):
     application = models.OneToOneField(Application, on_delete=models.CASCADE, related_name='payment_record')
     amount_awarded = models.DecimalField(max_digits=12, decimal_places=2)
     payment_reference = models.CharField(max_length=100, unique=True)
-    date_paid = models.DateTimeField(auto_now_add=True)
+    date_paid = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = PaymentQuerySet.as_manager()
 
 class AuditLog(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
@@ -126,6 +293,12 @@ class AuditLog(models.Model):
     details = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the audit trail (see pagination.py)
+            models.Index(fields=['timestamp', 'id'], name='auditlog_timestamp_id_idx'),
+        ]
+
 class DevelopmentProject(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -168,6 +341,382 @@ class BursaryCycle(models.Model):
     def __str__(self):
         return f"Cycle {self.year} (Budget: {self.planned_budget})"
 
+class AllocationRun(models.Model):
+    """A proposed split of a cycle's planned budget across recommended applications."""
+    STRATEGY_CHOICES = (
+        ('score_order', 'Fund in score order'),
+        ('proportional', 'Scale all awards proportionally'),
+    )
+    TIE_BREAK_CHOICES = (
+        ('earliest', 'Earliest submission first'),
+        ('smallest', 'Smallest request first'),
+        ('lowest_income', 'Lowest guardian income first'),
+    )
+    STATUS_CHOICES = (
+        ('proposed', 'Proposed'),
+        ('approved', 'Approved'),
+        ('superseded', 'Superseded'),
+        ('discarded', 'Discarded'),
+    )
+    cycle = models.ForeignKey(BursaryCycle, on_delete=models.CASCADE, related_name='allocation_runs')
+    strategy = models.CharField(max_length=20, choices=STRATEGY_CHOICES, default='score_order')
+    tie_break = models.CharField(max_length=20, choices=TIE_BREAK_CHOICES, default='earliest')
+    max_award = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Per-student cap; blank means the amount requested")
+    min_award = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Awards below this are not made")
+    budget = models.DecimalField(max_digits=15, decimal_places=2)
+    committed = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text="Already being paid or paid in the cycle when proposed")
+    total_allocated = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    funded_count = models.PositiveIntegerField(default=0)
+    candidate_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='proposed', db_index=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    approved_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    approved_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def available(self):
+        """The part of the budget this run could award."""
+        return max(self.budget - self.committed, 0)
+
+    def __str__(self):
+        return f"Allocation #{self.pk} for {self.cycle.year} ({self.status})"
+
+class AllocationItem(models.Model):
+    run = models.ForeignKey(AllocationRun, on_delete=models.CASCADE, related_name='items')
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='allocation_items')
+    rank = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ['rank']
+
+class BackgroundJob(models.Model):
+    """A long-running admin operation executed by the run_jobs worker."""
+    KIND_CHOICES = (
+        ('bulk_disburse', 'Bulk Disbursement'),
+        ('export_csv', 'CSV Export'),
+        ('export_excel', 'Excel Export'),
+        ('pdf_report', 'PDF Report'),
+        ('reconcile_statement', 'M-Pesa Reconciliation'),
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at']), models.Index(fields=['created_at'])]
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        return int(self.progress_done * 100 / self.progress_total) if self.progress_total else 0
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+class CycleStatistics(models.Model):
+    """
+    Dashboard counters for one academic year, kept current by signals on
+    Application and Payment (see cycle_stats) instead of aggregating the
+    full tables on every page view.
+    """
+    # Upper bounds of the score histogram bands shown on the reports page
+    SCORE_BANDS = (20, 40, 60, 80, 100)
+
+    academic_year = models.CharField(max_length=20, unique=True)
+    total_applications = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    recommended_count = models.PositiveIntegerField(default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    disbursing_count = models.PositiveIntegerField(default=0)
+    paid_count = models.PositiveIntegerField(default=0)
+    auto_rejected_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    scores_upto_20 = models.PositiveIntegerField(default=0)
+    scores_upto_40 = models.PositiveIntegerField(default=0)
+    scores_upto_60 = models.PositiveIntegerField(default=0)
+    scores_upto_80 = models.PositiveIntegerField(default=0)
+    scores_upto_100 = models.PositiveIntegerField(default=0)
+    amount_requested_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    payments_count = models.PositiveIntegerField(default=0)
+    disbursed_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "cycle statistics"
+
+    @property
+    def avg_score(self):
+        return self.score_total / self.total_applications if self.total_applications else 0
+
+    @property
+    def approval_rate(self):
+        approved = self.approved_count + self.paid_count
+        return approved / self.total_applications * 100 if self.total_applications else 0
+
+    @property
+    def score_distribution(self):
+        return [getattr(self, f"scores_upto_{band}") for band in self.SCORE_BANDS]
+
+    def status_count(self, status):
+        return getattr(self, f"{status}_count")
+
+    def __str__(self):
+        return f"Statistics {self.academic_year} ({self.total_applications} applications)"
+
+class ExportArtifact(models.Model):
+    """
+    A generated export file, reused while the data it was built from is
+    unchanged. ``params_key`` identifies the filters and ``fingerprint``
+    the state of the matching rows when the file was built.
+    """
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params_key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=128)
+    params = models.JSONField(default=dict, blank=True)
+    file = models.FileField(upload_to='exports/')
+    size = models.PositiveBigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['format', 'params_key', 'fingerprint'], name='unique_export_artifact')]
+        indexes = [models.Index(fields=['last_accessed_at'])]
+
+    def __str__(self):
+        return f"{self.get_format_display()} export {self.params_key[:8]} ({self.rows} rows)"
+
+class ReconciliationRun(models.Model):
+    """One comparison of an M-Pesa B2C statement export against Payment records."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    statement = models.FileField(upload_to='reconciliation/')
+    period_start = models.DateField(null=True, blank=True, help_text="Only payments made on or after this date are compared")
+    period_end = models.DateField(null=True, blank=True, help_text="Only payments made on or before this date are compared")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    statement_rows = models.PositiveIntegerField(default=0)
+    payment_rows = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    missing_in_statement_count = models.PositiveIntegerField(default=0)
+    missing_in_payments_count = models.PositiveIntegerField(default=0)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    amount_mismatch_count = models.PositiveIntegerField(default=0)
+    statement_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    payments_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def issue_count(self):
+        return self.missing_in_statement_count + self.missing_in_payments_count + self.duplicate_count + self.amount_mismatch_count
+
+    def __str__(self):
+        return f"Reconciliation #{self.pk} ({self.status})"
+
+class ReconciliationIssue(models.Model):
+    KIND_CHOICES = (
+        ('missing_in_statement', 'Paid in system, not on statement'),
+        ('missing_in_payments', 'On statement, no Payment record'),
+        ('duplicate', 'Duplicate statement entry'),
+        ('amount_mismatch', 'Amount mismatch'),
+    )
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='issues')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    reference = models.CharField(max_length=100)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    statement_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    payment_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    statement_line = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [models.Index(fields=['run', 'kind'])]
+
+class NotificationOutbox(models.Model):
+    """
+    A queued email or SMS. Rows are written in the same transaction as the
+    change that triggered them and delivered by the dispatch_notifications
+    worker.
+    """
+    CHANNEL_CHOICES = (
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    batch = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not retried before this time")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+class NotificationRun(models.Model):
+    """One cycle-wide mass notification and its delivery counters."""
+    EVENT_CHOICES = (
+        ('cycle_opened', 'Cycle opened'),
+        ('cycle_closing', 'Cycle closing soon'),
+        ('cycle_closed', 'Cycle closed'),
+    )
+    AUDIENCE_CHOICES = (
+        ('students', 'All students'),
+        ('applicants', 'Applicants in the cycle'),
+        ('pending', 'Applicants awaiting review'),
+    )
+    STATUS_CHOICES = (
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    cycle = models.ForeignKey(BursaryCycle, on_delete=models.CASCADE, related_name='notification_runs')
+    event = models.CharField(max_length=30, choices=EVENT_CHOICES)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, default='students')
+    send_email = models.BooleanField(default=True)
+    send_sms = models.BooleanField(default=True)
+    note = models.TextField(blank=True, help_text="Extra text included in every message")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    recipients = models.PositiveIntegerField(default=0)
+    emails_sent = models.PositiveIntegerField(default=0)
+    emails_failed = models.PositiveIntegerField(default=0)
+    sms_sent = models.PositiveIntegerField(default=0)
+    sms_failed = models.PositiveIntegerField(default=0)
+    sms_batches = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="A sample of delivery errors")
+    duration_seconds = models.FloatField(default=0)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def messages_per_second(self):
+        delivered = self.emails_sent + self.sms_sent
+        return delivered / self.duration_seconds if self.duration_seconds else 0
+
+    def __str__(self):
+        return f"{self.get_event_display()} for {self.cycle.year} ({self.status})"
+
+def default_income_bands():
+    # [upper_limit, points]: income strictly below the limit earns the points
+    return [[20000, 40], [50000, 25], [80000, 10]]
+
+def default_household_bands():
+    # [min_size, points]: household size strictly above min_size earns the points
+    return [[0, 5], [4, 15], [6, 30]]
+
+def validate_bands(bands, bound):
+    """
+    Checks a band list: [[bound, points], ...] with numeric values, bounds
+    ascending without repeats. ``bound`` names the first value in messages.
+    """
+    if not isinstance(bands, list) or not bands:
+        raise ValidationError(f"Enter a non-empty list of [{bound}, points] pairs.")
+    previous = None
+    for band in bands:
+        if not (isinstance(band, list) and len(band) == 2):
+            raise ValidationError(f"Each band must be a [{bound}, points] pair, got {band!r}.")
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in band):
+            raise ValidationError(f"Band values must be numbers, got {band!r}.")
+        if band[0] < 0 or band[1] < 0:
+            raise ValidationError(f"Band values cannot be negative, got {band!r}.")
+        if previous is not None and band[0] <= previous:
+            raise ValidationError(f"Bands must be in ascending order of {bound} without repeats.")
+        previous = band[0]
+
+class ScreeningPolicy(models.Model):
+    """Per-cycle screening rules, compiled by ScreeningService.get_policy()."""
+    cycle = models.OneToOneField(BursaryCycle, on_delete=models.CASCADE, related_name='screening_policy')
+    required_constituency = models.CharField(max_length=100, default="Central", blank=True, help_text="Leave blank to accept all constituencies")
+    max_income_threshold = models.DecimalField(max_digits=12, decimal_places=2, default=150000)
+    income_bands = models.JSONField(default=default_income_bands, help_text="List of [upper_limit, points]; income below the limit earns the points")
+    household_bands = models.JSONField(default=default_household_bands, help_text="List of [min_size, points]; household size above min_size earns the points")
+    admission_letter_points = models.IntegerField(default=30, help_text="Awarded to first-time applicants with an admission letter")
+    continuing_points = models.IntegerField(default=15, help_text="Awarded to continuing students")
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Screening policies"
+
+    def clean(self):
+        # A malformed band would make every screening call of the cycle fail
+        errors = {}
+        for field, bound in (('income_bands', 'upper_limit'), ('household_bands', 'min_size')):
+            try:
+                validate_bands(getattr(self, field), bound)
+            except ValidationError as error:
+                errors[field] = error
+        if errors:
+            raise ValidationError(errors)
+
+    def save(self, *args, **kwargs):
+        bump = not self._state.adding
+        if bump:
+            # Incremented in SQL, so two concurrent saves get two versions
+            self.version = F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
+    def __str__(self):
+        return f"Screening policy for {self.cycle.year} (v{self.version})"
+
 class DownloadableDocument(models.Model):
     CATEGORY_CHOICES = (
         ('guide', 'Student Guide'),
@@ -1,6 +1,17 @@
+import asyncio
+import base64
+import http.client
+import json
+import ssl
+import threading
+import time
 import uuid
 import logging
+from decimal import Decimal
+from urllib.parse import urlsplit
+from django.conf import settings
 from django.utils import timezone
+from .duplicates import normalize_phone
 
 logger = logging.getLogger(__name__)
 
@@ -8,9 +19,12 @@ class MpesaClient:
     """
     Mock M-Pesa API Client for the Bursary Management System.
     In a real application, this would use the Daraja API.
+
+    Payments complete synchronously: 'Success' carries the receipt number
+    as ``transaction_id``.
     """
     @staticmethod
-    def initiate_b2c_payment(phone, amount, occasion="Bursary"):
+    def initiate_b2c_payment(phone, amount, occasion="Bursary", originator_conversation_id=None):
         """
         Simulates a Business to Customer (B2C) payment.
         """
@@ -28,30 +42,288 @@ class MpesaClient:
             'message': 'Payment processed successfully'
         }
 
-def process_bursary_disbursement(application):
+class MpesaAPIError(Exception):
+    pass
+
+class AccessTokenCache:
+    """
+    OAuth access token shared by every thread using a client.
+
+    The token is reused until ``refresh_margin`` seconds before it expires.
+    Only one thread fetches a new token; the others wait on the lock and
+    then pick up the fresh value.
+    """
+    def __init__(self, fetch, refresh_margin=60):
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        token, expires_at = self.token, self.expires_at
+        if token and time.monotonic() < expires_at - self.refresh_margin:
+            return token
+        with self.lock:
+            if self.token and time.monotonic() < self.expires_at - self.refresh_margin:
+                return self.token
+            token, expires_in = self.fetch()
+            self.token = token
+            self.expires_at = time.monotonic() + expires_in
+            return token
+
+    def invalidate(self, token):
+        with self.lock:
+            if self.token == token:
+                self.token = None
+
+class DarajaClient:
+    """
+    Safaricom Daraja B2C client.
+
+    Each worker thread keeps its own keep-alive HTTP(S) connection, so
+    concurrent disbursements reuse TLS sessions instead of reconnecting per
+    call, and all threads share one cached access token. With
+    ``pooled=False`` every call opens and closes its own connection.
+
+    B2C requests are accepted asynchronously by Daraja: an 'Accepted'
+    response carries the ConversationID, and the outcome with the M-Pesa
+    receipt number is posted later to ``result_url`` (see
+    parse_b2c_result and the mpesa-b2c-result view).
+    """
+    # Connection errors raised when a keep-alive connection was closed by the server
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+    def __init__(self, base_url, consumer_key, consumer_secret, shortcode, initiator_name, security_credential,
+                 result_url="", timeout_url="", command_id="BusinessPayment", timeout=30, pooled=True, token_refresh_margin=60):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.shortcode = shortcode
+        self.initiator_name = initiator_name
+        self.security_credential = security_credential
+        self.result_url = result_url
+        self.timeout_url = timeout_url
+        self.command_id = command_id
+        self.timeout = timeout
+        self.pooled = pooled
+        self.ssl_context = ssl.create_default_context() if self.scheme == 'https' else None
+        self.tokens = AccessTokenCache(self._fetch_token, refresh_margin=token_refresh_margin)
+        self.local = threading.local()
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        options = {
+            'base_url': getattr(settings, 'MPESA_BASE_URL', 'https://sandbox.safaricom.co.ke'),
+            'consumer_key': getattr(settings, 'MPESA_CONSUMER_KEY', ''),
+            'consumer_secret': getattr(settings, 'MPESA_CONSUMER_SECRET', ''),
+            'shortcode': getattr(settings, 'MPESA_SHORTCODE', ''),
+            'initiator_name': getattr(settings, 'MPESA_INITIATOR_NAME', ''),
+            'security_credential': getattr(settings, 'MPESA_SECURITY_CREDENTIAL', ''),
+            'result_url': getattr(settings, 'MPESA_RESULT_URL', ''),
+            'timeout_url': getattr(settings, 'MPESA_TIMEOUT_URL', ''),
+            'timeout': getattr(settings, 'MPESA_HTTP_TIMEOUT', 30),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def _connect(self):
+        if self.ssl_context:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _connection(self):
+        if not self.pooled:
+            return self._connect()
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        return connection
+
+    def _discard(self, connection):
+        connection.close()
+        if getattr(self.local, 'connection', None) is connection:
+            self.local.connection = None
+
+    def close(self):
+        """Closes the calling thread's pooled connection."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            self._discard(connection)
+
+    def _request(self, method, path, headers, body=None):
+        headers = {**headers, 'Connection': 'keep-alive' if self.pooled else 'close'}
+        for attempt in (1, 2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except self.STALE_CONNECTION_ERRORS:
+                self._discard(connection)
+                if attempt == 2:
+                    raise
+                continue
+            except Exception:
+                self._discard(connection)
+                raise
+            if not self.pooled or response.will_close:
+                self._discard(connection)
+            return response.status, data
+
+    def _fetch_token(self):
+        credentials = base64.b64encode(f"{self.consumer_key}:{self.consumer_secret}".encode()).decode()
+        status, data = self._request('GET', '/oauth/v1/generate?grant_type=client_credentials', {'Authorization': f"Basic {credentials}"})
+        if status != 200:
+            raise MpesaAPIError(f"Daraja OAuth failed with HTTP {status}: {data[:200]!r}")
+        payload = json.loads(data)
+        return payload['access_token'], float(payload.get('expires_in', 3599))
+
+    def _post(self, path, payload):
+        body = json.dumps(payload).encode()
+        for attempt in (1, 2):
+            token = self.tokens.get()
+            status, data = self._request('POST', path, {'Authorization': f"Bearer {token}", 'Content-Type': 'application/json'}, body)
+            if status == 401 and attempt == 1:
+                # Token revoked or expired early: fetch a new one and retry once
+                self.tokens.invalidate(token)
+                continue
+            try:
+                return status, json.loads(data)
+            except ValueError:
+                return status, {'errorMessage': data[:200].decode(errors='replace')}
+
+    def initiate_b2c_payment(self, phone, amount, occasion="Bursary", originator_conversation_id=None):
+        """
+        Sends a B2C payment request. ``originator_conversation_id`` should
+        be unique per payment and stable across retries (the application's
+        disbursement_reference), so the result can be matched to it later.
+        """
+        if amount != int(amount):
+            # Daraja takes whole shillings; never truncate an award silently
+            return {'status': 'Failed', 'message': f"M-Pesa pays whole shillings only, not KES {amount}."}
+        payload = {
+            'OriginatorConversationID': originator_conversation_id or uuid.uuid4().hex,
+            'InitiatorName': self.initiator_name,
+            'SecurityCredential': self.security_credential,
+            'CommandID': self.command_id,
+            'Amount': int(amount),
+            'PartyA': self.shortcode,
+            'PartyB': f"254{normalize_phone(phone)}",
+            'Remarks': occasion,
+            'QueueTimeOutURL': self.timeout_url,
+            'ResultURL': self.result_url,
+            'Occasion': occasion,
+        }
+        status, response = self._post('/mpesa/b2c/v3/paymentrequest', payload)
+        if status == 200 and str(response.get('ResponseCode')) == '0':
+            logger.info(f"M-PESA B2C: Sent KES {amount} to {payload['PartyB']} for {occasion}. Conversation: {response['ConversationID']}")
+            return {
+                'status': 'Accepted',
+                'conversation_id': response['ConversationID'],
+                'timestamp': timezone.now(),
+                'message': response.get('ResponseDescription', ''),
+            }
+        message = response.get('errorMessage') or response.get('ResponseDescription') or f"HTTP {status}"
+        logger.warning(f"M-PESA B2C rejected KES {amount} to {payload['PartyB']}: {message}")
+        return {'status': 'Failed', 'message': message}
+
+    async def initiate_b2c_payment_async(self, phone, amount, occasion="Bursary", originator_conversation_id=None):
+        """
+        Awaitable variant for async views and tasks. Runs the call on the
+        default thread pool, so concurrent awaits share the same pooled
+        per-thread connections and token.
+        """
+        return await asyncio.to_thread(self.initiate_b2c_payment, phone, amount, occasion, originator_conversation_id)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_mpesa_client():
+    """
+    Returns the M-Pesa client used for disbursements.
+
+    MPESA_CLIENT = 'daraja' selects the real Daraja client, shared across
+    the process so its pooled connections and access token are reused;
+    anything else returns the mock client.
+    """
+    if getattr(settings, 'MPESA_CLIENT', 'mock') != 'daraja':
+        return MpesaClient()
+    key = (getattr(settings, 'MPESA_BASE_URL', ''), getattr(settings, 'MPESA_CONSUMER_KEY', ''), getattr(settings, 'MPESA_SHORTCODE', ''))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = DarajaClient.from_settings()
+        return _clients[key]
+
+def parse_b2c_result(payload):
+    """
+    The fields of a Daraja B2C result callback ({"Result": {...}}) that
+    settle a payment: originator_conversation_id, success, description,
+    receipt and amount (Decimal, or None when not reported).
+    """
+    result = payload['Result']
+    parameters = {
+        parameter['Key']: parameter.get('Value')
+        for parameter in (result.get('ResultParameters') or {}).get('ResultParameter', [])
+    }
+    amount = parameters.get('TransactionAmount')
+    return {
+        'originator_conversation_id': result['OriginatorConversationID'],
+        'success': str(result.get('ResultCode')) == '0',
+        'description': result.get('ResultDesc', ''),
+        'receipt': parameters.get('TransactionReceipt') or result.get('TransactionID'),
+        'amount': Decimal(str(amount)) if amount is not None else None,
+    }
+
+def disbursement_amount(application, allocated_years=None):
     """
-    Helper function to handle the payment logic.
+    Validates an application for payout.
+    Returns (amount, error) where exactly one is set.
+
+    Once a cycle has an approved budget allocation only its awards are paid;
+    ``allocated_years`` (from approved_allocation_years) saves the lookup
+    when validating many applications.
     """
-    from .models import Payment
-    
-    phone = application.student.phone
-    amount = application.amount_requested
-    
+    # An approved budget allocation overrides the amount requested
+    if application.amount_awarded is not None:
+        amount = application.amount_awarded
+    else:
+        if allocated_years is None:
+            from .allocation import approved_allocation_years
+            allocated_years = approved_allocation_years([application.academic_year])
+        if application.academic_year in allocated_years:
+            return None, "This application is not funded by the cycle's approved budget allocation."
+        amount = application.amount_requested
+
     # Check if student has a phone number
-    if not phone:
-        return False, "Student does not have a registered phone number for M-Pesa."
-        
-    # Initiate M-Pesa Payment
-    mpesa = MpesaClient()
-    response = mpesa.initiate_b2c_payment(phone, amount)
-    
-    if response['status'] == 'Success':
-        # Create Payment Record
-        Payment.objects.create(
-            application=application,
-            amount_awarded=amount,
-            payment_reference=response['transaction_id']
-        )
-        return True, response['transaction_id']
-    
-    return False, "M-Pesa payment failed."
+    if not application.student.phone:
+        return None, "Student does not have a registered phone number for M-Pesa."
+
+    if not amount:
+        return None, "No award was allocated to this application in the approved budget."
+
+    if amount != int(amount):
+        return None, f"M-Pesa pays whole shillings only; KES {amount} must be rounded before it is paid."
+
+    return amount, None
+
+def process_bursary_disbursement(application, user=None):
+    """
+    Pays one application through the same claim-then-pay path as bulk
+    disbursement, so it never races a running job. Returns (success,
+    M-Pesa receipt, or the claim's reference while M-Pesa has yet to confirm
+    the payment, or error).
+    """
+    from .disbursement import DisbursementPipeline
+    from .models import Application, Payment
+
+    summary = DisbursementPipeline(max_workers=1).run([application.pk], user=user)
+    if summary['paid']:
+        return True, Payment.objects.get(application_id=application.pk).payment_reference
+    if summary['awaiting'] and application.pk not in summary['errors']:
+        # Accepted by Daraja; the result callback records the payment
+        return True, Application.objects.values_list('disbursement_reference', flat=True).get(pk=application.pk)
+    return False, summary['errors'].get(application.pk, "This application is not ready for disbursement.")
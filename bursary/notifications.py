@@ -1,31 +1,291 @@
-from django.core.mail import send_mail
+import time
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+from .models import NotificationOutbox, NotificationRun, User
+from .sms import SMSMessage, get_sms_backend
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+def outbox_rows(user, subject, message):
+    """Outbox rows (email and/or SMS) for one notification to ``user``."""
+    rows = []
+    if user.email:
+        rows.append(NotificationOutbox(user=user, channel='email', recipient=user.email, subject=subject, body=message))
+    if getattr(user, 'phone', None):
+        rows.append(NotificationOutbox(user=user, channel='sms', recipient=user.phone, subject=subject, body=f"CBMS: {message}"))
+    return rows
+
+def queue_bursary_notifications(notifications, batch_size=500):
+    """
+    Queues many (user, subject, message) notifications with bulk inserts.
+    Called inside the caller's transaction, so a rolled-back change never
+    notifies anyone.
+    """
+    rows = [row for user, subject, message in notifications for row in outbox_rows(user, subject, message)]
+    NotificationOutbox.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
 def send_bursary_notification(user, subject, message):
     """
-    Sends both Email and SMS notifications to the user.
+    Queues both Email and SMS notifications to the user.
+    Delivery happens in the dispatch_notifications worker.
     """
-    # 1. Send Email
-    if user.email:
+    queue_bursary_notifications([(user, subject, message)])
+
+def application_rejected_notification(application_id, student):
+    subject = "Application Status Update"
+    message = f"We regret to inform you that your application ID {application_id} was not approved. You can view the reason on the dashboard."
+    return student, subject, message
+
+def payment_disbursed_notification(payment, student=None):
+    student = student or payment.application.student
+    subject = "Funds Disbursed!"
+    message = f"Success! Your bursary of KES {payment.amount_awarded} has been disbursed. Payment Reference: {payment.payment_reference}. Please check with your school for fee confirmation."
+    return student, subject, message
+
+def notify_payment_disbursed(payment, student=None):
+    """
+    Tells the student their bursary has been paid.
+    """
+    send_bursary_notification(*payment_disbursed_notification(payment, student))
+
+def requeue_stale_notifications(stale_after=None):
+    """Releases rows claimed by a dispatcher that died mid-batch."""
+    stale_after = stale_after or getattr(settings, 'NOTIFICATION_STALE_AFTER', 300)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return NotificationOutbox.objects.filter(status='sending', locked_at__lt=cutoff).update(status='pending', batch='')
+
+def claim_notifications(batch_size):
+    """
+    Claims up to ``batch_size`` due rows for this dispatcher with a
+    conditional UPDATE, so concurrent dispatchers never send a row twice.
+    """
+    now = timezone.now()
+    ids = list(
+        NotificationOutbox.objects
+        .filter(status='pending', available_at__lte=now)
+        .order_by('pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    batch = uuid.uuid4().hex
+    NotificationOutbox.objects.filter(pk__in=ids, status='pending').update(status='sending', batch=batch, locked_at=now)
+    return list(NotificationOutbox.objects.filter(batch=batch, status='sending').order_by('pk'))
+
+def _deliver(rows, connection):
+    """
+    Sends claimed rows; returns (sent ids, {id: error}). A channel that
+    cannot be reached (the mail server, the SMS gateway) fails only its own
+    rows, so one never marks the other's deliveries for a resend.
+    """
+    sent, failed = [], {}
+    email_rows = [row for row in rows if row.channel == 'email']
+    sms_rows = [row for row in rows if row.channel != 'email']
+    if email_rows:
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Could not reach the mail server: {e}")
+            failed.update((row.pk, str(e)) for row in email_rows)
+            email_rows = []
+    for row in email_rows:
+        try:
+            message = EmailMessage(row.subject, row.body, settings.DEFAULT_FROM_EMAIL, [row.recipient], connection=connection)
+            connection.send_messages([message])
+            sent.append(row.pk)
+        except Exception as e:
+            logger.error(f"Failed to send email to {row.recipient}: {e}")
+            failed[row.pk] = str(e)
+
+    if sms_rows:
+        messages = [SMSMessage(row.recipient, row.body) for row in sms_rows]
         try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
-            logger.info(f"Email sent to {user.email}")
+            with get_sms_backend() as backend:
+                backend.send_messages(messages)
         except Exception as e:
-            logger.error(f"Failed to send email to {user.email}: {e}")
-
-    # 2. Send SMS (Placeholder logic)
-    if hasattr(user, 'phone') and user.phone:
-        # In a real app, you'd call an API like Africa's Talking or Twilio here
-        # For this prototype, we log to console/log file
-        sms_content = f"CBMS: {message}"
-        logger.info(f"SMS to {user.phone}: {sms_content}")
-        # print(f"DEBUG SMS: {user.phone} -> {sms_content}")
+            logger.error(f"Could not reach the SMS gateway: {e}")
+            for message in messages:
+                message.error = message.error or str(e)
+        for row, message in zip(sms_rows, messages):
+            if message.error is None:
+                sent.append(row.pk)
+            else:
+                logger.error(f"Failed to send SMS to {row.recipient}: {message.error}")
+                failed[row.pk] = message.error
+    return sent, failed
+
+def _record_failures(rows, failed, max_attempts):
+    now = timezone.now()
+    for row in rows:
+        if row.pk not in failed:
+            continue
+        row.attempts += 1
+        row.last_error = failed[row.pk]
+        row.batch = ''
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+        else:
+            # Exponential backoff: 1, 2, 4, ... minutes
+            row.status = 'pending'
+            row.available_at = now + timedelta(minutes=2 ** (row.attempts - 1))
+    NotificationOutbox.objects.bulk_update(
+        [row for row in rows if row.pk in failed],
+        ['attempts', 'last_error', 'batch', 'status', 'available_at'],
+    )
+
+def dispatch_notifications(batch_size=None, max_batches=None, max_attempts=None):
+    """
+    Drains the outbox in batches.
+
+    Each batch is claimed atomically and its emails go out over a single
+    SMTP connection. Successful rows are marked sent in one UPDATE; failed
+    rows are retried with backoff until ``max_attempts``.
+
+    Returns a dict of counters: sent, failed, retried, batches.
+    """
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+    max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    summary = {'sent': 0, 'failed': 0, 'retried': 0, 'batches': 0}
+    requeue_stale_notifications()
+    while max_batches is None or summary['batches'] < max_batches:
+        rows = claim_notifications(batch_size)
+        if not rows:
+            break
+        summary['batches'] += 1
+        connection = get_connection(fail_silently=False)
+        try:
+            sent, failed = _deliver(rows, connection)
+        finally:
+            connection.close()
+
+        NotificationOutbox.objects.filter(pk__in=sent).update(status='sent', sent_at=timezone.now(), batch='', attempts=F('attempts') + 1)
+        _record_failures(rows, failed, max_attempts)
+        summary['sent'] += len(sent)
+        summary['failed'] += sum(1 for row in rows if row.pk in failed and row.status == 'failed')
+        summary['retried'] += sum(1 for row in rows if row.pk in failed and row.status == 'pending')
+    return summary
+
+# Delivery errors kept on a NotificationRun
+MAX_RUN_ERRORS = 50
+
+def cycle_audience(cycle, audience):
+    """Students targeted by a mass notification for ``cycle``."""
+    students = User.objects.filter(role='student', is_active=True)
+    if audience == 'applicants':
+        students = students.filter(applications__academic_year=cycle.year).distinct()
+    elif audience == 'pending':
+        students = students.filter(applications__academic_year=cycle.year, applications__status='pending').distinct()
+    return students
+
+class MassNotifier:
+    """
+    Sends one templated event to every student in an audience.
+
+    Messages are rendered from templates/bursary/notifications/<event>_*.txt
+    while recipients are streamed from the database. Email goes out in
+    chunks of ``batch_size`` over one reused SMTP connection, like
+    send_mass_mail(). SMS is handed to the gateway backend, which splits it
+    into provider-sized batches. Delivery counters are stored on a
+    NotificationRun.
+    """
+    TEMPLATE_DIR = 'bursary/notifications'
+
+    def __init__(self, run, batch_size=None):
+        self.run = run
+        self.batch_size = batch_size or getattr(settings, 'MASS_NOTIFICATION_BATCH_SIZE', 500)
+        self.subject = get_template(f"{self.TEMPLATE_DIR}/{run.event}_subject.txt")
+        self.email_body = get_template(f"{self.TEMPLATE_DIR}/{run.event}_email.txt")
+        self.sms_body = get_template(f"{self.TEMPLATE_DIR}/{run.event}_sms.txt")
+        self.connection = None
+
+    def record_error(self, recipient, error):
+        if len(self.run.errors) < MAX_RUN_ERRORS:
+            self.run.errors.append({'recipient': recipient, 'error': error})
+
+    def send_emails(self, messages):
+        # fail_silently connections report how many were accepted without
+        # aborting the chunk, so no message is ever sent twice
+        sent = self.connection.send_messages(messages) or 0
+        self.run.emails_sent += sent
+        if sent < len(messages):
+            self.run.emails_failed += len(messages) - sent
+            self.record_error(f"{len(messages) - sent} of {len(messages)} emails", "Rejected by the mail server")
+            # The connection may be broken; start the next chunk on a fresh one
+            self.connection.close()
+            self.connection.open()
+
+    def send_sms(self, backend, messages):
+        self.run.sms_sent += backend.send_messages(messages)
+        self.run.sms_batches += -(-len(messages) // backend.batch_size)
+        for message in messages:
+            if message.error is not None:
+                self.run.sms_failed += 1
+                self.record_error(message.to, message.error)
+
+    def send(self, progress=None):
+        run = self.run
+        started = time.perf_counter()
+        context = {'cycle': run.cycle, 'note': run.note}
+        subject = self.subject.render(context).strip()
+        recipients = (
+            cycle_audience(run.cycle, run.audience)
+            .order_by('pk')
+            .values_list('first_name', 'username', 'email', 'phone')
+        )
+        self.connection = get_connection(fail_silently=True)
+        emails, texts = [], []
+        try:
+            if run.send_email:
+                self.connection.open()
+            with get_sms_backend() as sms_backend:
+                for first_name, username, email, phone in recipients.iterator(chunk_size=2000):
+                    run.recipients += 1
+                    context['first_name'] = first_name or username
+                    if run.send_email and email:
+                        emails.append(EmailMessage(subject, self.email_body.render(context), settings.DEFAULT_FROM_EMAIL, [email], connection=self.connection))
+                    if run.send_sms and phone:
+                        texts.append(SMSMessage(phone, self.sms_body.render(context).strip()))
+                    if len(emails) >= self.batch_size:
+                        self.send_emails(emails)
+                        emails = []
+                    if len(texts) >= self.batch_size:
+                        self.send_sms(sms_backend, texts)
+                        texts = []
+                    if progress and run.recipients % self.batch_size == 0:
+                        progress(run.recipients)
+                if emails:
+                    self.send_emails(emails)
+                if texts:
+                    self.send_sms(sms_backend, texts)
+            run.status = 'completed'
+        except Exception as e:
+            logger.error(f"Mass notification #{run.pk} failed: {e}")
+            run.status = 'failed'
+            self.record_error(None, str(e))
+            raise
+        finally:
+            self.connection.close()
+            run.duration_seconds = time.perf_counter() - started
+            run.finished_at = timezone.now()
+            run.save()
+        return run
+
+def send_mass_notification(cycle, event, audience='students', send_email=True, send_sms=True, note="", user=None, batch_size=None, progress=None):
+    """Creates a NotificationRun for ``event`` and delivers it."""
+    run = NotificationRun.objects.create(
+        cycle=cycle,
+        event=event,
+        audience=audience,
+        send_email=send_email,
+        send_sms=send_sms,
+        note=note,
+        created_by=user,
+    )
+    return MassNotifier(run, batch_size=batch_size).send(progress=progress)
@@ -0,0 +1,156 @@
+"""
+Keyset (cursor) pagination for long staff listings.
+
+OFFSET pagination makes the database walk past every earlier row, and the
+page count needs a COUNT(*) of the whole table on every request. Here a
+page is fetched as "the next ``per_page`` rows after this (created_at, id)"
+through a composite index, so the last page costs the same as the first.
+The total is an optional estimate that does not scan the table.
+"""
+import base64
+import binascii
+import json
+from django.db import connections
+from django.db.models import Max, Q
+from django.http import Http404
+
+def encode_cursor(direction, values=None):
+    payload = {'d': direction, 'k': values}
+    return base64.urlsafe_b64encode(json.dumps(payload, default=str).encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        direction, values = payload['d'], payload['k']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise Http404("Invalid page cursor.")
+    if direction not in ('next', 'prev'):
+        raise Http404("Invalid page cursor.")
+    return direction, values
+
+def approximate_count(queryset):
+    """
+    Cheap estimate of the rows in ``queryset``'s table: the planner
+    statistics on PostgreSQL, otherwise the highest primary key (exact for
+    append-only tables such as the audit log). None when the queryset is
+    filtered, since neither estimate applies.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 / 0 until the table has been analysed
+        if row and row[0] > 0:
+            return row[0]
+    return queryset.order_by().aggregate(last=Max('pk'))['last'] or 0
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, fields, approximate_total=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.fields = fields
+        self.approximate_total = approximate_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _position(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    @property
+    def next_cursor(self):
+        return encode_cursor('next', self._position(self.object_list[-1])) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor('prev', self._position(self.object_list[0])) if self._has_previous else None
+
+    @property
+    def last_cursor(self):
+        """Cursor of the final page (the oldest rows)."""
+        return encode_cursor('prev')
+
+class KeysetPaginator:
+    """
+    Pages ``queryset`` on ``ordering``, a tuple of descending fields ending
+    in a unique one (e.g. ('-created_at', '-id')), which must be backed by a
+    composite index on the same columns.
+    """
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count_total=True):
+        if not all(field.startswith('-') for field in ordering):
+            raise ValueError("Keyset ordering must be descending on every field.")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [field[1:] for field in self.ordering]
+        self.count_total = count_total
+
+    def _parse(self, values):
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise Http404("Invalid page cursor.")
+        try:
+            return [self.queryset.model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except Exception:
+            raise Http404("Invalid page cursor.")
+
+    def _seek(self, values, lookup):
+        """Rows strictly after ``values`` in (field1, field2, ...) order, for lookup 'lt' or 'gt'."""
+        condition = Q()
+        for index, (name, value) in enumerate(zip(self.fields, values)):
+            step = Q(**{f"{name}__{lookup}": value})
+            for earlier, earlier_value in zip(self.fields[:index], values[:index]):
+                step &= Q(**{earlier: earlier_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        """The page at ``cursor`` (first page when None); one query plus the optional estimate."""
+        direction, values = decode_cursor(cursor) if cursor else ('next', None)
+        if direction == 'next':
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._seek(self._parse(values), 'lt'))
+        else:
+            queryset = self.queryset.order_by(*self.fields)
+            if values is not None:
+                queryset = queryset.filter(self._seek(self._parse(values), 'gt'))
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'next':
+            has_next, has_previous = more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = values is not None, more
+        total = approximate_count(self.queryset) if self.count_total else None
+        return KeysetPage(rows, has_next, has_previous, self.fields, total)
+
+class KeysetPaginationMixin:
+    """
+    ListView pagination by cursor (``?cursor=``) instead of page number.
+    ``page_obj`` in the context is a KeysetPage.
+    """
+    keyset_ordering = ('-created_at', '-id')
+    approximate_total = True
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering, count_total=self.approximate_total)
+        page = paginator.page(self.request.GET.get('cursor') or None)
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,180 @@
+"""
+Query plans of the registered views.
+
+replay_views() requests every page in PLAN_VIEWS through the test client
+and records each SELECT it runs; explain() asks the database for the plan
+of each one. A step is flagged when it reads a whole table or sorts in a
+temporary structure, and suggest_index() proposes a composite index from
+the flagged query's WHERE and ORDER BY columns.
+
+Plans are stored as a JSON snapshot per database vendor (the explain_views
+command); checking against it fails when a query gains a flag it did not
+have, so CI catches a lost index or a changed filter before it ships.
+"""
+import json
+import re
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+# (url name, who requests it, object the URL takes a pk of)
+PLAN_VIEWS = [
+    ('home', None, None),
+    ('about', None, None),
+    ('downloads', None, None),
+    ('public-disbursements', None, None),
+    ('development-projects', None, None),
+    ('dashboard', 'student', None),
+    ('committee-dashboard', 'staff', None),
+    ('staff-application-list', 'staff', None),
+    ('student-application-detail', 'staff', 'application'),
+    ('review-application', 'staff', 'application'),
+    ('financial-history', 'staff', None),
+    ('admin-dashboard', 'staff', None),
+    ('audit-logs', 'staff', None),
+    ('reports', 'staff', None),
+    ('budget-allocation', 'staff', None),
+    ('mpesa-reconciliation', 'staff', None),
+]
+
+# Tables small enough by design (configuration, one row per cycle, a few
+# admin-started runs per cycle) that reading them whole is the right plan
+SMALL_TABLES = {
+    'bursary_bursarycycle', 'bursary_cyclestatistics', 'bursary_screeningpolicy',
+    'bursary_allocationrun', 'bursary_reconciliationrun',
+    'bursary_boardmember', 'bursary_developmentproject', 'bursary_downloadabledocument',
+    'bursary_testimony', 'django_session', 'django_content_type',
+}
+
+def default_snapshot_path():
+    return getattr(settings, 'QUERY_PLAN_SNAPSHOT_DIR', settings.BASE_DIR / 'bursary' / 'plan_snapshots') / f"{connection.vendor}.json"
+
+def fingerprint(sql):
+    """The SQL with IN lists collapsed, so the key does not depend on row counts."""
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+def replay_views(users, objects):
+    """
+    {url name: [(sql, params), ...]} for the SELECTs each view in PLAN_VIEWS
+    runs. ``users`` maps the PLAN_VIEWS roles to users and ``objects`` the
+    object kinds to instances. Caching is disabled so every query runs.
+    """
+    captured = {}
+
+    def record(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            current.append((sql, params))
+        return execute(sql, params, many, context)
+
+    dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=dummy):
+        for name, role, target in PLAN_VIEWS:
+            client = Client()
+            if role:
+                client.force_login(users[role])
+            url = reverse(name, kwargs={'pk': objects[target].pk}) if target else reverse(name)
+            current = []
+            with connection.execute_wrapper(record):
+                response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} answered {response.status_code}")
+            captured[name] = current
+    return captured
+
+def explain(sql, params):
+    """Plan of one query as a list of step descriptions."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[3] for row in rows]
+    return [row[0].strip() for row in rows]
+
+def plan_flags(steps, table=None):
+    """
+    Full scans of tables outside SMALL_TABLES and temporary sorts in
+    ``steps``; sorts are not flagged when ``table`` (the one the query
+    selects from) is small.
+    """
+    flags = []
+    for step in (step.strip() for step in steps):
+        scan = re.match(r'SCAN (\w+)(?: AS \w+)?$', step) or re.match(r'(?:->\s*)?Seq Scan on (\w+)', step)
+        if scan and scan.group(1) not in SMALL_TABLES:
+            flags.append(f"full scan of {scan.group(1)}")
+        elif table not in SMALL_TABLES and ('USE TEMP B-TREE FOR ORDER BY' in step or re.match(r'(?:->\s*)?Sort\b', step)):
+            flags.append("temporary sort")
+    return flags
+
+def _columns(clause, table):
+    return list(dict.fromkeys(re.findall(rf'"{table}"\."(\w+)"', clause)))
+
+def suggest_index(sql, table):
+    """
+    models.Index(...) source for ``table`` built from the query: its columns
+    compared in WHERE (equality first), then its ORDER BY columns. None when
+    the query neither filters nor orders on the table.
+    """
+    where = re.search(r' WHERE (.*?)(?: GROUP BY | ORDER BY | LIMIT |$)', sql)
+    order = re.search(r' ORDER BY (.*?)(?: LIMIT |$)', sql)
+    where = where.group(1) if where else ''
+    equal = re.findall(rf'"{table}"\."(\w+)" (?:= |IN )', where)
+    columns = list(dict.fromkeys(equal + _columns(where, table) + _columns(order.group(1) if order else '', table)))
+    if not columns:
+        return None
+    model = next((model for model in apps.get_models() if model._meta.db_table == table), None)
+    if model is None:
+        return None
+    by_column = {field.column: field.name for field in model._meta.concrete_fields}
+    fields = [by_column.get(column, column) for column in columns]
+    return f"{model.__name__}: models.Index(fields={fields!r})"
+
+def collect_plans(captured):
+    """
+    Snapshot data: {url name: {fingerprint: {'plan': [...], 'flags': [...]}}}
+    plus the index suggestions for the flagged queries.
+    """
+    plans, suggestions = {}, {}
+    for name, queries in captured.items():
+        view_plans = plans.setdefault(name, {})
+        for sql, params in queries:
+            key = fingerprint(sql)
+            if key in view_plans:
+                continue
+            steps = explain(sql, params)
+            table = re.search(r'FROM "(\w+)"', sql)
+            flags = plan_flags(steps, table and table.group(1))
+            view_plans[key] = {'plan': steps, 'flags': flags}
+            for flag in flags:
+                scanned = flag.rsplit(' ', 1)[-1] if flag.startswith('full scan') else table and table.group(1)
+                suggestion = scanned and suggest_index(sql, scanned)
+                if suggestion:
+                    suggestions.setdefault(suggestion, []).append(name)
+    return plans, suggestions
+
+def plan_regressions(snapshot, plans):
+    """
+    Messages for every query whose flags are not in the snapshot: a new
+    query with a flag, or a known one whose plan got worse.
+    """
+    regressions = []
+    for name, view_plans in plans.items():
+        known = snapshot.get(name, {})
+        for key, entry in view_plans.items():
+            added = set(entry['flags']) - set(known.get(key, {}).get('flags', []))
+            if added:
+                regressions.append(f"{name}: {', '.join(sorted(added))} in {key}")
+    return regressions
+
+def load_snapshot(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+def write_snapshot(path, plans):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(plans, handle, indent=2, sort_keys=True)
+        handle.write('\n')
@@ -0,0 +1,223 @@
+import csv
+import heapq
+import io
+import tempfile
+from contextlib import ExitStack
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.db import connections
+from django.db.models.functions import Collate, Trim, Upper
+from django.utils import timezone
+from .models import Payment, ReconciliationIssue
+
+# Statement rows held in memory per sorted run before spilling to disk
+SORT_CHUNK_SIZE = 50000
+
+# Byte-order collation per database backend. UTF-8 byte order is code point
+# order, which is how Python compares the statement references.
+BINARY_COLLATIONS = {
+    'postgresql': 'C',
+    'sqlite': 'BINARY',
+    'mysql': 'utf8mb4_bin',
+    'oracle': 'BINARY',
+}
+
+def normalize_reference(value):
+    return (value or "").strip().upper()
+
+def parse_amount(value):
+    """'-10,000.00' -> Decimal('10000.00'); blank or invalid -> None."""
+    value = (value or "").replace(",", "").replace("KES", "").strip()
+    if not value:
+        return None
+    try:
+        return abs(Decimal(value))
+    except InvalidOperation:
+        return None
+
+def read_statement(handle, reference_column=None, amount_column=None):
+    """
+    Yields (reference, amount, line_number) for every disbursement row of an
+    M-Pesa statement CSV.
+
+    Statement exports start with a preamble (organisation, period, ...), so
+    the header is the first row that contains ``reference_column``. Rows
+    without a reference or an amount in ``amount_column`` are not
+    disbursements and are skipped.
+    """
+    reference_column = reference_column or getattr(settings, 'MPESA_STATEMENT_REFERENCE_COLUMN', 'Receipt No.')
+    amount_column = amount_column or getattr(settings, 'MPESA_STATEMENT_AMOUNT_COLUMN', 'Withdrawn')
+    reader = csv.reader(handle)
+    for header in reader:
+        header = [column.strip() for column in header]
+        if reference_column in header:
+            break
+    else:
+        raise ValueError(f"Statement has no '{reference_column}' column.")
+    if amount_column not in header:
+        raise ValueError(f"Statement has no '{amount_column}' column.")
+    reference_index = header.index(reference_column)
+    amount_index = header.index(amount_column)
+    width = max(reference_index, amount_index)
+
+    for row in reader:
+        if len(row) <= width:
+            continue
+        reference = normalize_reference(row[reference_index])
+        amount = parse_amount(row[amount_index])
+        if reference and amount is not None:
+            yield reference, amount, reader.line_num
+
+def _spill(rows, stack):
+    """Sorts one chunk, writes it to a temp file and returns a reader over it."""
+    rows.sort(key=itemgetter(0, 2))
+    handle = stack.enter_context(tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8'))
+    csv.writer(handle).writerows(rows)
+    handle.seek(0)
+    return ((reference, Decimal(amount), int(line)) for reference, amount, line in csv.reader(handle))
+
+def sort_statement(rows, stack, chunk_size=SORT_CHUNK_SIZE):
+    """
+    External merge sort of statement rows by reference.
+
+    Rows are sorted in chunks of ``chunk_size`` and spilled to temporary
+    files, which are then merged lazily with heapq.merge, so memory is
+    bounded by one chunk plus one row per file. ``stack`` owns the temp files.
+    """
+    runs = []
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            runs.append(_spill(chunk, stack))
+            chunk = []
+    if not runs:
+        chunk.sort(key=itemgetter(0, 2))
+        return iter(chunk)
+    if chunk:
+        runs.append(_spill(chunk, stack))
+    return heapq.merge(*runs, key=itemgetter(0, 2))
+
+def period_payments(date_from=None, date_to=None):
+    payments = Payment.objects.all()
+    if date_from:
+        payments = payments.filter(date_paid__date__gte=date_from)
+    if date_to:
+        payments = payments.filter(date_paid__date__lte=date_to)
+    return payments
+
+def payment_stream(date_from=None, date_to=None, chunk_size=5000):
+    """Yields (reference, amount, payment_id) ordered by payment reference."""
+    previous = ""
+    payments = period_payments(date_from, date_to)
+    # Sort on the normalized reference under a binary collation; the
+    # database's default (e.g. en_US.UTF-8 on PostgreSQL) orders punctuation
+    # and case differently from Python.
+    collation = BINARY_COLLATIONS[connections[payments.db].vendor]
+    ordering = Collate(Upper(Trim('payment_reference')), collation)
+    rows = payments.order_by(ordering).values_list('payment_reference', 'amount_awarded', 'pk').iterator(chunk_size=chunk_size)
+    for reference, amount, pk in rows:
+        reference = normalize_reference(reference)
+        # The merge-join needs both sides in the same order; a database
+        # collation that disagrees with Python's string order would silently
+        # produce false mismatches.
+        if reference < previous:
+            raise ValueError("Payments are not ordered by reference in the database collation used.")
+        previous = reference
+        yield reference, amount, pk
+
+def merge_join(statement_rows, payments):
+    """
+    Walks reference-sorted statement rows and payments in step.
+
+    Yields (reference, entries, payment) where ``entries`` is the list of
+    (amount, line_number) statement rows for the reference (empty when the
+    payment is missing from the statement) and ``payment`` is
+    (amount, payment_id) or None.
+    """
+    groups = ((reference, [row[1:] for row in group]) for reference, group in groupby(statement_rows, key=itemgetter(0)))
+    group = next(groups, None)
+    payment = next(payments, None)
+    while group is not None or payment is not None:
+        if payment is None or (group is not None and group[0] < payment[0]):
+            yield group[0], group[1], None
+            group = next(groups, None)
+        elif group is None or payment[0] < group[0]:
+            yield payment[0], [], payment[1:]
+            payment = next(payments, None)
+        else:
+            yield group[0], group[1], payment[1:]
+            group = next(groups, None)
+            payment = next(payments, None)
+
+def reconcile(run, reference_column=None, amount_column=None, chunk_size=SORT_CHUNK_SIZE, batch_size=1000, progress=None):
+    """
+    Reconciles ``run.statement`` against Payment records and stores the
+    counters and issues on ``run``.
+
+    Both sides are streamed: the statement through an external sort and the
+    payments through a server-side ordered iterator. Issues are written in
+    batches, so memory use does not grow with the size of the statement.
+    """
+    run.status = 'running'
+    run.save(update_fields=['status'])
+    run.issues.all().delete()
+    counters = dict.fromkeys(('statement_rows', 'payment_rows', 'matched_count', 'missing_in_statement_count', 'missing_in_payments_count', 'duplicate_count', 'amount_mismatch_count'), 0)
+    totals = {'statement_total': Decimal(0), 'payments_total': Decimal(0)}
+    issues = []
+
+    def add_issue(kind, reference, **fields):
+        counters[f"{kind}_count"] += 1
+        issues.append(ReconciliationIssue(run=run, kind=kind, reference=reference, **fields))
+        if len(issues) >= batch_size:
+            ReconciliationIssue.objects.bulk_create(issues)
+            issues.clear()
+
+    try:
+        with ExitStack() as stack:
+            handle = stack.enter_context(run.statement.open('rb'))
+            text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+            statement_rows = sort_statement(read_statement(text, reference_column, amount_column), stack, chunk_size)
+            for reference, entries, payment in merge_join(statement_rows, payment_stream(run.period_start, run.period_end)):
+                counters['statement_rows'] += len(entries)
+                totals['statement_total'] += sum(amount for amount, line in entries)
+                if payment is None:
+                    amount, line = entries[0]
+                    add_issue('missing_in_payments', reference, statement_amount=amount, statement_line=line)
+                    for extra_amount, extra_line in entries[1:]:
+                        add_issue('duplicate', reference, statement_amount=extra_amount, statement_line=extra_line)
+                    continue
+
+                payment_amount, payment_id = payment
+                counters['payment_rows'] += 1
+                totals['payments_total'] += payment_amount
+                if not entries:
+                    add_issue('missing_in_statement', reference, payment_id=payment_id, payment_amount=payment_amount)
+                else:
+                    amount, line = entries[0]
+                    for extra_amount, extra_line in entries[1:]:
+                        add_issue('duplicate', reference, payment_id=payment_id, statement_amount=extra_amount, payment_amount=payment_amount, statement_line=extra_line)
+                    if amount != payment_amount:
+                        add_issue('amount_mismatch', reference, payment_id=payment_id, statement_amount=amount, payment_amount=payment_amount, statement_line=line)
+                    else:
+                        counters['matched_count'] += 1
+                if progress:
+                    progress(counters['payment_rows'])
+    except Exception as e:
+        ReconciliationIssue.objects.bulk_create(issues)
+        run.status = 'failed'
+        run.error = str(e)
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    ReconciliationIssue.objects.bulk_create(issues)
+    for field, value in {**counters, **totals}.items():
+        setattr(run, field, value)
+    run.status = 'completed'
+    run.error = ''
+    run.finished_at = timezone.now()
+    run.save()
+    return run
@@ -0,0 +1,140 @@
+"""
+Reporting queries over applications.
+
+Every figure on the reports page, the admin dashboard and the PDF summary
+(counts per status, auto-rejections, the score histogram, averages and
+amounts) comes from one conditional-aggregate query over the selected
+applications, never from a pass over the rows in Python.
+For the default histogram the dashboards read the CycleStatistics rows
+instead, which hold the same figures precomputed.
+"""
+from dataclasses import dataclass
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from .cycle_stats import cycle_statistics
+from .models import Application, CycleStatistics
+
+STATUSES = [status for status, label in Application.STATUS_CHOICES]
+STATUS_LABELS = dict(Application.STATUS_CHOICES)
+
+# Upper edges of the score histogram buckets (last bucket is open-ended)
+DEFAULT_SCORE_EDGES = (20, 40, 60, 80)
+
+AUTO_REJECTED = Q(status='rejected', admin_comments__icontains='AUTO-REJECTION')
+
+def report_score_edges():
+    return tuple(getattr(settings, 'REPORT_SCORE_EDGES', DEFAULT_SCORE_EDGES))
+
+def score_bucket_filters(edges):
+    """One Q per histogram bucket: score <= edges[0], ..., score > edges[-1]."""
+    filters, lower = [], None
+    for edge in edges:
+        filters.append(Q(score__lte=edge) if lower is None else Q(score__gt=lower, score__lte=edge))
+        lower = edge
+    filters.append(Q(score__gt=lower) if lower is not None else Q())
+    return filters
+
+@dataclass
+class ApplicationReport:
+    total: int
+    status_counts: dict
+    auto_rejected: int
+    score_histogram: list
+    average_score: float
+    amount_requested: float
+    amount_disbursed: float
+    payments: int
+    # Not kept in CycleStatistics, so None for reports built from it
+    amount_awarded: float = None
+    bucket_edges: tuple = DEFAULT_SCORE_EDGES
+    academic_year: str = None
+
+    @property
+    def approved(self):
+        """Approved applications, including those already paid."""
+        return self.status_counts.get('approved', 0) + self.status_counts.get('paid', 0)
+
+    @property
+    def approval_rate(self):
+        return (self.approved / self.total * 100) if self.total else 0
+
+    @property
+    def status_labels(self):
+        """Counts keyed by display label, in STATUS_CHOICES order."""
+        return {STATUS_LABELS[status]: self.status_counts.get(status, 0) for status in STATUSES}
+
+    @property
+    def histogram_labels(self):
+        labels, lower = [], 0
+        for edge in self.bucket_edges:
+            labels.append(f"{lower}-{edge}")
+            lower = edge + 1
+        labels.append(f"{lower}+")
+        return labels
+
+def report_aggregates(edges):
+    aggregates = {
+        'total': Count('pk'),
+        **{f"status_{status}": Count('pk', filter=Q(status=status)) for status in STATUSES},
+        'auto_rejected': Count('pk', filter=AUTO_REJECTED),
+        'average_score': Avg('score'),
+        'amount_requested': Sum('amount_requested'),
+        'amount_awarded': Sum('amount_awarded'),
+        'amount_disbursed': Sum('payment_record__amount_awarded'),
+        'payments': Count('payment_record'),
+    }
+    for index, bucket in enumerate(score_bucket_filters(edges)):
+        aggregates[f"bucket_{index}"] = Count('pk', filter=bucket)
+    return aggregates
+
+def _report(values, edges, academic_year=None):
+    return ApplicationReport(
+        total=values['total'],
+        status_counts={status: values[f"status_{status}"] for status in STATUSES},
+        auto_rejected=values['auto_rejected'],
+        score_histogram=[values[f"bucket_{index}"] for index in range(len(edges) + 1)],
+        average_score=values['average_score'] or 0,
+        amount_requested=values['amount_requested'] or 0,
+        amount_awarded=values['amount_awarded'] or 0,
+        amount_disbursed=values['amount_disbursed'] or 0,
+        payments=values['payments'],
+        bucket_edges=edges,
+        academic_year=academic_year,
+    )
+
+def application_report(queryset=None, edges=None):
+    """ApplicationReport for ``queryset`` (every application by default); one query."""
+    edges = tuple(edges) if edges is not None else report_score_edges()
+    queryset = (queryset if queryset is not None else Application.objects.all()).order_by()
+    return _report(queryset.aggregate(**report_aggregates(edges)), edges)
+
+def statistics_report(stats):
+    """ApplicationReport from a CycleStatistics row (default histogram only)."""
+    return ApplicationReport(
+        total=stats.total_applications,
+        status_counts={status: stats.status_count(status) for status in STATUSES},
+        auto_rejected=stats.auto_rejected_count,
+        score_histogram=stats.score_distribution,
+        average_score=stats.avg_score,
+        amount_requested=stats.amount_requested_total,
+        amount_disbursed=stats.disbursed_total,
+        payments=stats.payments_count,
+        bucket_edges=stats.SCORE_BANDS[:-1],
+        academic_year=stats.academic_year or None,
+    )
+
+def dashboard_report(academic_year=None, edges=None):
+    """
+    Report for one cycle (or all) as shown on the dashboards: read from
+    CycleStatistics when the histogram uses its bands, otherwise computed
+    with application_report().
+    """
+    edges = tuple(edges) if edges is not None else report_score_edges()
+    if edges == CycleStatistics.SCORE_BANDS[:-1]:
+        return statistics_report(cycle_statistics(academic_year))
+    queryset = Application.objects.all()
+    if academic_year:
+        queryset = queryset.filter(academic_year=academic_year)
+    report = application_report(queryset, edges)
+    report.academic_year = academic_year
+    return report
@@ -0,0 +1,117 @@
+"""
+Full-text search of applications for staff.
+
+Each application has an ApplicationSearchEntry holding its student's name,
+username and national ID, the school and admission number and the
+guardian's name. The migration indexes that text natively:
+
+* SQLite: an external-content FTS5 table (FTS_TABLE) that triggers on the
+  entry table keep in step, ranked with bm25();
+* PostgreSQL: a GIN index on to_tsvector('simple', document), ranked with
+  ts_rank().
+
+Other backends fall back to a LIKE filter per term. Entries follow the
+source rows through signals; rebuild_search_index rebuilds them all.
+"""
+import re
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import Application, ApplicationSearchEntry
+
+FTS_TABLE = 'bursary_application_fts'
+
+# Columns that make up an application's search document (one joined query per batch)
+SEARCH_COLUMNS = (
+    'pk',
+    'student__first_name',
+    'student__last_name',
+    'student__username',
+    'student__national_id',
+    'student__student_profile__school_name',
+    'student__student_profile__admission_number',
+    'student__student_profile__guardian_name',
+)
+
+def search_result_limit():
+    return getattr(settings, 'APPLICATION_SEARCH_LIMIT', 100)
+
+def search_document(row):
+    """Text indexed for one SEARCH_COLUMNS row."""
+    return ' '.join(value for value in row[1:] if value)
+
+def search_terms(query):
+    """
+    Words of ``query`` as the tokenizers see them. Punctuation separates
+    terms, so "ADM/2023/001" matches however the admission number was typed.
+    """
+    return re.findall(r'\w+', query.casefold())
+
+def index_search_entries(queryset, batch_size=2000):
+    """
+    (Re)builds the search entries of the applications in ``queryset`` with
+    one upsert per batch; the database triggers update the FTS5 table.
+    """
+    rows = queryset.order_by('pk').values_list(*SEARCH_COLUMNS)
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        ApplicationSearchEntry.objects.bulk_create(
+            [ApplicationSearchEntry(application_id=row[0], document=search_document(row)) for row in batch],
+            update_conflicts=True,
+            unique_fields=['application'],
+            update_fields=['document'],
+        )
+        indexed += len(batch)
+    return indexed
+
+def rebuild_search_index():
+    """Rebuilds every entry, then the native index from them. Returns the entry count."""
+    with transaction.atomic():
+        ApplicationSearchEntry.objects.exclude(application__in=Application.objects.all()).delete()
+        indexed = index_search_entries(Application.objects.all())
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return indexed
+
+def _ranked_ids(terms, limit):
+    if connection.vendor == 'sqlite':
+        # Every term as a quoted prefix: "wanj"* "kenya"* (implicit AND)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s"
+        params = [match, limit]
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        sql = (
+            f"SELECT application_id FROM {ApplicationSearchEntry._meta.db_table} "
+            "WHERE to_tsvector('simple', document) @@ to_tsquery('simple', %s) "
+            "ORDER BY ts_rank(to_tsvector('simple', document), to_tsquery('simple', %s)) DESC, application_id DESC LIMIT %s"
+        )
+        params = [tsquery, tsquery, limit]
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= Q(document__icontains=term)
+        return list(ApplicationSearchEntry.objects.filter(condition).order_by('-application_id').values_list('application_id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+def search_applications(query, queryset=None, limit=None):
+    """
+    Applications matching every word of ``query`` (prefixes included), best
+    match first, at most ``limit`` (APPLICATION_SEARCH_LIMIT by default).
+    ``queryset`` chooses what is loaded for the matches, e.g. for_committee().
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    ids = _ranked_ids(terms, limit or search_result_limit())
+    queryset = queryset if queryset is not None else Application.objects.all()
+    applications = queryset.in_bulk(ids)
+    return [applications[pk] for pk in ids if pk in applications]
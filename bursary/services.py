@@ -1,75 +1,341 @@
-from .models import Application, AuditLog
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from operator import itemgetter
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .cycle_stats import refresh_cycle_statistics
+from .models import Application, AuditLog, RescoreRequest, ScreeningPolicy, User, default_income_bands, default_household_bands
+from .notifications import application_rejected_notification, queue_bursary_notifications
 from django.conf import settings
 
+# Per-process cache of compiled policies, keyed by academic year
+_compiled_policies = {}
+
+class CompiledScreeningPolicy:
+    """
+    In-memory evaluator built once from a ScreeningPolicy row.
+    Score bands are kept as sorted lists and resolved with bisect.
+    """
+    DEFAULT_TOKEN = "default"
+
+    __slots__ = (
+        'token', 'required_constituency', 'max_income_threshold',
+        'income_limits', 'income_points', 'household_minimums', 'household_points',
+        'admission_letter_points', 'continuing_points',
+    )
+
+    def __init__(self, token, required_constituency, max_income_threshold, income_bands, household_bands, admission_letter_points, continuing_points):
+        self.token = token
+        self.required_constituency = required_constituency or ""
+        self.max_income_threshold = max_income_threshold
+        income_bands = sorted(income_bands)
+        self.income_limits = [limit for limit, points in income_bands]
+        self.income_points = [points for limit, points in income_bands]
+        household_bands = sorted(household_bands)
+        self.household_minimums = [minimum for minimum, points in household_bands]
+        self.household_points = [points for minimum, points in household_bands]
+        self.admission_letter_points = admission_letter_points
+        self.continuing_points = continuing_points
+
+    @classmethod
+    def from_policy(cls, policy, token):
+        if policy is None:
+            return cls(
+                token,
+                ScreeningService.REQUIRED_CONSTITUENCY,
+                ScreeningService.MAX_INCOME_THRESHOLD,
+                default_income_bands(),
+                default_household_bands(),
+                30,
+                15,
+            )
+        return cls(
+            token,
+            policy.required_constituency,
+            policy.max_income_threshold,
+            policy.income_bands,
+            policy.household_bands,
+            policy.admission_letter_points,
+            policy.continuing_points,
+        )
+
+    def as_params(self):
+        """Constructor arguments (minus the token) that rebuild this policy."""
+        return {
+            'required_constituency': self.required_constituency,
+            'max_income_threshold': self.max_income_threshold,
+            'income_bands': [list(band) for band in zip(self.income_limits, self.income_points)],
+            'household_bands': [list(band) for band in zip(self.household_minimums, self.household_points)],
+            'admission_letter_points': self.admission_letter_points,
+            'continuing_points': self.continuing_points,
+        }
+
+    def income_score(self, income):
+        index = bisect_right(self.income_limits, income)
+        return self.income_points[index] if index < len(self.income_points) else 0
+
+    def household_score(self, household_size):
+        index = bisect_left(self.household_minimums, household_size) - 1
+        return self.household_points[index] if index >= 0 else 0
+
+    def evaluate(self, constituency, has_profile, income, household_size, has_id_card, has_fee_structure, has_admission_letter):
+        """
+        Pure screening rules shared by single and batch screening.
+        Returns (is_passed, reason, score)
+        """
+        if not has_profile:
+            return False, "Student profile is incomplete.", None
+
+        # 1. Constituency Check (Crucial for Bursaries)
+        if self.required_constituency and constituency and constituency.lower() != self.required_constituency.lower():
+            return False, f"This bursary is only for residents of {self.required_constituency} Constituency.", None
+
+        # 2. Income Check (Auto-filter high earners)
+        if income > self.max_income_threshold:
+            return False, "Guardian income exceeds the maximum threshold for this financial aid.", None
+
+        # 3. Document Integrity Check
+        if not has_id_card or not has_fee_structure:
+            return False, "Mandatory documents (ID Card or Fee Structure) are missing or corrupted.", None
+
+        # 4. Automated Vulnerability Scoring (Higher score = More needy)
+        score = self.income_score(income) + self.household_score(household_size)
+        score += self.admission_letter_points if has_admission_letter else self.continuing_points
+        return True, "Passed automated screening.", score
+
 class ScreeningService:
     """
     Automated Eligibility & Screening Engine.
     Filters out invalid applications before they reach the Committee.
     """
-    
-    # Configuration - In a real app, these could be in the database
+
+    # Defaults used when a cycle has no ScreeningPolicy
     MAX_INCOME_THRESHOLD = 150000  # KES
     REQUIRED_CONSTITUENCY = "Central" # Example
-    
+
+    # Columns pulled for cycle-wide screening (one joined query per chunk)
+    SCREENING_COLUMNS = (
+        'pk',
+        'score',
+        'student__constituency',
+        'student__student_profile__id',
+        'student__student_profile__guardian_income',
+        'student__student_profile__household_size',
+        'document_bundle__student_id_card',
+        'document_bundle__fee_structure',
+        'document_bundle__admission_letter',
+        # Recipient of the rejection notice
+        'student_id',
+        'student__email',
+        'student__phone',
+    )
+
     @staticmethod
-    def screen_application(application):
+    def policy_cache_key(academic_year):
+        return f"screening_policy_version:{academic_year}"
+
+    @staticmethod
+    def get_policy(academic_year):
+        """
+        Returns the compiled screening policy for an academic year.
+
+        The compiled evaluator is kept per process and only rebuilt when the
+        policy's version token in the cache changes, so screening does not
+        re-read ScreeningPolicy rows on every call.
+        """
+        key = ScreeningService.policy_cache_key(academic_year)
+        token = cache.get(key)
+        if token is None:
+            row = ScreeningPolicy.objects.filter(cycle__year=academic_year).order_by('-cycle__is_active', '-pk').values_list('pk', 'version').first()
+            token = f"{row[0]}:{row[1]}" if row else CompiledScreeningPolicy.DEFAULT_TOKEN
+            cache.set(key, token, getattr(settings, 'SCREENING_POLICY_VERSION_TTL', 60))
+
+        compiled = _compiled_policies.get(academic_year)
+        if compiled is not None and compiled.token == token:
+            return compiled
+
+        policy = None
+        if token != CompiledScreeningPolicy.DEFAULT_TOKEN:
+            policy = ScreeningPolicy.objects.filter(pk=int(token.split(':')[0])).first()
+            if policy is None:
+                cache.delete(key)
+                token = CompiledScreeningPolicy.DEFAULT_TOKEN
+            else:
+                token = f"{policy.pk}:{policy.version}"
+                cache.set(key, token, getattr(settings, 'SCREENING_POLICY_VERSION_TTL', 60))
+        compiled = CompiledScreeningPolicy.from_policy(policy, token)
+        _compiled_policies[academic_year] = compiled
+        return compiled
+
+    @staticmethod
+    def screen_application(application, commit=True):
         """
         Runs a suite of automated checks.
         Returns (is_passed, reason)
+
+        With ``commit=False`` the new score is only set on the instance and
+        the caller saves it.
         """
         student = application.student
         profile = getattr(student, 'student_profile', None)
         docs = getattr(application, 'document_bundle', None)
 
-        if not profile:
-            return False, "Student profile is incomplete."
+        policy = ScreeningService.get_policy(application.academic_year)
+        passed, reason, score = policy.evaluate(
+            student.constituency,
+            profile is not None,
+            profile.guardian_income if profile else 0,
+            profile.household_size if profile else 0,
+            bool(docs and docs.student_id_card),
+            bool(docs and docs.fee_structure),
+            bool(docs and docs.admission_letter),
+        )
+        if not passed:
+            return False, reason
 
-        # 1. Constituency Check (Crucial for Bursaries)
-        if student.constituency and student.constituency.lower() != ScreeningService.REQUIRED_CONSTITUENCY.lower():
-            return False, f"This bursary is only for residents of {ScreeningService.REQUIRED_CONSTITUENCY} Constituency."
+        if application.score != score:
+            application.score = score
+            if commit:
+                application.save(update_fields=['score', 'updated_at'])
 
-        # 2. Income Check (Auto-filter high earners)
-        if profile.guardian_income > ScreeningService.MAX_INCOME_THRESHOLD:
-            return False, "Guardian income exceeds the maximum threshold for this financial aid."
+        return True, reason
 
-        # 3. Document Integrity Check
-        if not docs or not docs.student_id_card or not docs.fee_structure:
-            return False, "Mandatory documents (ID Card or Fee Structure) are missing or corrupted."
-
-        # 4. Automated Vulnerability Scoring (The "Smart" Difference)
-        # Higher score = More needy
-        score = 0
-        
-        # Income Factor (Max 40 points)
-        if profile.guardian_income < 20000: score += 40
-        elif profile.guardian_income < 50000: score += 25
-        elif profile.guardian_income < 80000: score += 10
-        
-        # Household Size Factor (Max 30 points)
-        if profile.household_size > 6: score += 30
-        elif profile.household_size > 4: score += 15
-        else: score += 5
-        
-        # Document Presence Bonus (Max 30 points)
-        if docs.admission_letter: score += 30 # First-time applicants get priority
-        else: score += 15 # Continuing students
-
-        application.score = score
-        application.save()
-
-        return True, "Passed automated screening."
-
-def apply_auto_screening(application):
+    @staticmethod
+    def _screen_rows(rows, policy, summary, batch_size):
+        """
+        Scores one chunk of SCREENING_COLUMNS rows and writes changed outcomes.
+        Bulk updates fire no post_save, so rejected students are notified
+        here, through the outbox in the caller's transaction.
+        """
+        (pks, scores, constituencies, profile_ids, incomes, household_sizes,
+         id_cards, fee_structures, admission_letters, student_ids, emails, phones) = zip(*rows)
+        results = list(map(
+            policy.evaluate,
+            constituencies,
+            [profile_id is not None for profile_id in profile_ids],
+            [income or 0 for income in incomes],
+            [size or 0 for size in household_sizes],
+            map(bool, id_cards),
+            map(bool, fee_structures),
+            map(bool, admission_letters),
+        ))
+
+        now = timezone.now()
+        scored, rejected, logs, notices = [], [], [], []
+        for pk, old_score, (passed, reason, score), student_id, email, phone in zip(pks, scores, results, student_ids, emails, phones):
+            if passed:
+                summary['passed'] += 1
+                if score != old_score:
+                    scored.append(Application(pk=pk, score=score, updated_at=now))
+            else:
+                summary['rejected'] += 1
+                rejected.append(Application(
+                    pk=pk,
+                    status='rejected',
+                    admin_comments=f"AUTO-REJECTION: {reason}",
+                    updated_at=now,
+                ))
+                logs.append(AuditLog(
+                    user=None, # System action
+                    action="System Auto-Rejection",
+                    details=f"App ID {pk} rejected: {reason}",
+                ))
+                notices.append(application_rejected_notification(pk, User(pk=student_id, email=email, phone=phone)))
+
+        Application.objects.bulk_update(scored, ['score', 'updated_at'], batch_size=batch_size)
+        Application.objects.bulk_update(rejected, ['status', 'admin_comments', 'updated_at'], batch_size=batch_size)
+        AuditLog.objects.bulk_create(logs, batch_size=batch_size)
+        queue_bursary_notifications(notices, batch_size=batch_size)
+
+        summary['screened'] += len(rows)
+        summary['updated'] += len(scored) + len(rejected)
+
+    @staticmethod
+    def screen_cycle(academic_year, chunk_size=2000, statuses=('pending',)):
+        """
+        Re-screens every application of a cycle in bulk.
+
+        Candidates are read in pk-ordered chunks with a single joined
+        ``values_list`` query each, scored column-wise against the cycle's
+        compiled policy, and written back with
+        ``bulk_update`` / ``bulk_create``. Only rows whose outcome changed are
+        written. Model signals are not fired for batch writes, so the cycle's
+        statistics row is recomputed once at the end.
+
+        Returns a dict of counters: screened, passed, rejected, updated.
+        """
+        summary = {'screened': 0, 'passed': 0, 'rejected': 0, 'updated': 0}
+        policy = ScreeningService.get_policy(academic_year)
+        queryset = (
+            Application.objects
+            .filter(academic_year=academic_year, status__in=statuses)
+            .order_by('pk')
+            .values_list(*ScreeningService.SCREENING_COLUMNS)
+        )
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            with transaction.atomic():
+                ScreeningService._screen_rows(rows, policy, summary, chunk_size)
+
+        if summary['updated']:
+            refresh_cycle_statistics([academic_year])
+        return summary
+
+    @staticmethod
+    def rescore_queued(chunk_size=500):
+        """
+        Drains the RescoreRequest queue filled by profile/document edits.
+
+        Each chunk of requests is de-duplicated, the still-pending
+        applications are re-screened with their cycle's policy, and the
+        processed requests are deleted in the same transaction. Requests
+        queued while a chunk is running are left for the next pass.
+        """
+        summary = {'screened': 0, 'passed': 0, 'rejected': 0, 'updated': 0}
+        while True:
+            requests = list(RescoreRequest.objects.order_by('pk').values_list('pk', 'application_id')[:chunk_size])
+            if not requests:
+                break
+            request_pks, application_ids = zip(*requests)
+            rows = (
+                Application.objects
+                .filter(pk__in=set(application_ids), status='pending')
+                .order_by('academic_year', 'pk')
+                .values_list('academic_year', *ScreeningService.SCREENING_COLUMNS)
+            )
+            with transaction.atomic():
+                updated, academic_years = summary['updated'], []
+                for academic_year, group in groupby(rows, key=itemgetter(0)):
+                    policy = ScreeningService.get_policy(academic_year)
+                    ScreeningService._screen_rows([row[1:] for row in group], policy, summary, chunk_size)
+                    academic_years.append(academic_year)
+                if summary['updated'] > updated:
+                    refresh_cycle_statistics(academic_years)
+                RescoreRequest.objects.filter(pk__in=request_pks).delete()
+        return summary
+
+def apply_auto_screening(application, commit=True):
     """
     Main entry point for screening.
+
+    The outcome (new score, or rejection) is written in a single save; with
+    ``commit=False`` it is only set on the instance for the caller to save.
     """
-    passed, reason = ScreeningService.screen_application(application)
-    
+    original_score = application.score
+    passed, reason = ScreeningService.screen_application(application, commit=False)
+
     if not passed:
         application.status = 'rejected'
         application.admin_comments = f"AUTO-REJECTION: {reason}"
-        application.save()
-        
+        if commit:
+            application.save(update_fields=['status', 'admin_comments', 'updated_at'])
+
         # Log the auto-rejection
         AuditLog.objects.create(
             user=None, # System action
@@ -77,5 +343,7 @@ def apply_auto_screening(application):
             details=f"App ID {application.id} rejected: {reason}"
         )
         return False, reason
-    
+
+    if commit and application.score != original_score:
+        application.save(update_fields=['score', 'updated_at'])
     return True, "Application is eligible for review."
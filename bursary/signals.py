@@ -1,10 +1,17 @@
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Application, Payment
-from .notifications import send_bursary_notification
+from .models import User, StudentProfile, Application, ApplicationDocument, Payment, BursaryCycle, ScreeningPolicy, RescoreRequest, Testimony, BoardMember, DownloadableDocument, DevelopmentProject
+from .notifications import application_rejected_notification, send_bursary_notification, notify_payment_disbursed
+from .services import ScreeningService
+from .duplicates import index_applications
+from .search import index_search_entries
+from .artifacts import EXPORTED_PROFILE_FIELDS, EXPORTED_USER_FIELDS, expire_export_artifacts
+from .caching import groups_for_model, invalidate_public_pages
+from .cycle_stats import SOURCE_FIELDS, application_state, apply_deltas, record_application_change, refresh_cycle_statistics
 
 @receiver(post_save, sender=Application)
-def application_status_changed(sender, instance, created, **kwargs):
+def application_status_changed(sender, instance, created, update_fields=None, **kwargs):
     """
     Triggers notifications when an application is created or its status changes.
     """
@@ -13,17 +20,33 @@ def application_status_changed(sender, instance, created, **kwargs):
         subject = "Bursary Application Received"
         message = f"Hello {instance.student.get_full_name()}, your application for the {instance.academic_year} academic year has been successfully submitted and is pending review."
         send_bursary_notification(instance.student, subject, message)
-    else:
-        # Check if status has changed (simplified, for a better way use django-model-utils or similar)
-        # For this prototype, we'll notify for key transitions
-        if instance.status == 'recommended':
-            subject = "Application Recommended"
-            message = f"Great news! Your application ID {instance.id} has been recommended by the committee for final approval."
-            send_bursary_notification(instance.student, subject, message)
-        elif instance.status == 'rejected':
-            subject = "Application Status Update"
-            message = f"We regret to inform you that your application ID {instance.id} was not approved. You can view the reason on the dashboard."
-            send_bursary_notification(instance.student, subject, message)
+        return
+
+    # Only real transitions notify; re-saving a recommended or rejected
+    # application (score, comments, documents) must not notify again.
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if not instance.has_changed('status'):
+        return
+    if instance.status == 'recommended':
+        subject = "Application Recommended"
+        message = f"Great news! Your application ID {instance.id} has been recommended by the committee for final approval."
+        send_bursary_notification(instance.student, subject, message)
+    elif instance.status == 'rejected':
+        send_bursary_notification(*application_rejected_notification(instance.id, instance.student))
+
+@receiver(post_save, sender=Application)
+def application_identity_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Fingerprints are filed under the application's cycle, so they are
+    rebuilt on creation and when the academic year changes.
+    """
+    if not created:
+        if update_fields is not None and 'academic_year' not in update_fields:
+            return
+        if not instance.has_changed('academic_year'):
+            return
+    index_applications(Application.objects.filter(pk=instance.pk))
 
 @receiver(post_save, sender=Payment)
 def payment_disbursed(sender, instance, created, **kwargs):
@@ -31,7 +54,164 @@ def payment_disbursed(sender, instance, created, **kwargs):
     Triggers notification when a payment record is created (funds disbursed).
     """
     if created:
-        application = instance.application
-        subject = "Funds Disbursed!"
-        message = f"Success! Your bursary of KES {instance.amount_awarded} has been disbursed. Payment Reference: {instance.payment_reference}. Please check with your school for fee confirmation."
-        send_bursary_notification(application.student, subject, message)
+        notify_payment_disbursed(instance)
+
+@receiver(post_save, sender=ScreeningPolicy)
+@receiver(post_delete, sender=ScreeningPolicy)
+def screening_policy_changed(sender, instance, **kwargs):
+    """
+    Drops the cached version token so workers recompile the policy on their
+    next screening call (or after SCREENING_POLICY_VERSION_TTL with a
+    per-process cache backend).
+    """
+    try:
+        academic_year = instance.cycle.year
+    except BursaryCycle.DoesNotExist:
+        # Cycle deleted in the same cascade; stale tokens fall back to defaults
+        return
+    cache.delete(ScreeningService.policy_cache_key(academic_year))
+
+@receiver(post_save, sender=User)
+def user_screening_inputs_changed(sender, instance, created, **kwargs):
+    """
+    Queues pending applications for re-scoring when the constituency changes
+    and refreshes their identity fingerprints when the phone changes.
+    """
+    changed = instance.changed_fields()
+    if created:
+        return
+    if changed.intersection(User.screening_fields):
+        RescoreRequest.enqueue(instance.applications.all(), reason="Constituency updated")
+    if changed.intersection(User.identity_fields):
+        index_applications(instance.applications.all())
+
+@receiver(post_save, sender=StudentProfile)
+def profile_screening_inputs_changed(sender, instance, created, **kwargs):
+    """
+    Queues pending applications for re-scoring when income or household size
+    changes and refreshes identity fingerprints when guardian or admission
+    details change.
+    """
+    applications = Application.objects.filter(student_id=instance.user_id)
+    changed = instance.changed_fields()
+    screening_changes = changed.intersection(StudentProfile.screening_fields)
+    if not created and screening_changes:
+        RescoreRequest.enqueue(applications, reason=f"Profile updated: {', '.join(sorted(screening_changes))}")
+    if created or changed.intersection(StudentProfile.identity_fields):
+        index_applications(applications)
+
+@receiver(post_save, sender=ApplicationDocument)
+def documents_screening_inputs_changed(sender, instance, created, **kwargs):
+    """
+    Queues the application for re-scoring when its mandatory or bonus documents change.
+    """
+    changed = instance.changed_fields()
+    if not created and changed:
+        RescoreRequest.enqueue(
+            Application.objects.filter(pk=instance.application_id),
+            reason=f"Documents updated: {', '.join(sorted(changed))}"
+        )
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=StudentProfile)
+def expire_exports_on_student_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Exports include student and profile columns, which do not move the
+    application fingerprint, so cached export files are dropped instead,
+    but only when an exported value actually changed (logins, password
+    changes and profile edits of other fields keep the cache).
+    """
+    if created:
+        return  # New accounts have no applications; students set up their profile before applying
+    exported = EXPORTED_USER_FIELDS if sender is User else EXPORTED_PROFILE_FIELDS
+    changed = instance.changed_fields()
+    if update_fields is not None:
+        changed &= set(update_fields)
+    if exported & changed:
+        expire_export_artifacts()
+
+@receiver(post_save, sender=Application)
+def application_statistics_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Moves the cycle counters from the application's previous state to its
+    new one, inside the transaction of the save.
+    """
+    new = application_state(instance)
+    if created:
+        record_application_change(None, new)
+        return
+    if not all(instance.has_original(field) for field in SOURCE_FIELDS):
+        # Not loaded through the ORM (or fields deferred): recount its cycle
+        refresh_cycle_statistics({new['academic_year'], instance.get_original('academic_year', new['academic_year'])})
+        return
+    old = {field: instance.get_original(field) for field in SOURCE_FIELDS}
+    if update_fields is not None:
+        # Fields left out of update_fields were not written
+        new = {field: new[field] if field in update_fields else old[field] for field in SOURCE_FIELDS}
+    if old != new:
+        record_application_change(old, new)
+
+@receiver(post_delete, sender=Application)
+def application_statistics_deleted(sender, instance, **kwargs):
+    record_application_change(application_state(instance), None)
+
+@receiver(post_save, sender=Payment)
+def payment_statistics_changed(sender, instance, created, **kwargs):
+    academic_year = instance.application.academic_year
+    if created:
+        apply_deltas(academic_year, {'payments_count': 1, 'disbursed_total': instance.amount_awarded})
+    else:
+        refresh_cycle_statistics([academic_year])
+
+@receiver(post_delete, sender=Payment)
+def payment_statistics_deleted(sender, instance, **kwargs):
+    academic_year = Application.objects.filter(pk=instance.application_id).values_list('academic_year', flat=True).first()
+    if academic_year is not None:
+        apply_deltas(academic_year, {'payments_count': -1, 'disbursed_total': -instance.amount_awarded})
+
+@receiver(post_save, sender=Testimony)
+@receiver(post_delete, sender=Testimony)
+@receiver(post_save, sender=BoardMember)
+@receiver(post_delete, sender=BoardMember)
+@receiver(post_save, sender=DownloadableDocument)
+@receiver(post_delete, sender=DownloadableDocument)
+@receiver(post_save, sender=DevelopmentProject)
+@receiver(post_delete, sender=DevelopmentProject)
+@receiver(post_save, sender=BursaryCycle)
+@receiver(post_delete, sender=BursaryCycle)
+def public_content_changed(sender, instance, **kwargs):
+    """
+    Invalidates the cached public pages that show ``instance``. Download
+    counters are bumped with update(), so previews do not invalidate the
+    downloads page; its counts refresh with PUBLIC_PAGE_CACHE_TIMEOUT.
+    """
+    invalidate_public_pages(*groups_for_model(sender))
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=StudentProfile)
+def testimony_author_changed(sender, instance, update_fields=None, **kwargs):
+    """Names, photos and schools of testimony authors appear on the home page."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    if Testimony.objects.filter(user_id=user_id).exists():
+        invalidate_public_pages('testimonies')
+
+@receiver(post_save, sender=Application)
+def application_search_entry_created(sender, instance, created, **kwargs):
+    if created:
+        index_search_entries(Application.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=StudentProfile)
+def search_fields_changed(sender, instance, created, **kwargs):
+    """
+    Re-indexes the student's applications when a searched field changes;
+    deleted applications drop their entries by cascade.
+    """
+    if created and sender is User:
+        return  # A new account has no applications to index yet
+    if not created and not instance.changed_fields().intersection(sender.search_fields):
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    index_search_entries(Application.objects.filter(student_id=user_id))
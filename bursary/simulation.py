@@ -0,0 +1,206 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import accumulate
+from django.core.exceptions import ValidationError
+from .models import Application, BursaryCycle, validate_bands
+from .services import CompiledScreeningPolicy, ScreeningService
+
+# Upper edges of the score histogram buckets (last bucket is open-ended)
+DEFAULT_SCORE_EDGES = (20, 40, 60, 80)
+
+# Policy parameters a scenario may override (see CompiledScreeningPolicy.as_params)
+POLICY_PARAMETERS = (
+    'required_constituency', 'max_income_threshold', 'income_bands',
+    'household_bands', 'admission_letter_points', 'continuing_points',
+)
+NUMERIC_PARAMETERS = ('max_income_threshold', 'admission_letter_points', 'continuing_points')
+
+
+def check_overrides(overrides):
+    """
+    Raises ValueError unless ``overrides`` is a dict of known policy
+    parameters with usable values, so a bad scenario is reported by name
+    instead of failing halfway through a run.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError(f"A scenario must be an object of policy parameters, got {overrides!r}.")
+    unknown = sorted(set(overrides) - set(POLICY_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown policy parameter(s): {', '.join(unknown)}. Expected one of: {', '.join(POLICY_PARAMETERS)}.")
+    for name in NUMERIC_PARAMETERS:
+        value = overrides.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float, Decimal))):
+            raise ValueError(f"{name} must be a number, got {value!r}.")
+    for name, bound in (('income_bands', 'upper_limit'), ('household_bands', 'min_size')):
+        bands = overrides.get(name)
+        if bands is None:
+            continue
+        try:
+            # The compiled policy sorts bands itself, so order is not an error here
+            validate_bands(sorted(bands) if isinstance(bands, list) else bands, bound)
+        except TypeError:
+            raise ValueError(f"{name}: Each band must be a [{bound}, points] pair of numbers.")
+        except ValidationError as error:
+            raise ValueError(f"{name}: {' '.join(error.messages)}")
+
+@dataclass
+class SimulationResult:
+    total: int
+    passed: int
+    rejected: dict
+    score_histogram: list
+    average_score: float
+    projected_spend: float
+    planned_budget: float
+    bucket_edges: tuple = DEFAULT_SCORE_EDGES
+    parameters: dict = field(default_factory=dict)
+
+    @property
+    def budget_gap(self):
+        """Positive when the projected spend exceeds the planned budget."""
+        return self.projected_spend - self.planned_budget
+
+    @property
+    def pass_rate(self):
+        return (self.passed / self.total * 100) if self.total else 0
+
+    @property
+    def histogram_labels(self):
+        labels, lower = [], 0
+        for edge in self.bucket_edges:
+            labels.append(f"{lower}-{edge}")
+            lower = edge + 1
+        labels.append(f"{lower}+")
+        return labels
+
+class ScreeningSimulator:
+    """
+    Read-only "what-if" evaluation of screening parameters for one cycle.
+
+    The cycle's screening inputs are loaded once and grouped by everything
+    except guardian income (profile present, constituency, household size,
+    documents). Each group keeps its incomes sorted in a compact array with
+    running totals of the amounts requested, so a parameter set is resolved
+    with a handful of bisects per group instead of a pass over every row.
+    """
+
+    def __init__(self, academic_year, bucket_edges=DEFAULT_SCORE_EDGES):
+        self.academic_year = academic_year
+        self.bucket_edges = tuple(bucket_edges)
+        self.base_policy = ScreeningService.get_policy(academic_year)
+        cycle = BursaryCycle.objects.filter(year=academic_year).order_by('-is_active', '-pk').first()
+        self.planned_budget = float(cycle.planned_budget) if cycle else 0.0
+        self.total = 0
+        self.groups = self._load()
+
+    def _load(self):
+        rows = (
+            Application.objects
+            .filter(academic_year=self.academic_year)
+            .values_list(
+                'student__constituency',
+                'student__student_profile__id',
+                'student__student_profile__guardian_income',
+                'student__student_profile__household_size',
+                'document_bundle__student_id_card',
+                'document_bundle__fee_structure',
+                'document_bundle__admission_letter',
+                'amount_requested',
+            )
+        )
+        buckets = defaultdict(list)
+        for constituency, profile_id, income, household_size, id_card, fee_structure, admission_letter, amount in rows.iterator(chunk_size=5000):
+            key = (
+                profile_id is not None,
+                (constituency or "").lower(),
+                household_size or 0,
+                bool(id_card) and bool(fee_structure),
+                bool(admission_letter),
+            )
+            buckets[key].append((float(income or 0), float(amount)))
+            self.total += 1
+
+        groups = {}
+        for key, values in buckets.items():
+            values.sort()
+            incomes = array('d', (income for income, amount in values))
+            # cumulative[i] = total requested by the first i rows
+            cumulative = array('d', accumulate((amount for income, amount in values), initial=0.0))
+            groups[key] = (incomes, cumulative)
+        return groups
+
+    def policy_for(self, overrides):
+        """
+        Builds a compiled policy from the cycle's current policy plus
+        ``overrides``. A parameter left out keeps its current value; one
+        given, even as "" (no constituency restriction), replaces it.
+        Raises ValueError for a malformed scenario (see check_overrides).
+        """
+        check_overrides(overrides)
+        params = self.base_policy.as_params()
+        params.update({name: value for name, value in overrides.items() if value is not None})
+        return CompiledScreeningPolicy("simulation", **params)
+
+    def run(self, overrides=None):
+        """Evaluates one parameter set and returns a SimulationResult."""
+        overrides = overrides or {}
+        policy = self.policy_for(overrides)
+        required = policy.required_constituency.lower()
+        threshold = float(policy.max_income_threshold)
+        income_limits = [float(limit) for limit in policy.income_limits]
+
+        rejected = {'profile': 0, 'constituency': 0, 'income': 0, 'documents': 0}
+        score_counts = defaultdict(int)
+        passed = 0
+        spend = 0.0
+
+        for (has_profile, constituency, household_size, docs_ok, has_admission), (incomes, cumulative) in self.groups.items():
+            size = len(incomes)
+            if not has_profile:
+                rejected['profile'] += size
+                continue
+            if required and constituency and constituency != required:
+                rejected['constituency'] += size
+                continue
+            # Rows [0, cutoff) are at or below the income threshold
+            cutoff = bisect_right(incomes, threshold)
+            rejected['income'] += size - cutoff
+            if not docs_ok:
+                rejected['documents'] += cutoff
+                continue
+
+            base = policy.household_score(household_size)
+            base += policy.admission_letter_points if has_admission else policy.continuing_points
+            start = 0
+            for limit, points in zip(income_limits, policy.income_points):
+                end = min(bisect_left(incomes, limit), cutoff)
+                if end > start:
+                    score_counts[base + points] += end - start
+                    start = end
+            if cutoff > start:
+                score_counts[base] += cutoff - start
+            passed += cutoff
+            spend += cumulative[cutoff]
+
+        histogram = [0] * (len(self.bucket_edges) + 1)
+        for score, count in score_counts.items():
+            histogram[bisect_left(self.bucket_edges, score)] += count
+        score_total = sum(score * count for score, count in score_counts.items())
+
+        return SimulationResult(
+            total=self.total,
+            passed=passed,
+            rejected=rejected,
+            score_histogram=histogram,
+            average_score=(score_total / passed) if passed else 0,
+            projected_spend=spend,
+            planned_budget=self.planned_budget,
+            bucket_edges=self.bucket_edges,
+            parameters=overrides,
+        )
+
+    def run_many(self, scenarios):
+        return [self.run(overrides) for overrides in scenarios]
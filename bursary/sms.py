@@ -0,0 +1,99 @@
+"""
+Pluggable SMS gateway backends, modelled on Django's email backends.
+
+SMS_BACKEND names the backend class and SMS_BATCH_SIZE how many messages
+the provider accepts per API call. Callers hand a list of SMSMessage to
+send_messages(); backends send them in provider-sized batches and set
+``error`` on the messages that were not accepted.
+"""
+import logging
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Messages captured by LocmemSMSBackend
+outbox = []
+
+class SMSMessage:
+    __slots__ = ('to', 'body', 'error')
+
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+        self.error = None
+
+    def __repr__(self):
+        return f"SMSMessage(to={self.to!r})"
+
+class BaseSMSBackend:
+    def __init__(self, batch_size=None, fail_silently=False, **kwargs):
+        self.batch_size = batch_size or getattr(settings, 'SMS_BATCH_SIZE', 100)
+        self.fail_silently = fail_silently
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_batch(self, messages):
+        """Sends one provider call's worth of messages. Override in backends."""
+        raise NotImplementedError
+
+    def send_messages(self, messages):
+        """
+        Sends ``messages`` in batches of ``batch_size`` and returns how many
+        were accepted. A batch that raises marks all its messages failed.
+        """
+        sent = 0
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start:start + self.batch_size]
+            try:
+                self.send_batch(batch)
+            except Exception as e:
+                if not self.fail_silently:
+                    logger.error(f"SMS batch of {len(batch)} failed: {e}")
+                for message in batch:
+                    message.error = str(e)
+            sent += sum(1 for message in batch if message.error is None)
+        return sent
+
+class LogSMSBackend(BaseSMSBackend):
+    """Writes messages to the log instead of a provider (development default)."""
+    def send_batch(self, messages):
+        for message in messages:
+            logger.info(f"SMS to {message.to}: {message.body}")
+
+class LocmemSMSBackend(BaseSMSBackend):
+    """
+    Local stand-in gateway: keeps messages in ``bursary.sms.outbox`` and the
+    size of every provider call in ``batches``. Numbers listed in
+    ``reject`` are refused individually, like an invalid MSISDN.
+    """
+    batches = []
+    reject = set()
+
+    def send_batch(self, messages):
+        LocmemSMSBackend.batches.append(len(messages))
+        for message in messages:
+            if message.to in LocmemSMSBackend.reject:
+                message.error = "Invalid phone number"
+            else:
+                outbox.append(message)
+
+def get_sms_backend(backend=None, **kwargs):
+    backend_class = import_string(backend or getattr(settings, 'SMS_BACKEND', 'bursary.sms.LogSMSBackend'))
+    return backend_class(**kwargs)
+
+def send_sms(phone, message):
+    """Sends a single SMS through the configured backend; True if accepted."""
+    with get_sms_backend() as backend:
+        return backend.send_messages([SMSMessage(phone, message)]) == 1
@@ -1,10 +1,47 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from bursary.models import AuditLog, Application, Payment, StudentProfile, ApplicationDocument
+from bursary.models import AuditLog, Application, Payment, StudentProfile, ApplicationDocument, BursaryCycle, ScreeningPolicy, RescoreRequest, IdentityFingerprint, BackgroundJob, ReconciliationRun, NotificationOutbox, ExportArtifact, CycleStatistics, Testimony, BoardMember, DownloadableDocument, ApplicationSearchEntry, AllocationRun
 from django.core import mail
-from bursary.services import apply_auto_screening
+from django.core.cache import cache
+from bursary.services import apply_auto_screening, ScreeningService
+from bursary.duplicates import find_duplicate_clusters, normalize_phone
+from bursary.simulation import ScreeningSimulator
+from bursary.allocation import compute_allocation, propose_allocation, approve_allocation
+from bursary.notifications import dispatch_notifications, send_bursary_notification, send_mass_notification
+from bursary import sms
+from bursary.mpesa import process_bursary_disbursement, DarajaClient, get_mpesa_client
+from bursary.daraja_stub import DarajaStubServer
+from bursary.disbursement import DisbursementPipeline, TokenBucket, claim_applications
+from bursary.reconciliation import payment_stream, read_statement, reconcile
+from bursary.artifacts import EXPORTED_PROFILE_FIELDS, EXPORTED_USER_FIELDS, expire_export_artifacts, prune_export_artifacts
+from bursary.reports import report_totals, write_cycle_report_pdf
+from bursary.cycle_stats import COUNTER_FIELDS, cycle_statistics, refresh_cycle_statistics
+from bursary.reporting import application_report, dashboard_report
+from bursary.pagination import KeysetPaginator
+from bursary.query_plans import explain, plan_flags, plan_regressions, suggest_index
+from bursary.search import search_applications
+from bursary.jobs import JobHeartbeat, JobProgress, claim_next_job, enqueue_job, requeue_stale_jobs, run_job, run_pending_jobs
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from array import array
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -70,6 +107,7 @@ class NotificationTests(TestCase):
             academic_year='2025/2026',
             amount_requested=5000
         )
+        dispatch_notifications()
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("Application Received", mail.outbox[0].subject)
 
@@ -79,6 +117,7 @@ class NotificationTests(TestCase):
             academic_year='2025/2026',
             amount_requested=5000
         )
+        dispatch_notifications()
         mail.outbox = [] # Clear outbox
         
         Payment.objects.create(
@@ -86,6 +125,7 @@ class NotificationTests(TestCase):
             amount_awarded=5000,
             payment_reference='TXN123'
         )
+        dispatch_notifications()
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("Funds Disbursed", mail.outbox[0].subject)
 
@@ -143,3 +183,1866 @@ class ScreeningTests(TestCase):
         self.assertTrue(passed)
         # Score should be high for low income (40 for income + 15 for hh size + 15 for continuing docs)
         self.assertGreaterEqual(app.score, 70)
+
+class BatchScreeningTests(TestCase):
+    def setUp(self):
+        self.applications = []
+        for i, (constituency, income) in enumerate([('Central', 5000), ('Central', 60000), ('WrongPlace', 5000), ('Central', 200000)]):
+            student = User.objects.create_user(
+                username=f'batch_student_{i}',
+                email=f'batch_{i}@example.com',
+                password='password123',
+                constituency=constituency
+            )
+            StudentProfile.objects.create(
+                user=student,
+                school_name='UON',
+                admission_number=f'C01/{i}',
+                guardian_income=income,
+                household_size=5
+            )
+            app = Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000
+            )
+            ApplicationDocument.objects.create(
+                application=app,
+                student_id_card=ContentFile(b"fake_id", name="id.png"),
+                fee_structure=ContentFile(b"fake_fee", name="fee.png")
+            )
+            self.applications.append(app)
+
+    def test_screen_cycle_matches_single_screening(self):
+        summary = ScreeningService.screen_cycle('2025/2026', chunk_size=2)
+        self.assertEqual(summary['screened'], 4)
+        self.assertEqual(summary['passed'], 2)
+        self.assertEqual(summary['rejected'], 2)
+
+        low, mid, wrong_place, high = [Application.objects.get(pk=app.pk) for app in self.applications]
+        self.assertEqual(low.score, 70)
+        self.assertEqual(mid.score, 40)
+        self.assertEqual(wrong_place.status, 'rejected')
+        self.assertIn('AUTO-REJECTION', wrong_place.admin_comments)
+        self.assertEqual(high.status, 'rejected')
+        self.assertEqual(AuditLog.objects.filter(action="System Auto-Rejection").count(), 2)
+
+    def test_screen_cycle_reads_one_query_per_chunk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            ScreeningService.screen_cycle('2025/2026', chunk_size=2)
+        # The cycle statistics refresh at the end adds grouped aggregates
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'GROUP BY' not in q['sql']]
+        # Two full chunks plus the empty read that ends the loop
+        self.assertEqual(len(selects), 3)
+
+    def test_screen_cycle_notifies_rejected_students(self):
+        ScreeningService.screen_cycle('2025/2026', chunk_size=2)
+        notices = NotificationOutbox.objects.filter(subject="Application Status Update", channel='email')
+        self.assertEqual(sorted(notices.values_list('recipient', flat=True)), ['batch_2@example.com', 'batch_3@example.com'])
+        self.assertIn(f"application ID {self.applications[2].pk} was not approved", notices.get(recipient='batch_2@example.com').body)
+
+    def test_rescreen_skips_unchanged_rows(self):
+        ScreeningService.screen_cycle('2025/2026')
+        summary = ScreeningService.screen_cycle('2025/2026')
+        self.assertEqual(summary['screened'], 2)
+        self.assertEqual(summary['updated'], 0)
+
+class ScreeningPolicyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(
+            username='policy_student',
+            password='password123',
+            constituency='Eastside'
+        )
+        StudentProfile.objects.create(
+            user=self.student,
+            school_name='UON',
+            admission_number='C01/999',
+            guardian_income=30000,
+            household_size=3
+        )
+        self.app = Application.objects.create(
+            student=self.student,
+            academic_year='2025/2026',
+            amount_requested=10000
+        )
+        ApplicationDocument.objects.create(
+            application=self.app,
+            student_id_card=ContentFile(b"fake_id", name="id.png"),
+            fee_structure=ContentFile(b"fake_fee", name="fee.png")
+        )
+        self.cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=1000000)
+
+    def tearDown(self):
+        # Rolled-back policies do not fire post_delete, so drop their version tokens
+        cache.clear()
+
+    def test_defaults_apply_without_policy(self):
+        passed, reason = apply_auto_screening(self.app)
+        self.assertFalse(passed)
+        self.assertIn("Central", reason)
+
+    def test_policy_rules_are_used(self):
+        ScreeningPolicy.objects.create(
+            cycle=self.cycle,
+            required_constituency='Eastside',
+            income_bands=[[40000, 50]],
+            household_bands=[[2, 20]],
+        )
+        passed, reason = apply_auto_screening(self.app)
+        self.assertTrue(passed)
+        self.assertEqual(self.app.score, 50 + 20 + 15)
+
+    def test_compiled_policy_is_cached_until_version_changes(self):
+        policy = ScreeningPolicy.objects.create(cycle=self.cycle, required_constituency='Eastside')
+        compiled = ScreeningService.get_policy('2025/2026')
+        with self.assertNumQueries(0):
+            self.assertIs(ScreeningService.get_policy('2025/2026'), compiled)
+
+        policy.max_income_threshold = 10000
+        policy.save()
+        self.assertEqual(policy.version, 2)
+        recompiled = ScreeningService.get_policy('2025/2026')
+        self.assertIsNot(recompiled, compiled)
+        passed, reason, score = recompiled.evaluate('Eastside', True, 30000, 3, True, True, False)
+        self.assertFalse(passed)
+
+    def test_malformed_bands_are_rejected(self):
+        policy = ScreeningPolicy(cycle=self.cycle)
+        policy.full_clean()
+        for bands in ([], [[20000, 40], [10000, 25]], [[20000, "40"]], [[20000]], {"20000": 40}, [[20000, 40], [20000, 10]]):
+            policy.income_bands = bands
+            with self.assertRaises(ValidationError) as raised:
+                policy.full_clean()
+            self.assertIn('income_bands', raised.exception.message_dict)
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        policy = ScreeningPolicy.objects.create(cycle=self.cycle)
+        first, second = ScreeningPolicy.objects.get(pk=policy.pk), ScreeningPolicy.objects.get(pk=policy.pk)
+        first.save()
+        second.save()
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.assertEqual(ScreeningPolicy.objects.get(pk=policy.pk).version, 3)
+
+class IncrementalRescoreTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(
+            username='rescore_student',
+            password='password123',
+            constituency='Central'
+        )
+        self.profile = StudentProfile.objects.create(
+            user=self.student,
+            school_name='UON',
+            admission_number='C01/555',
+            guardian_income=60000,
+            household_size=3
+        )
+        self.app = Application.objects.create(
+            student=self.student,
+            academic_year='2025/2026',
+            amount_requested=10000
+        )
+        ApplicationDocument.objects.create(
+            application=self.app,
+            student_id_card=ContentFile(b"fake_id", name="id.png"),
+            fee_structure=ContentFile(b"fake_fee", name="fee.png")
+        )
+        apply_auto_screening(self.app)
+
+    def test_unrelated_profile_edit_does_not_enqueue(self):
+        profile = StudentProfile.objects.get(pk=self.profile.pk)
+        profile.school_name = 'Kenyatta University'
+        profile.save()
+        self.assertFalse(RescoreRequest.objects.exists())
+
+    def test_income_change_rescores_in_background_pass(self):
+        self.assertEqual(Application.objects.get(pk=self.app.pk).score, 30)
+        profile = StudentProfile.objects.get(pk=self.profile.pk)
+        profile.guardian_income = 10000
+        profile.save()
+        self.assertEqual(RescoreRequest.objects.filter(application=self.app).count(), 1)
+
+        summary = ScreeningService.rescore_queued()
+        self.assertEqual(summary['screened'], 1)
+        self.assertEqual(Application.objects.get(pk=self.app.pk).score, 60)
+        self.assertFalse(RescoreRequest.objects.exists())
+
+    def test_background_rejection_notifies_student(self):
+        User.objects.filter(pk=self.student.pk).update(email='rescore@example.com')
+        profile = StudentProfile.objects.get(pk=self.profile.pk)
+        profile.guardian_income = 500000
+        profile.save()
+        ScreeningService.rescore_queued()
+        self.assertEqual(Application.objects.get(pk=self.app.pk).status, 'rejected')
+        self.assertTrue(NotificationOutbox.objects.filter(subject="Application Status Update", recipient='rescore@example.com').exists())
+
+    def test_document_change_enqueues_application(self):
+        docs = ApplicationDocument.objects.get(application=self.app)
+        docs.admission_letter = ContentFile(b"letter", name="letter.pdf")
+        docs.save()
+        ScreeningService.rescore_queued()
+        self.assertEqual(Application.objects.get(pk=self.app.pk).score, 45)
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='dup_admin',
+            password='password123',
+            email='dup_admin@example.com',
+            role='admin'
+        )
+        self.apps = []
+        for i, (guardian_id, guardian_phone) in enumerate([('12345678', '0712345678'), ('1234 5678', '+254 712 345 678'), ('87654321', '0799000000')]):
+            student = User.objects.create_user(
+                username=f'dup_student_{i}',
+                email=f'dup_{i}@example.com',
+                password='password123',
+                phone=f'07000000{i}0'
+            )
+            StudentProfile.objects.create(
+                user=student,
+                school_name='UON',
+                admission_number=f'C01/{i}',
+                guardian_id_number=guardian_id,
+                guardian_phone=guardian_phone
+            )
+            self.apps.append(Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000
+            ))
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone('0712 345 678'), normalize_phone('+254712345678'))
+
+    def test_clusters_found_in_single_pass(self):
+        with self.assertNumQueries(1):
+            clusters = find_duplicate_clusters('2025/2026')
+        kinds = {cluster.kind: cluster.application_ids for cluster in clusters}
+        self.assertEqual(kinds, {
+            'guardian_id': [self.apps[0].pk, self.apps[1].pk],
+            'guardian_phone': [self.apps[0].pk, self.apps[1].pk],
+        })
+
+    def test_clusters_across_cycles_group_in_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            clusters = find_duplicate_clusters(['2025/2026', '2026/2027'])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('HAVING', queries[0]['sql'])
+        self.assertEqual(len(clusters), 2)
+
+    def test_academic_year_change_moves_fingerprints(self):
+        app = Application.objects.get(pk=self.apps[1].pk)
+        app.academic_year = '2026/2027'
+        app.save()
+        self.assertEqual(find_duplicate_clusters('2025/2026'), [])
+        self.assertEqual(set(IdentityFingerprint.objects.filter(application=app).values_list('academic_year', flat=True)), {'2026/2027'})
+
+    def test_index_updates_on_profile_save(self):
+        profile = StudentProfile.objects.get(user=self.apps[2].student)
+        profile.school_name = 'UON'
+        profile.admission_number = 'c01/0'
+        profile.save()
+        clusters = find_duplicate_clusters('2025/2026')
+        self.assertIn('admission', {cluster.kind for cluster in clusters})
+
+    def test_detail_and_dashboard_show_flags(self):
+        self.client.login(username='dup_admin', password='password123')
+        response = self.client.get(reverse('student-application-detail', args=[self.apps[0].pk]))
+        self.assertContains(response, 'Possible duplicate applications')
+        response = self.client.get(reverse('committee-dashboard'))
+        self.assertEqual(len(response.context['duplicate_clusters']), 2)
+        self.assertIn(self.apps[1].pk, response.context['flagged_ids'])
+
+class ScreeningSimulatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser(
+            username='sim_admin',
+            password='password123',
+            email='sim_admin@example.com',
+            role='admin'
+        )
+        BursaryCycle.objects.create(year='2025/2026', planned_budget=25000)
+        for i, (income, household_size) in enumerate([(5000, 7), (30000, 5), (90000, 2), (200000, 3)]):
+            student = User.objects.create_user(
+                username=f'sim_student_{i}',
+                email=f'sim_{i}@example.com',
+                password='password123',
+                constituency='Central'
+            )
+            StudentProfile.objects.create(
+                user=student,
+                school_name='UON',
+                admission_number=f'S01/{i}',
+                guardian_income=income,
+                household_size=household_size
+            )
+            app = Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000
+            )
+            ApplicationDocument.objects.create(
+                application=app,
+                student_id_card=ContentFile(b"fake_id", name="id.png"),
+                fee_structure=ContentFile(b"fake_fee", name="fee.png")
+            )
+
+    def test_baseline_matches_screening_rules(self):
+        simulator = ScreeningSimulator('2025/2026')
+        result = simulator.run()
+        self.assertEqual(result.passed, 3)
+        self.assertEqual(result.rejected['income'], 1)
+        # Scores: 40+30+15=85, 25+15+15=55, 0+5+15=20
+        self.assertEqual(result.score_histogram, [1, 0, 1, 0, 1])
+        self.assertEqual(result.projected_spend, 30000)
+        self.assertEqual(result.budget_gap, 5000)
+
+    def test_candidate_parameters_do_not_touch_rows(self):
+        simulator = ScreeningSimulator('2025/2026')
+        with self.assertNumQueries(0):
+            result = simulator.run({'max_income_threshold': 50000, 'income_bands': [[10000, 50]]})
+        self.assertEqual(result.passed, 2)
+        self.assertEqual(result.score_histogram, [0, 1, 0, 0, 1])
+        self.assertFalse(Application.objects.filter(score__gt=0).exists())
+
+    def test_simulator_view(self):
+        self.client.login(username='sim_admin', password='password123')
+        response = self.client.get(reverse('screening-simulator'), {
+            'academic_year': '2025/2026',
+            'max_income_threshold': '250000',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['candidate'].passed, 4)
+
+    def test_constituency_restriction_can_be_cleared(self):
+        User.objects.filter(username='sim_student_0').update(constituency='Eastside')
+        simulator = ScreeningSimulator('2025/2026')
+        self.assertEqual(simulator.run().rejected['constituency'], 1)
+        self.assertEqual(simulator.run({'required_constituency': ""}).rejected['constituency'], 0)
+        self.client.login(username='sim_admin', password='password123')
+        response = self.client.get(reverse('screening-simulator'), {'academic_year': '2025/2026', 'any_constituency': 'on'})
+        self.assertEqual(response.context['candidate'].rejected['constituency'], 0)
+        self.assertEqual(response.context['baseline'].rejected['constituency'], 1)
+
+    def test_malformed_scenarios_are_refused_by_name(self):
+        simulator = ScreeningSimulator('2025/2026')
+        with self.assertRaisesMessage(ValueError, 'income_threshold'):
+            simulator.run({'income_threshold': 50000})
+        with self.assertRaisesMessage(ValueError, 'must be an object'):
+            simulator.run([['max_income_threshold', 50000]])
+        with self.assertRaisesMessage(ValueError, 'income_bands'):
+            simulator.run({'income_bands': [[10000, 'high']]})
+        # Band order does not matter; the compiled policy sorts them
+        self.assertEqual(simulator.run({'income_bands': [[80000, 10], [10000, 50]]}).total, 4)
+
+    def test_command_reports_bad_scenario(self):
+        for raw in ('{"threshold": 50000}', '[50000]', '{"max_income_threshold": "lots"}'):
+            with self.assertRaises(CommandError):
+                call_command('simulate_screening', '2025/2026', '--scenario', raw, stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('simulate_screening', '2025/2026', '--scenario', '{"max_income_threshold": 50000}', stdout=out)
+        self.assertIn('2/4 pass', out.getvalue())
+
+class AllocationTests(TestCase):
+    def test_score_order_funds_until_budget_with_partial_award(self):
+        requests = array('q', [10000, 20000, 15000])
+        awards = compute_allocation(requests, [1, 0, 2], 32000, min_award=1000)
+        self.assertEqual(list(awards), [10000, 20000, 2000])
+
+    def test_caps_and_min_award(self):
+        requests = array('q', [10000, 20000, 15000])
+        awards = compute_allocation(requests, [0, 1, 2], 30000, max_award=12000, min_award=9000)
+        self.assertEqual(list(awards), [10000, 12000, 0])
+
+    def test_proportional_scaling_spends_whole_budget(self):
+        requests = array('q', [10000, 20000, 30001])
+        awards = compute_allocation(requests, [2, 1, 0], 30000, strategy='proportional')
+        self.assertEqual(sum(awards), 30000)
+        self.assertTrue(all(award <= request for award, request in zip(awards, requests)))
+
+    def test_proportional_drops_awards_below_minimum(self):
+        requests = array('q', [1000, 20000, 20000])
+        awards = compute_allocation(requests, [0, 1, 2], 20000, strategy='proportional', min_award=800)
+        self.assertEqual(list(awards), [0, 10000, 10000])
+
+    def test_propose_and_approve_sets_awards_used_for_disbursement(self):
+        cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=15000)
+        apps = []
+        for i, score in enumerate([50, 90]):
+            student = User.objects.create_user(
+                username=f'alloc_student_{i}',
+                email=f'alloc_{i}@example.com',
+                password='password123',
+                phone='0712345678'
+            )
+            apps.append(Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000,
+                score=score,
+                status='recommended'
+            ))
+        run = propose_allocation(cycle)
+        self.assertEqual(run.funded_count, 2)
+        self.assertEqual(list(run.items.values_list('application_id', 'amount')), [(apps[1].pk, 10000), (apps[0].pk, 5000)])
+        self.assertIsNone(Application.objects.get(pk=apps[0].pk).amount_awarded)
+
+        approve_allocation(run)
+        partial = Application.objects.get(pk=apps[0].pk)
+        self.assertEqual(partial.amount_awarded, 5000)
+        success, reference = process_bursary_disbursement(partial)
+        self.assertTrue(success)
+        self.assertEqual(Payment.objects.get(payment_reference=reference).amount_awarded, 5000)
+
+    def _recommended(self, count, prefix):
+        apps = []
+        for i in range(count):
+            student = User.objects.create_user(
+                username=f'{prefix}_{i}',
+                email=f'{prefix}_{i}@example.com',
+                password='password123',
+                phone='0712345678'
+            )
+            apps.append(Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000,
+                score=50 + i,
+                status='recommended'
+            ))
+        return apps
+
+    def test_unallocated_application_is_not_paid_after_approval(self):
+        cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=10000)
+        self._recommended(1, 'alloc_funded')
+        approve_allocation(propose_allocation(cycle))
+        late = self._recommended(1, 'alloc_late')[0]
+        success, error = process_bursary_disbursement(Application.objects.get(pk=late.pk))
+        self.assertFalse(success)
+        self.assertIn('approved budget allocation', error)
+        self.assertEqual(Payment.objects.count(), 0)
+
+    def test_reapproval_clears_awards_left_out_of_the_run(self):
+        cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=20000)
+        first, second = self._recommended(2, 'alloc_rerun')
+        approve_allocation(propose_allocation(cycle))
+        self.assertEqual(Application.objects.get(pk=first.pk).amount_awarded, 10000)
+        Application.objects.filter(pk=first.pk).update(status='rejected')
+        approve_allocation(propose_allocation(cycle))
+        self.assertIsNone(Application.objects.get(pk=first.pk).amount_awarded)
+        self.assertEqual(Application.objects.get(pk=second.pk).amount_awarded, 10000)
+
+    def test_reproposal_only_splits_what_is_left(self):
+        cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=15000)
+        first, second = self._recommended(2, 'alloc_left')
+        earlier = approve_allocation(propose_allocation(cycle))
+        success, reference = process_bursary_disbursement(Application.objects.get(pk=second.pk))
+        self.assertTrue(success)
+        self._recommended(1, 'alloc_left_late')
+
+        run = propose_allocation(cycle)
+        self.assertEqual((run.committed, run.available), (10000, 5000))
+        self.assertLessEqual(run.total_allocated, 5000)
+        approve_allocation(run)
+        awarded = Application.objects.filter(academic_year='2025/2026').aggregate(total=Sum('amount_awarded'))['total']
+        self.assertLessEqual(awarded, cycle.planned_budget)
+        earlier.refresh_from_db()
+        self.assertEqual(earlier.status, 'superseded')
+        self.assertEqual(AllocationRun.objects.filter(cycle=cycle, status='approved').get().pk, run.pk)
+
+    def test_run_with_claimed_candidates_is_not_approved(self):
+        cycle = BursaryCycle.objects.create(year='2025/2026', planned_budget=20000)
+        first, second = self._recommended(2, 'alloc_stale')
+        run = propose_allocation(cycle)
+        claim_applications([first.pk])
+        with self.assertRaises(ValueError):
+            approve_allocation(run)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'proposed')
+        self.assertIsNone(Application.objects.get(pk=first.pk).amount_awarded)
+
+class FakeB2CClient:
+    """Records peak concurrency of B2C calls and the references sent."""
+    def __init__(self, delay=0.02, fail_phones=(), timeout_phones=()):
+        self.delay = delay
+        self.fail_phones = set(fail_phones)
+        self.timeout_phones = set(timeout_phones)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.references = []
+
+    def initiate_b2c_payment(self, phone, amount, occasion="Bursary", originator_conversation_id=None):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+            self.references.append(originator_conversation_id)
+            call = self.calls
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if phone in self.timeout_phones:
+            raise TimeoutError("The read operation timed out")
+        if phone in self.fail_phones:
+            return {'status': 'Failed', 'message': 'Insufficient float'}
+        return {'status': 'Success', 'transaction_id': f'FAKE{call:06d}'}
+
+class DisbursementPipelineTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='pay_admin',
+            password='password123',
+            email='pay_admin@example.com',
+            role='admin'
+        )
+        self.apps = []
+        for i in range(6):
+            student = User.objects.create_user(
+                username=f'pay_student_{i}',
+                email=f'pay_{i}@example.com',
+                password='password123',
+                phone=f'07100000{i:02d}'
+            )
+            self.apps.append(Application.objects.create(
+                student=student,
+                academic_year='2025/2026',
+                amount_requested=10000,
+                status='recommended'
+            ))
+        dispatch_notifications()
+        mail.outbox = []
+
+    def test_pipeline_pays_concurrently_and_records_in_bulk(self):
+        client = FakeB2CClient(fail_phones={'0710000005'})
+        pipeline = DisbursementPipeline(client=client, max_workers=3, rate=0)
+        summary = pipeline.run([app.pk for app in self.apps] + [999999], user=self.admin_user)
+        dispatch_notifications()
+        self.assertEqual(summary['paid'], 5)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['skipped'], 1)
+        self.assertLessEqual(client.peak, 3)
+        self.assertGreater(client.peak, 1)
+        self.assertEqual(Payment.objects.count(), 5)
+        self.assertEqual(Application.objects.filter(status='paid').count(), 5)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_paid_applications_are_not_paid_twice(self):
+        client = FakeB2CClient(delay=0)
+        DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk])
+        summary = DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk])
+        self.assertEqual(summary['skipped'], 1)
+        self.assertEqual(client.calls, 1)
+
+    def test_claim_is_exclusive(self):
+        claimed = claim_applications([self.apps[0].pk, self.apps[1].pk])
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(claim_applications([self.apps[0].pk]), [])
+        self.assertEqual(Application.objects.filter(status='disbursing').count(), 2)
+        self.assertEqual(len({app.disbursement_reference for app in claimed}), 2)
+        stats = CycleStatistics.objects.get(academic_year='2025/2026')
+        self.assertEqual((stats.recommended_count, stats.disbursing_count), (4, 2))
+
+    def test_claimed_application_is_not_paid_by_another_run(self):
+        claim_applications([self.apps[0].pk])
+        client = FakeB2CClient(delay=0)
+        summary = DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk, self.apps[1].pk])
+        self.assertEqual((summary['paid'], summary['awaiting'], summary['skipped']), (1, 1, 0))
+        self.assertEqual(client.calls, 1)
+
+    def test_failed_payment_releases_claim(self):
+        client = FakeB2CClient(delay=0, fail_phones={'0710000005'})
+        DisbursementPipeline(client=client, rate=0).run([self.apps[5].pk])
+        application = Application.objects.get(pk=self.apps[5].pk)
+        self.assertEqual((application.status, application.disbursement_reference), ('recommended', ''))
+        stats = CycleStatistics.objects.get(academic_year='2025/2026')
+        self.assertEqual((stats.recommended_count, stats.disbursing_count), (6, 0))
+
+    def test_claim_reference_is_sent_as_originator_conversation_id(self):
+        client = FakeB2CClient(delay=0)
+        DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk])
+        application = Application.objects.get(pk=self.apps[0].pk)
+        self.assertEqual(client.references, [application.disbursement_reference])
+        self.assertEqual(application.status, 'paid')
+
+    def test_unknown_outcome_is_not_resent_on_retry(self):
+        client = FakeB2CClient(delay=0, timeout_phones={'0710000000'})
+        with self.assertLogs('bursary.disbursement', level='ERROR'):
+            summary = DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk])
+        self.assertEqual((summary['awaiting'], summary['failed']), (1, 0))
+        self.assertEqual(Application.objects.get(pk=self.apps[0].pk).status, 'disbursing')
+        retry = DisbursementPipeline(client=client, rate=0).run([self.apps[0].pk])
+        self.assertEqual((retry['awaiting'], retry['skipped']), (1, 0))
+        self.assertIn('awaiting reconciliation', retry['errors'][self.apps[0].pk])
+        self.assertEqual(client.calls, 1)
+
+    def test_each_payment_is_written_when_it_returns(self):
+        def crash(done, total):
+            raise RuntimeError("worker killed")
+        with self.assertRaises(RuntimeError):
+            DisbursementPipeline(client=FakeB2CClient(delay=0), max_workers=1, rate=0).run([app.pk for app in self.apps[:3]], progress=crash)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(Application.objects.filter(status='paid').count(), 1)
+
+    def test_single_disbursement_respects_running_claims(self):
+        claim_applications([self.apps[0].pk])
+        self.client.login(username='pay_admin', password='password123')
+        self.client.post(reverse('disburse-funds', args=[self.apps[0].pk]))
+        self.assertEqual(Payment.objects.count(), 0)
+        self.client.post(reverse('disburse-funds', args=[self.apps[1].pk]))
+        self.assertEqual(Application.objects.get(pk=self.apps[1].pk).status, 'paid')
+        self.assertTrue(AuditLog.objects.filter(action=f"Disbursed funds (M-Pesa) for App ID {self.apps[1].pk}").exists())
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_bulk_disburse_view(self):
+        self.client.login(username='pay_admin', password='password123')
+        response = self.client.post(reverse('bulk-disburse'), {'selected_applications': [self.apps[0].pk, self.apps[1].pk]})
+        job = BackgroundJob.objects.get(kind='bulk_disburse')
+        self.assertRedirects(response, reverse('job-status', args=[job.pk]))
+        self.assertEqual(Payment.objects.count(), 0)
+        run_pending_jobs()
+        self.assertEqual(Payment.objects.count(), 2)
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='job_admin',
+            password='password123',
+            email='job_admin@example.com',
+            role='admin'
+        )
+        for i in range(3):
+            student = User.objects.create_user(username=f'job_student_{i}', email=f'job_{i}@example.com', password='password123', phone=f'07200000{i:02d}')
+            StudentProfile.objects.create(user=student, school_name="Test School", admission_number=f"ADM{i}")
+            Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000, status='recommended')
+        self.client.login(username='job_admin', password='password123')
+
+    def test_claim_is_exclusive(self):
+        job = enqueue_job('pdf_report', user=self.admin_user)
+        claimed = claim_next_job('worker-a')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_next_job('worker-b'))
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue_job('pdf_report')
+        claim_next_job('crashed-worker')
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(stale_after=60), 1)
+        self.assertEqual(claim_next_job('worker-b').attempts, 2)
+
+    def test_heartbeat_refreshes_until_job_is_taken_over(self):
+        job = enqueue_job('pdf_report')
+        claimed = claim_next_job('worker-a')
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        heartbeat = JobHeartbeat(claimed)
+        self.assertTrue(heartbeat.beat())
+        self.assertEqual(requeue_stale_jobs(stale_after=60), 0)
+        BackgroundJob.objects.filter(pk=job.pk).update(worker='worker-b')
+        self.assertFalse(heartbeat.beat())
+
+    def test_requeued_run_does_not_overwrite_the_new_one(self):
+        job = enqueue_job('export_csv')
+        stale_run = claim_next_job('worker-a')
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        requeue_stale_jobs(stale_after=60)
+        claim_next_job('worker-b')
+        with self.assertLogs('bursary.jobs', level='WARNING'):
+            run_job(stale_run)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), ('running', 'worker-b', None))
+        self.assertFalse(job.result_file)
+
+    def test_progress_writes_are_throttled(self):
+        job = enqueue_job('export_csv')
+        progress = JobProgress(job, interval=3600)
+        progress.set_total(100)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(100):
+                progress.advance()
+        self.assertLessEqual(len(queries), 1)
+        progress.flush(force=True)
+        job.refresh_from_db()
+        self.assertEqual((job.progress_done, job.progress_total), (100, 100))
+
+    def test_background_export_produces_download(self):
+        response = self.client.get(reverse('export-applications') + '?background=1')
+        job = BackgroundJob.objects.get(kind='export_csv')
+        self.assertRedirects(response, reverse('job-status', args=[job.pk]))
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, {'rows': 3})
+        status = self.client.get(reverse('job-status-json', args=[job.pk])).json()
+        self.assertEqual(status['percent'], 100)
+        download = self.client.get(status['download_url'])
+        self.assertIn(b'ADM2', b''.join(download.streaming_content))
+
+    def test_failed_job_records_error(self):
+        job = enqueue_job('bulk_disburse', {'application_ids': 'not-a-list'})
+        with self.assertLogs('bursary.jobs', level='ERROR'):
+            run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+STATEMENT_CSV = """Organization Name,Alexia's Global Tech
+Statement Period,01-10-2025 - 31-10-2025
+Receipt No.,Completion Time,Details,Transaction Status,Paid In,Withdrawn,Balance
+QX00000005,2025-10-03 10:00:00,Bursary,Completed,,\"-5,000.00\",
+QX00000001,2025-10-01 10:00:00,Bursary,Completed,,\"-10,000.00\",
+QX00000002,2025-10-01 10:05:00,Bursary,Completed,,-9000.00,
+QX00000003,2025-10-02 09:00:00,Bursary,Completed,,-10000.00,
+QX00000003,2025-10-02 09:00:00,Bursary,Completed,,-10000.00,
+QX00000099,2025-10-02 11:00:00,Float top-up,Completed,500000.00,,
+"""
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='recon_admin',
+            password='password123',
+            email='recon_admin@example.com',
+            role='admin'
+        )
+        for i in range(1, 5):
+            student = User.objects.create_user(username=f'recon_student_{i}', email=f'recon_{i}@example.com', password='password123')
+            application = Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000, status='paid')
+            Payment.objects.create(application=application, amount_awarded=10000, payment_reference=f'QX0000000{i}')
+
+    def make_run(self, content=STATEMENT_CSV):
+        run = ReconciliationRun(created_by=self.admin_user)
+        run.statement.save('statement.csv', ContentFile(content.encode('utf-8')))
+        return run
+
+    def test_reads_statement_after_preamble(self):
+        rows = list(read_statement(io.StringIO(STATEMENT_CSV)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0][:2], ('QX00000005', 5000))
+        with self.assertRaises(ValueError):
+            list(read_statement(io.StringIO("Ref,Amount\nA,1\n")))
+
+    def test_merge_join_reports_each_discrepancy(self):
+        # A chunk size of two forces the on-disk sort and merge path
+        run = reconcile(self.make_run(), chunk_size=2)
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(run.statement_rows, 5)
+        self.assertEqual(run.payment_rows, 4)
+        self.assertEqual(run.matched_count, 2)
+        self.assertEqual(run.missing_in_statement_count, 1)
+        self.assertEqual(run.missing_in_payments_count, 1)
+        self.assertEqual(run.duplicate_count, 1)
+        self.assertEqual(run.amount_mismatch_count, 1)
+        issues = {(issue.kind, issue.reference) for issue in run.issues.all()}
+        self.assertEqual(issues, {
+            ('missing_in_statement', 'QX00000004'),
+            ('missing_in_payments', 'QX00000005'),
+            ('duplicate', 'QX00000003'),
+            ('amount_mismatch', 'QX00000002'),
+        })
+
+    def test_payments_stream_in_python_string_order(self):
+        # A raw, case-sensitive sort puts "QX..." before "qa..."; the merge
+        # join needs the normalized order ("QA..." first)
+        student = User.objects.create_user(username='recon_student_lower', email='recon_lower@example.com', password='password123')
+        application = Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000, status='paid')
+        Payment.objects.create(application=application, amount_awarded=10000, payment_reference='qa00000009 ')
+        with CaptureQueriesContext(connection) as queries:
+            references = [reference for reference, amount, pk in payment_stream()]
+        self.assertEqual(references, sorted(references))
+        self.assertEqual(references[0], 'QA00000009')
+        self.assertIn('COLLATE', queries.captured_queries[-1]['sql'])
+
+    def test_upload_runs_as_background_job(self):
+        self.client.login(username='recon_admin', password='password123')
+        statement = ContentFile(STATEMENT_CSV.encode('utf-8'), name='october.csv')
+        response = self.client.post(reverse('mpesa-reconciliation'), {'statement': statement})
+        run = ReconciliationRun.objects.get()
+        self.assertRedirects(response, f"{reverse('mpesa-reconciliation')}?run={run.pk}")
+        run_pending_jobs()
+        run.refresh_from_db()
+        self.assertEqual(run.issue_count, 4)
+        response = self.client.get(f"{reverse('mpesa-reconciliation')}?run={run.pk}&kind=amount_mismatch")
+        self.assertContains(response, 'QX00000002')
+        self.assertNotContains(response, 'QX00000004')
+
+@override_settings(MPESA_RESULT_TOKEN='callback-secret')
+class DarajaClientTests(TestCase):
+    def setUp(self):
+        self.server = DarajaStubServer(fail_numbers={'254700000999'}).start()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, **kwargs):
+        return DarajaClient(self.server.base_url, 'key', 'secret', '600000', 'api_op', 'credential', **kwargs)
+
+    def test_pooled_threads_share_token_and_connections(self):
+        client = self.make_client()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda i: client.initiate_b2c_payment(f'07{i:08d}', 1000), range(40)))
+        self.assertTrue(all(result['status'] == 'Accepted' for result in results))
+        self.assertEqual(self.server.counters['token_requests'], 1)
+        self.assertLessEqual(self.server.counters['connections'], 4)
+
+    def test_unpooled_client_reconnects_every_call(self):
+        client = self.make_client(pooled=False)
+        for i in range(5):
+            client.initiate_b2c_payment(f'07{i:08d}', 1000)
+        self.assertEqual(self.server.counters['connections'], 6)
+
+    def test_token_refreshed_before_expiry_and_after_revocation(self):
+        self.server.token_ttl = 30
+        client = self.make_client(token_refresh_margin=60)
+        client.initiate_b2c_payment('0700000001', 1000)
+        client.initiate_b2c_payment('0700000002', 1000)
+        self.assertEqual(self.server.counters['token_requests'], 2)
+
+        self.server.token_ttl = 3600
+        client.initiate_b2c_payment('0700000003', 1000)
+        self.server.revoke_tokens()
+        self.assertEqual(client.initiate_b2c_payment('0700000004', 1000)['status'], 'Accepted')
+        self.assertEqual(self.server.counters['token_requests'], 4)
+
+    def test_async_calls_and_rejections(self):
+        client = self.make_client()
+
+        async def pay():
+            return await asyncio.gather(
+                client.initiate_b2c_payment_async('0700000001', 500),
+                client.initiate_b2c_payment_async('+254 700 000 999', 500),
+            )
+        with self.assertLogs('bursary.mpesa', level='WARNING'):
+            ok, rejected = asyncio.run(pay())
+        self.assertEqual(ok['status'], 'Accepted')
+        self.assertEqual(rejected['status'], 'Failed')
+        self.assertIn('initiator', rejected['message'])
+
+    def disburse(self, amount=10000):
+        student = User.objects.create_user(username='daraja_student', email='daraja@example.com', password='password123', phone='0711000000')
+        application = Application.objects.create(student=student, academic_year='2025/2026', amount_requested=amount, status='recommended')
+        with override_settings(MPESA_CLIENT='daraja', MPESA_BASE_URL=self.server.base_url):
+            self.assertIsInstance(get_mpesa_client(), DarajaClient)
+            summary = DisbursementPipeline(rate=0).run([application.pk])
+        return Application.objects.get(pk=application.pk), summary
+
+    def post_result(self, reference, code=0, receipt='QKJ4XYZ123', amount=10000, token='callback-secret', **extra):
+        result = {'ResultType': 0, 'ResultCode': code, 'ResultDesc': 'The service request is processed successfully.',
+                  'OriginatorConversationID': reference, 'ConversationID': 'AG_20251018_0001', 'TransactionID': receipt}
+        if code == 0:
+            result['ResultParameters'] = {'ResultParameter': [
+                {'Key': 'TransactionAmount', 'Value': amount},
+                {'Key': 'TransactionReceipt', 'Value': receipt},
+            ]}
+        return self.client.post(reverse('mpesa-b2c-result', args=[token]), json.dumps({'Result': result}), content_type='application/json', **extra)
+
+    def test_application_is_paid_only_when_result_arrives(self):
+        application, summary = self.disburse()
+        self.assertEqual((summary['paid'], summary['awaiting']), (0, 1))
+        self.assertEqual(application.status, 'disbursing')
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.filter(subject="Funds Disbursed!").exists())
+
+        response = self.post_result(application.disbursement_reference)
+        self.assertEqual(response.json()['ResultCode'], 0)
+        payment = Payment.objects.get(application=application)
+        self.assertEqual((payment.payment_reference, payment.amount_awarded), ('QKJ4XYZ123', 10000))
+        self.assertEqual(Application.objects.get(pk=application.pk).status, 'paid')
+        self.assertTrue(NotificationOutbox.objects.filter(subject="Funds Disbursed!").exists())
+        # Daraja retries deliveries; a second one changes nothing
+        with self.assertLogs('bursary.views', level='WARNING'):
+            self.post_result(application.disbursement_reference)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_failed_result_releases_the_claim(self):
+        application, summary = self.disburse()
+        self.post_result(application.disbursement_reference, code=2001)
+        application.refresh_from_db()
+        self.assertEqual((application.status, application.disbursement_reference), ('recommended', ''))
+        self.assertFalse(Payment.objects.exists())
+        with self.assertLogs('bursary.views', level='WARNING'):
+            self.assertEqual(self.post_result('unknown-reference').status_code, 200)
+        self.assertEqual(self.client.post(reverse('mpesa-b2c-result', args=['callback-secret']), 'nonsense', content_type='application/json').status_code, 400)
+
+    def test_unverified_callback_is_refused(self):
+        application, summary = self.disburse()
+        with self.assertLogs('bursary.views', level='WARNING'):
+            self.assertEqual(self.post_result(application.disbursement_reference, code=2001, token='guessed').status_code, 403)
+        # An unset token refuses everything rather than accepting anything
+        with override_settings(MPESA_RESULT_TOKEN=''), self.assertLogs('bursary.views', level='WARNING'):
+            self.assertEqual(self.post_result(application.disbursement_reference, code=2001).status_code, 403)
+        with override_settings(MPESA_CALLBACK_ALLOWED_IPS=['196.201.214.200']), self.assertLogs('bursary.views', level='WARNING'):
+            self.assertEqual(self.post_result(application.disbursement_reference, code=2001, REMOTE_ADDR='10.0.0.7').status_code, 403)
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'disbursing')
+        self.assertTrue(application.disbursement_reference)
+
+    def test_amounts_with_cents_are_not_truncated(self):
+        application, summary = self.disburse(amount=Decimal('10000.50'))
+        self.assertEqual(summary['failed'], 1)
+        self.assertIn('whole shillings', summary['errors'][application.pk])
+        self.assertEqual(application.status, 'recommended')
+        response = self.make_client().initiate_b2c_payment('0700000001', Decimal('999.99'))
+        self.assertEqual(response['status'], 'Failed')
+        self.assertEqual(self.server.counters['payments'], 0)
+
+class CountingEmailBackend(LocmemEmailBackend):
+    """Counts SMTP connections opened and fails for addresses in ``reject``."""
+    opened = 0
+    reject = set()
+    down = False
+
+    def open(self):
+        if CountingEmailBackend.down:
+            raise ConnectionRefusedError("Mail server unreachable")
+        CountingEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & CountingEmailBackend.reject:
+                raise ConnectionError("Recipient refused")
+        return super().send_messages(messages)
+
+class UnreachableSMSBackend(sms.BaseSMSBackend):
+    """SMS gateway whose connection cannot be opened."""
+    def open(self):
+        raise ConnectionRefusedError("SMS gateway unreachable")
+
+@override_settings(EMAIL_BACKEND='bursary.tests.CountingEmailBackend')
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+        CountingEmailBackend.reject = set()
+        CountingEmailBackend.down = False
+        self.users = [
+            User.objects.create_user(username=f'outbox_{i}', email=f'outbox_{i}@example.com', password='password123', phone=f'07300000{i:02d}')
+            for i in range(5)
+        ]
+
+    def test_saves_queue_instead_of_sending(self):
+        Application.objects.create(student=self.users[0], academic_year='2025/2026', amount_requested=5000)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.filter(status='pending').count(), 2)
+
+    def test_rolled_back_change_sends_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                send_bursary_notification(self.users[0], "Subject", "Body")
+                raise RuntimeError
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_batches_reuse_one_connection(self):
+        for user in self.users:
+            send_bursary_notification(user, "Cycle open", "Applications are open.")
+        summary = dispatch_notifications(batch_size=10)
+        self.assertEqual(summary['sent'], 10)
+        self.assertEqual(summary['batches'], 1)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(NotificationOutbox.objects.exclude(status='sent').exists())
+
+    def test_failures_are_retried_then_given_up(self):
+        CountingEmailBackend.reject = {'outbox_1@example.com'}
+        send_bursary_notification(self.users[1], "Subject", "Body")
+        summary = dispatch_notifications()
+        self.assertEqual((summary['sent'], summary['retried']), (1, 1))
+        row = NotificationOutbox.objects.get(channel='email')
+        self.assertEqual((row.status, row.attempts), ('pending', 1))
+        self.assertGreater(row.available_at, timezone.now())
+
+        NotificationOutbox.objects.filter(pk=row.pk).update(available_at=timezone.now())
+        with self.assertLogs('bursary.notifications', level='ERROR'):
+            summary = dispatch_notifications(max_attempts=2)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(NotificationOutbox.objects.get(pk=row.pk).status, 'failed')
+
+    @override_settings(SMS_BACKEND='bursary.tests.UnreachableSMSBackend')
+    def test_sms_outage_does_not_resend_emails(self):
+        send_bursary_notification(self.users[0], "Subject", "Body")
+        with self.assertLogs('bursary.notifications', level='ERROR'):
+            summary = dispatch_notifications()
+        self.assertEqual((summary['sent'], summary['retried']), (1, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(NotificationOutbox.objects.get(channel='email').status, 'sent')
+        sms_row = NotificationOutbox.objects.get(channel='sms')
+        self.assertEqual((sms_row.status, sms_row.last_error), ('pending', "SMS gateway unreachable"))
+
+    @override_settings(SMS_BACKEND='bursary.sms.LocmemSMSBackend')
+    def test_mail_outage_still_sends_sms(self):
+        CountingEmailBackend.down = True
+        sms.outbox.clear()
+        send_bursary_notification(self.users[0], "Subject", "Body")
+        with self.assertLogs('bursary.notifications', level='ERROR'):
+            summary = dispatch_notifications()
+        self.assertEqual((summary['sent'], summary['retried']), (1, 1))
+        self.assertEqual(len(sms.outbox), 1)
+        self.assertEqual(NotificationOutbox.objects.get(channel='email').status, 'pending')
+
+@override_settings(
+    EMAIL_BACKEND='bursary.tests.CountingEmailBackend',
+    SMS_BACKEND='bursary.sms.LocmemSMSBackend',
+    SMS_BATCH_SIZE=3,
+)
+class MassNotificationTests(TestCase):
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+        CountingEmailBackend.reject = set()
+        sms.outbox.clear()
+        sms.LocmemSMSBackend.batches = []
+        sms.LocmemSMSBackend.reject = {'0740000006'}
+        self.cycle = BursaryCycle.objects.create(year='2026/2027', planned_budget=1000000)
+        self.students = []
+        for i in range(7):
+            self.students.append(User.objects.create_user(
+                username=f'mass_{i}',
+                first_name=f'Student{i}',
+                email=f'mass_{i}@example.com',
+                password='password123',
+                phone='' if i == 0 else f'07400000{i:02d}',
+                role='student',
+            ))
+        User.objects.create_user(username='mass_committee', email='mass_committee@example.com', password='password123', phone='0749999999', role='committee')
+        mail.outbox = []
+
+    def test_cycle_notification_reuses_connection_and_batches_sms(self):
+        run = send_mass_notification(self.cycle, 'cycle_opened', note="Deadline: 30 June.", batch_size=4)
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(run.recipients, 7)
+        self.assertEqual((run.emails_sent, run.emails_failed), (7, 0))
+        self.assertEqual((run.sms_sent, run.sms_failed), (5, 1))
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        # 6 SMS handed over in chunks of 4 and 2, split into provider batches of 3
+        self.assertEqual(sms.LocmemSMSBackend.batches, [3, 1, 2])
+        self.assertEqual(run.sms_batches, 3)
+        self.assertEqual(run.errors, [{'recipient': '0740000006', 'error': 'Invalid phone number'}])
+        self.assertIn('2026/2027', mail.outbox[0].subject)
+        self.assertIn('Hello Student0', mail.outbox[0].body)
+        self.assertIn("Deadline: 30 June.", sms.outbox[0].body)
+        self.assertNotIn('&#x27;', mail.outbox[0].body)
+
+    def test_applicant_audience(self):
+        Application.objects.create(student=self.students[1], academic_year='2026/2027', amount_requested=5000)
+        Application.objects.create(student=self.students[2], academic_year='2025/2026', amount_requested=5000)
+        mail.outbox = []
+        run = send_mass_notification(self.cycle, 'cycle_closed', audience='applicants', send_sms=False)
+        self.assertEqual(run.recipients, 1)
+        self.assertEqual([message.to for message in mail.outbox], [['mass_1@example.com']])
+        self.assertEqual(sms.outbox, [])
+
+    def test_outbox_sms_goes_through_backend(self):
+        send_bursary_notification(self.students[6], "Subject", "Body")
+        with self.assertLogs('bursary.notifications', level='ERROR'):
+            summary = dispatch_notifications()
+        self.assertEqual((summary['sent'], summary['retried']), (1, 1))
+        self.assertEqual(NotificationOutbox.objects.get(channel='sms').last_error, 'Invalid phone number')
+
+    def test_notify_cycle_command(self):
+        out = io.StringIO()
+        call_command('notify_cycle', '2026/2027', '--event', 'cycle_closing', '--no-sms', stdout=out)
+        self.assertIn('7 recipients', out.getvalue())
+        self.assertEqual(len(mail.outbox), 7)
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='transition_admin', password='password123', email='transition_admin@example.com', role='admin')
+        self.student = User.objects.create_user(username='transition_student', password='password123', email='transition@example.com', phone='0751000000', constituency='Central')
+        StudentProfile.objects.create(user=self.student, school_name='UON', admission_number='C01/777', guardian_income=30000, household_size=5)
+        self.app = Application.objects.create(student=self.student, academic_year='2025/2026', amount_requested=10000)
+        ApplicationDocument.objects.create(
+            application=self.app,
+            student_id_card=ContentFile(b"fake_id", name="id.png"),
+            fee_structure=ContentFile(b"fake_fee", name="fee.png")
+        )
+        NotificationOutbox.objects.all().delete()
+
+    def application_updates(self, queries):
+        return [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "bursary_application"')]
+
+    def test_resave_does_not_notify_again(self):
+        app = Application.objects.get(pk=self.app.pk)
+        app.status = 'recommended'
+        app.save()
+        self.assertEqual(NotificationOutbox.objects.filter(subject="Application Recommended").count(), 2)
+        app.admin_comments = "Checked fee balance."
+        app.save()
+        Application.objects.get(pk=app.pk).save()
+        self.assertEqual(NotificationOutbox.objects.filter(subject="Application Recommended").count(), 2)
+        self.assertEqual(app.get_original('status'), 'recommended')
+
+    def test_auto_rejection_is_one_write_and_one_notification(self):
+        self.student.constituency = 'WrongPlace'
+        self.student.save()
+        app = Application.objects.get(pk=self.app.pk)
+        with CaptureQueriesContext(connection) as queries:
+            passed, reason = apply_auto_screening(app)
+        self.assertFalse(passed)
+        self.assertEqual(len(self.application_updates(queries)), 1)
+        self.assertEqual(NotificationOutbox.objects.filter(subject="Application Status Update").count(), 2)
+        self.assertEqual(Application.objects.get(pk=app.pk).status, 'rejected')
+
+    def test_passing_screen_writes_score_once(self):
+        app = Application.objects.get(pk=self.app.pk)
+        with CaptureQueriesContext(connection) as queries:
+            apply_auto_screening(app)
+        self.assertEqual(len(self.application_updates(queries)), 1)
+        self.assertIn('"score"', self.application_updates(queries)[0])
+        self.assertNotIn('"status"', self.application_updates(queries)[0])
+        # Unchanged score: nothing to write
+        with CaptureQueriesContext(connection) as queries:
+            apply_auto_screening(app)
+        self.assertEqual(self.application_updates(queries), [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_disbursement_is_claim_and_one_write(self):
+        Application.objects.filter(pk=self.app.pk).update(status='recommended', score=80)
+        client = Client()
+        client.login(username='transition_admin', password='password123')
+        with CaptureQueriesContext(connection) as queries:
+            client.post(reverse('disburse-funds', args=[self.app.pk]))
+        # The conditional claim before B2C, then recommended -> paid
+        updates = self.application_updates(queries)
+        self.assertEqual(len(updates), 2)
+        self.assertIn("'disbursing'", updates[0])
+        self.assertEqual(Application.objects.get(pk=self.app.pk).status, 'paid')
+        # Only the payment notification, no status notification
+        self.assertEqual(list(NotificationOutbox.objects.values_list('subject', flat=True).distinct()), ["Funds Disbursed!"])
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='export_admin', password='password123', email='export_admin@example.com', role='admin')
+        self.client.login(username='export_admin', password='password123')
+
+    def add_applications(self, count, start=0, academic_year='2025/2026', status='recommended'):
+        for i in range(start, start + count):
+            student = User.objects.create_user(username=f'export_student_{i}', email=f'export_{i}@example.com', password='password123', first_name=f'Export{i}', national_id=f'ID{i}')
+            StudentProfile.objects.create(user=student, school_name="Export School", admission_number=f"EXP{i}")
+            Application.objects.create(student=student, academic_year=academic_year, amount_requested=10000, status=status)
+
+    def export(self, query=''):
+        response = self.client.get(reverse('export-applications') + query)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_streams_default_columns(self):
+        self.add_applications(2)
+        lines = self.export()
+        self.assertEqual(lines[0], 'Student Name,National ID,School,Admission No,Amount Allocated,Status,Date Applied')
+        self.assertTrue(lines[1].startswith('Export0,ID0,Export School,EXP0,10000.00,Recommended by Committee,'))
+        self.assertEqual(len(lines), 3)
+
+    def test_filters_and_column_selection(self):
+        self.add_applications(2)
+        self.add_applications(1, start=2, academic_year='2026/2027', status='paid')
+        self.add_applications(1, start=3, status='pending')
+        lines = self.export('?academic_year=2026/2027&status=paid&status=approved&columns=national_id,academic_year,status')
+        self.assertEqual(lines, ['National ID,Academic Year,Status', 'ID2,2026/2027,Funds Disbursed'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_applications(2)
+        with CaptureQueriesContext(connection) as small:
+            self.export()
+        self.add_applications(20, start=2)
+        expire_export_artifacts()
+        with CaptureQueriesContext(connection) as large:
+            lines = self.export()
+        self.assertEqual(len(lines), 23)
+        self.assertEqual(len(large), len(small))
+
+    def test_missing_profile_and_bad_column(self):
+        student = User.objects.create_user(username='export_noprofile', email='export_noprofile@example.com', password='password123')
+        Application.objects.create(student=student, academic_year='2025/2026', amount_requested=5000, status='approved')
+        self.assertEqual(self.export('?columns=school,amount')[1:], [',5000.00'])
+        response = self.client.get(reverse('export-applications') + '?columns=password')
+        self.assertEqual(response.status_code, 400)
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExcelExportTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='excel_admin', password='password123', email='excel_admin@example.com', role='admin')
+        self.client.login(username='excel_admin', password='password123')
+        for i, (status, ward) in enumerate([('recommended', 'Kileleshwa'), ('paid', 'Kileleshwa'), ('paid', 'Lavington/Kawangware'), ('approved', '')]):
+            student = User.objects.create_user(username=f'excel_student_{i}', email=f'excel_{i}@example.com', password='password123', first_name=f'Excel{i}', national_id=f'XL{i}')
+            StudentProfile.objects.create(user=student, school_name="Excel School", admission_number=f"XL/{i}", ward=ward)
+            Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000 + i, status=status)
+
+    def workbook(self, query=''):
+        from openpyxl import load_workbook
+        response = self.client.get(reverse('export-applications-excel') + query)
+        self.assertEqual(response.status_code, 200)
+        return load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+
+    def test_single_sheet_export(self):
+        rows = list(self.workbook().active.values)
+        self.assertEqual(rows[0], ('Student Name', 'National ID', 'School', 'Admission No', 'Amount Allocated', 'Status', 'Date Applied'))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][:5], ('Excel0', 'XL0', 'Excel School', 'XL/0', 10000))
+
+    def test_sheet_per_status_and_ward(self):
+        wb = self.workbook('?sheets=status&columns=national_id')
+        self.assertEqual(wb.sheetnames, ['Approved for Disbursement', 'Funds Disbursed', 'Recommended by Committee'])
+        self.assertEqual(list(wb['Funds Disbursed'].values), [('National ID',), ('XL1',), ('XL2',)])
+        wb = self.workbook('?sheets=ward&columns=national_id')
+        self.assertEqual(wb.sheetnames, ['No Ward', 'Kileleshwa', 'Lavington-Kawangware'])
+        self.assertEqual(self.client.get(reverse('export-applications-excel') + '?sheets=county').status_code, 400)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.workbook('?sheets=ward')
+        for i in range(4, 20):
+            student = User.objects.create_user(username=f'excel_student_{i}', email=f'excel_{i}@example.com', password='password123')
+            Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000, status='paid')
+        expire_export_artifacts()
+        with CaptureQueriesContext(connection) as large:
+            self.workbook('?sheets=ward')
+        self.assertEqual(len(large), len(small))
+
+    def test_background_job_keeps_filters(self):
+        from openpyxl import load_workbook
+        self.client.get(reverse('export-applications-excel') + '?background=1&status=paid&sheets=ward')
+        job = BackgroundJob.objects.get(kind='export_excel')
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'rows': 2})
+        with job.result_file.open('rb') as handle:
+            self.assertEqual(load_workbook(handle, read_only=True).sheetnames, ['Kileleshwa', 'Lavington-Kawangware'])
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExportArtifactTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='artifact_admin', password='password123', email='artifact_admin@example.com', role='admin')
+        self.client.login(username='artifact_admin', password='password123')
+        self.apps = []
+        for i in range(3):
+            student = User.objects.create_user(username=f'artifact_student_{i}', email=f'artifact_{i}@example.com', password='password123', first_name=f'Artifact{i}')
+            StudentProfile.objects.create(user=student, school_name="Artifact School", admission_number=f"ART{i}")
+            self.apps.append(Application.objects.create(student=student, academic_year='2025/2026', amount_requested=10000, status='recommended'))
+
+    def export(self, name='export-applications', query=''):
+        return b''.join(self.client.get(reverse(name) + query).streaming_content)
+
+    def test_repeat_export_is_served_from_artifact(self):
+        first = self.export()
+        artifact = ExportArtifact.objects.get()
+        self.assertEqual((artifact.format, artifact.rows, artifact.size), ('csv', 3, len(first)))
+        with CaptureQueriesContext(connection) as queries:
+            second = self.export()
+        self.assertEqual(second, first)
+        self.assertFalse([q for q in queries.captured_queries if 'bursary_studentprofile' in q['sql']])
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.hits, 1)
+        # Different filters get their own artifact
+        self.export(query='?columns=student_name')
+        self.export('export-applications-excel')
+        self.assertEqual(ExportArtifact.objects.count(), 3)
+
+    def test_data_change_invalidates(self):
+        self.export()
+        old = ExportArtifact.objects.get()
+        app = Application.objects.get(pk=self.apps[0].pk)
+        app.amount_requested = 20000
+        app.save()
+        self.assertIn(b'20000.00', self.export())
+        self.assertEqual(list(ExportArtifact.objects.values_list('pk', flat=True)), [ExportArtifact.objects.exclude(pk=old.pk).get().pk])
+        profile = StudentProfile.objects.get(user__username='artifact_student_1')
+        profile.school_name = "Renamed School"
+        profile.save()
+        self.assertFalse(ExportArtifact.objects.exists())
+        self.assertIn(b'Renamed School', self.export())
+
+    def test_stored_files_have_unguessable_names(self):
+        self.export()
+        artifact = ExportArtifact.objects.get()
+        self.assertNotIn(artifact.params_key[:16], artifact.file.name)
+        expire_export_artifacts()
+        self.export()
+        self.assertNotEqual(ExportArtifact.objects.get().file.name, artifact.file.name)
+
+        self.client.get(reverse('export-applications') + '?background=1&columns=student_name')
+        run_pending_jobs()
+        job = BackgroundJob.objects.get()
+        directory, filename = job.result_file.name.split('/')[-2:]
+        self.assertEqual(len(directory), 32)
+        response = self.client.get(reverse('job-download', args=[job.pk]))
+        self.assertIn(f'filename="{filename}"', response['Content-Disposition'])
+
+    def test_unexported_changes_keep_artifacts(self):
+        self.export()
+        student = User.objects.get(username='artifact_student_0')
+        student.set_password('new-password123')
+        student.constituency = 'Elsewhere'
+        student.save()
+        profile = StudentProfile.objects.get(user=student)
+        profile.guardian_income = 12000
+        profile.save()
+        self.assertTrue(ExportArtifact.objects.exists())
+        student.email = 'artifact_renamed@example.com'
+        student.save()
+        self.assertFalse(ExportArtifact.objects.exists())
+
+    def test_exported_fields_are_tracked(self):
+        # Expiry relies on changed_fields(), which only sees tracked fields
+        self.assertLessEqual(EXPORTED_USER_FIELDS, set(User.tracked_fields))
+        self.assertLessEqual(EXPORTED_PROFILE_FIELDS, set(StudentProfile.tracked_fields))
+
+    def test_prune_by_age_and_size(self):
+        self.export()
+        self.export(query='?columns=student_name')
+        self.export(query='?columns=amount')
+        oldest, middle, newest = ExportArtifact.objects.order_by('pk')
+        ExportArtifact.objects.filter(pk=oldest.pk).update(last_accessed_at=timezone.now() - timedelta(days=2))
+        ExportArtifact.objects.filter(pk=middle.pk).update(last_accessed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(prune_export_artifacts(max_age=86400, max_bytes=newest.size), 2)
+        self.assertEqual(list(ExportArtifact.objects.values_list('pk', flat=True)), [newest.pk])
+        out = io.StringIO()
+        call_command('prune_export_artifacts', '--all', stdout=out)
+        self.assertIn('Deleted 1 export artifacts', out.getvalue())
+
+    def test_background_job_populates_cache(self):
+        self.client.get(reverse('export-applications') + '?background=1')
+        run_pending_jobs()
+        artifact = ExportArtifact.objects.get()
+        response = self.client.get(reverse('export-applications') + '?background=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+        self.assertIn(b'ART2', b''.join(response.streaming_content))
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.hits, 1)
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CycleReportTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='report_admin', password='password123', email='report_admin@example.com', role='admin')
+        self.client.login(username='report_admin', password='password123')
+        self.add_applications(0, 120)
+
+    def add_applications(self, start, stop):
+        users = User.objects.bulk_create([
+            User(username=f'report_student_{i}', email=f'report_{i}@example.com', password='!', first_name='Report', last_name=f'Student {i}')
+            for i in range(start, stop)
+        ])
+        StudentProfile.objects.bulk_create([StudentProfile(user=user, school_name="Report School", admission_number=f"R{user.pk}", ward=f"Ward {user.pk % 3}") for user in users])
+        Application.objects.bulk_create([
+            Application(student=user, academic_year='2025/2026', amount_requested=1000, status=['pending', 'recommended', 'paid'][i % 3])
+            for i, user in enumerate(users)
+        ])
+
+    def render(self, group_by=None, academic_year='2025/2026'):
+        handle = io.BytesIO()
+        queryset = Application.objects.filter(academic_year=academic_year)
+        pages = write_cycle_report_pdf(queryset, handle, group_by=group_by)
+        return pages, handle.getvalue()
+
+    def test_full_report_paginates_every_row(self):
+        pages, content = self.render()
+        self.assertTrue(content.startswith(b'%PDF'))
+        # Summary page plus ~30 rows per landscape page: far more than the old 50-row cap
+        self.assertGreaterEqual(pages, 5)
+        report, groups = report_totals(Application.objects.all(), 'status')
+        self.assertEqual(report.total, 120)
+        self.assertEqual(report.amount_requested, 120000)
+        self.assertEqual([(title, count) for title, count, requested in groups], [('Funds Disbursed', 40), ('Pending Review', 40), ('Recommended by Committee', 40)])
+
+    def test_sections_start_new_pages(self):
+        plain, _ = self.render()
+        by_ward, _ = self.render(group_by='ward')
+        self.assertGreater(by_ward, plain)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.render(group_by='status')
+        self.add_applications(120, 400)
+        with CaptureQueriesContext(connection) as large:
+            self.render(group_by='status')
+        self.assertEqual(len(large), len(small))
+
+    def test_view_caches_and_job_renders(self):
+        response = self.client.get(reverse('generate-pdf-report') + '?sections=status')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        first = b''.join(response.streaming_content)
+        self.assertEqual(ExportArtifact.objects.get().format, 'pdf')
+        self.assertEqual(b''.join(self.client.get(reverse('generate-pdf-report') + '?sections=status').streaming_content), first)
+        self.assertEqual(ExportArtifact.objects.get().hits, 1)
+        self.client.get(reverse('generate-pdf-report') + '?background=1&sections=ward')
+        run_pending_jobs()
+        job = BackgroundJob.objects.get(kind='pdf_report')
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result['rows'], 120)
+        self.assertEqual(ExportArtifact.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse('generate-pdf-report') + '?sections=county').status_code, 400)
+
+class CycleStatisticsTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='stats_admin', password='password123', email='stats_admin@example.com', role='admin')
+        self.client.login(username='stats_admin', password='password123')
+        self.students = User.objects.bulk_create([
+            User(username=f'stats_student_{i}', email=f'stats_{i}@example.com', password='!', phone=f'07200000{i:02d}')
+            for i in range(6)
+        ])
+
+    def snapshot(self):
+        return list(CycleStatistics.objects.order_by('academic_year').values('academic_year', *COUNTER_FIELDS))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        refresh_cycle_statistics()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_counters_follow_single_saves_and_deletes(self):
+        apps = [
+            Application.objects.create(student=student, academic_year='2025/2026' if i < 4 else '2024/2025', amount_requested=1000, score=i * 20)
+            for i, student in enumerate(self.students)
+        ]
+        stats = cycle_statistics('2025/2026')
+        self.assertEqual((stats.total_applications, stats.pending_count, stats.score_total), (4, 4, 120))
+        self.assertEqual(stats.score_distribution, [2, 1, 1, 0, 0])
+
+        apps[0].status = 'recommended'
+        apps[0].save()
+        apps[1].status = 'rejected'
+        apps[1].admin_comments = 'AUTO-REJECTION: test'
+        apps[1].save(update_fields=['status', 'admin_comments', 'updated_at'])
+        apps[2].academic_year = '2024/2025'
+        apps[2].save()
+        apps[3].delete()
+        self.assertMatchesRebuild()
+        stats = cycle_statistics('2025/2026')
+        self.assertEqual((stats.total_applications, stats.recommended_count, stats.auto_rejected_count), (2, 1, 1))
+        self.assertEqual(cycle_statistics().total_applications, 5)
+
+    def test_payments_and_bulk_disbursement_update_counters(self):
+        apps = [Application.objects.create(student=student, academic_year='2025/2026', amount_requested=1000, status='recommended') for student in self.students]
+        DisbursementPipeline(client=FakeB2CClient(delay=0), rate=0).run([app.pk for app in apps[:4]])
+        stats = cycle_statistics('2025/2026')
+        self.assertEqual((stats.recommended_count, stats.paid_count, stats.payments_count, stats.disbursed_total), (2, 4, 4, 4000))
+        Payment.objects.filter(application=apps[0]).get().delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(cycle_statistics('2025/2026').disbursed_total, 3000)
+
+    def test_bulk_screening_refreshes_and_command_rebuilds(self):
+        apps = [Application.objects.create(student=student, academic_year='2025/2026', amount_requested=1000) for student in self.students]
+        ScreeningService.screen_cycle('2025/2026')
+        # Students have no profile, so every application is auto-rejected
+        self.assertEqual(cycle_statistics('2025/2026').auto_rejected_count, len(apps))
+        CycleStatistics.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_cycle_statistics', stdout=out)
+        self.assertIn('Rebuilt statistics for 1 cycles', out.getvalue())
+        self.assertEqual(cycle_statistics('2025/2026').rejected_count, len(apps))
+
+    def test_dashboards_read_counters_in_constant_queries(self):
+        Application.objects.create(student=self.students[0], academic_year='2025/2026', amount_requested=1000, score=90, status='approved')
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('reports'))
+        self.assertEqual(response.context['approval_rate'], 100)
+        self.assertEqual(response.context['score_distribution'], [0, 0, 0, 0, 1])
+        for student in self.students[1:]:
+            Application.objects.create(student=student, academic_year='2024/2025', amount_requested=1000)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('reports'))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(response.context['total_apps'], 6)
+        self.assertEqual(response.context['status_counts']['Pending Review'], 5)
+        self.assertEqual(self.client.get(reverse('admin-dashboard')).context['total_approved'], 1)
+
+class ApplicationReportTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='reporting_admin', password='password123', email='reporting_admin@example.com', role='admin')
+        self.client.login(username='reporting_admin', password='password123')
+        self.add_applications(0, 10)
+
+    def add_applications(self, start, stop):
+        users = User.objects.bulk_create([User(username=f'reporting_student_{i}', email=f'reporting_{i}@example.com', password='!') for i in range(start, stop)])
+        for i, user in enumerate(users, start):
+            status = ['pending', 'approved', 'paid', 'rejected', 'recommended'][i % 5]
+            Application.objects.create(
+                student=user,
+                academic_year='2025/2026' if i % 2 else '2024/2025',
+                amount_requested=1000,
+                score=i * 10,
+                status=status,
+                admin_comments="AUTO-REJECTION: test" if status == 'rejected' else "",
+            )
+
+    def test_report_is_one_query(self):
+        with self.assertNumQueries(1):
+            report = application_report()
+        self.assertEqual(report.total, 10)
+        self.assertEqual(report.status_counts, {'pending': 2, 'recommended': 2, 'approved': 2, 'rejected': 2, 'disbursing': 0, 'paid': 2})
+        self.assertEqual(report.auto_rejected, 2)
+        self.assertEqual(report.approval_rate, 40)
+        self.assertEqual(report.average_score, 45)
+        self.assertEqual(report.score_histogram, [3, 2, 2, 2, 1])
+        self.assertEqual(report.histogram_labels, ['0-20', '21-40', '41-60', '61-80', '81+'])
+
+    def test_custom_edges_and_cycle_filter(self):
+        report = application_report(Application.objects.filter(academic_year='2025/2026'), edges=(50,))
+        self.assertEqual(report.total, 5)
+        self.assertEqual(report.score_histogram, [3, 2])
+        self.assertEqual(report.histogram_labels, ['0-50', '51+'])
+
+    def test_dashboard_report_matches_query_report(self):
+        for academic_year in (None, '2024/2025'):
+            queryset = Application.objects.filter(academic_year=academic_year) if academic_year else Application.objects.all()
+            expected = application_report(queryset)
+            report = dashboard_report(academic_year)
+            self.assertEqual(
+                (report.total, report.status_counts, report.auto_rejected, report.score_histogram, report.average_score),
+                (expected.total, expected.status_counts, expected.auto_rejected, expected.score_histogram, expected.average_score),
+            )
+        with override_settings(REPORT_SCORE_EDGES=(30, 60)):
+            self.assertEqual(dashboard_report().score_histogram, [4, 3, 3])
+
+    def test_reports_view_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('reports') + '?academic_year=2025/2026')
+        self.assertEqual(response.context['total_apps'], 5)
+        self.add_applications(10, 60)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('reports') + '?academic_year=2025/2026')
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(response.context['total_apps'], 30)
+        self.assertContains(response, '"81+"')
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='cache_author', password='password123', first_name='Amina', last_name='Otieno')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        self.client.get(reverse('about'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about'))
+        self.assertEqual(response.status_code, 200)
+        BoardMember.objects.create(name="Grace Wanjiru", role="Chair", period="2022 - 2027")
+        self.assertContains(self.client.get(reverse('about')), "Grace Wanjiru")
+        self.assertContains(self.client.get(reverse('gallery')), "Grace Wanjiru")
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_not_used_for_pages(self):
+        # Another worker's saves would never reach this process's cache
+        self.client.get(reverse('about'))
+        BoardMember.objects.bulk_create([BoardMember(name="Grace Wanjiru", role="Chair", period="2022 - 2027")])
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, "Grace Wanjiru")
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_testimony_and_author_changes_invalidate_home(self):
+        self.client.get(reverse('home'))
+        testimony = Testimony.objects.create(user=self.author, content="The bursary kept me in school.")
+        self.assertContains(self.client.get(reverse('home')), "kept me in school")
+        self.author.first_name = 'Wambui'
+        self.author.save()
+        self.assertContains(self.client.get(reverse('home')), "Wambui Otieno")
+        testimony.delete()
+        self.assertNotContains(self.client.get(reverse('home')), "kept me in school")
+
+    def test_signed_in_users_get_cached_fragments(self):
+        DownloadableDocument.objects.create(title="Application Guide", file=ContentFile(b"%PDF", name="guide.pdf"))
+        self.client.login(username='cache_author', password='password123')
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse('downloads'))
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(reverse('downloads'))
+        self.assertContains(response, "Application Guide")
+        cached_queries = len(second)
+        self.assertLess(cached_queries, len(first))
+        # Previews only bump the view counter, which refreshes with the timeout
+        document = DownloadableDocument.objects.get()
+        self.client.get(reverse('serve-document', args=[document.pk]))
+        with self.assertNumQueries(cached_queries):
+            self.client.get(reverse('downloads'))
+
+    def test_disbursement_page_follows_payments(self):
+        self.assertContains(self.client.get(reverse('public-disbursements')), "No historical data")
+        application = Application.objects.create(student=self.author, academic_year='2025/2026', amount_requested=5000, status='recommended')
+        Payment.objects.create(application=application, amount_awarded=5000, payment_reference='CACHE1')
+        Application.objects.filter(pk=application.pk).update(status='paid')
+        refresh_cycle_statistics(['2025/2026'])
+        response = self.client.get(reverse('public-disbursements'))
+        self.assertContains(response, "KES 5000")
+        self.assertContains(response, "2025/2026")
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.document = DownloadableDocument.objects.create(title="Bursary Form", file=ContentFile(b"%PDF-1.4 form", name="form.pdf"))
+
+    def test_document_revalidation_skips_file_and_counter(self):
+        url = reverse('serve-document', args=[self.document.pk])
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b"%PDF-1.4 form")
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('inline', response['Content-Disposition'])
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.download_count, 1)
+
+    def test_new_document_version_changes_etag(self):
+        url = reverse('serve-document', args=[self.document.pk])
+        etag = self.client.get(url)['ETag']
+        self.document.version = "2.0"
+        self.document.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_public_pages_answer_304_until_content_changes(self):
+        for name in ('downloads', 'gallery', 'public-disbursements'):
+            response = self.client.get(reverse(name))
+            self.assertIn('max-age=60', response['Cache-Control'])
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        etag = self.client.get(reverse('downloads'))['ETag']
+        DownloadableDocument.objects.create(title="Annual Report", category='report', file=ContentFile(b"%PDF", name="report.pdf"))
+        response = self.client.get(reverse('downloads'), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Annual Report")
+
+    def test_signed_in_pages_are_private(self):
+        User.objects.create_user(username='conditional_user', password='password123')
+        self.client.login(username='conditional_user', password='password123')
+        response = self.client.get(reverse('downloads'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class QueryBudgetTests(TestCase):
+    """Staff pages must not issue per-row queries: the count may not grow with the rows shown."""
+    LIST_VIEWS = ('committee-dashboard', 'staff-application-list', 'admin-dashboard', 'financial-history', 'reports')
+
+    def setUp(self):
+        User.objects.create_superuser(username='budget_admin', password='password123', email='budget_admin@example.com', role='admin')
+        self.client.login(username='budget_admin', password='password123')
+        self.seed(0, 3)
+
+    def seed(self, start, stop):
+        users = User.objects.bulk_create([
+            User(username=f'budget_student_{i}', email=f'budget_{i}@example.com', password='!', first_name='Budget', last_name=f'Student {i}')
+            for i in range(start, stop)
+        ])
+        StudentProfile.objects.bulk_create([StudentProfile(user=user, school_name="Budget School", admission_number=f"B{user.pk}") for user in users])
+        applications = Application.objects.bulk_create([
+            Application(student=user, academic_year='2025/2026', amount_requested=1000, status=['pending', 'recommended', 'paid'][i % 3])
+            for i, user in enumerate(users)
+        ])
+        ApplicationDocument.objects.bulk_create([
+            ApplicationDocument(application=application, student_id_card='documents/id.png', fee_structure='documents/fee.png')
+            for application in applications
+        ])
+        Payment.objects.bulk_create([
+            Payment(application=application, amount_awarded=1000, payment_reference=f'BUDGET{application.pk}')
+            for application in applications if application.status == 'paid'
+        ])
+        refresh_cycle_statistics()
+
+    def query_counts(self):
+        counts = {}
+        for name in self.LIST_VIEWS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_list_views_use_constant_queries(self):
+        small = self.query_counts()
+        self.seed(3, 45)
+        self.assertEqual(self.query_counts(), small)
+
+    def test_detail_views_fetch_relations_with_the_application(self):
+        application = Application.objects.filter(status='pending').first()
+        for name in ('student-application-detail', 'review-application'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(name, args=[application.pk])).status_code, 200)
+            lazy = [q['sql'] for q in queries.captured_queries if 'FROM "bursary_studentprofile"' in q['sql'] or 'FROM "bursary_applicationdocument"' in q['sql']]
+            self.assertEqual(lazy, [], name)
+
+    def test_fetch_profiles_join_their_relations(self):
+        with self.assertNumQueries(1):
+            for application in Application.objects.for_committee():
+                application.student.student_profile.school_name, application.document_bundle.fee_structure
+        with self.assertNumQueries(1):
+            for application in Application.objects.for_admin():
+                application.student.get_full_name(), getattr(application, 'payment_record', None)
+        with self.assertNumQueries(1):
+            for payment in Payment.objects.for_finance():
+                payment.application.student.get_full_name()
+        self.assertEqual(list(Application.objects.for_export().values_list('pk', flat=True)), sorted(Application.objects.values_list('pk', flat=True)))
+
+    def test_export_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            b''.join(self.client.get(reverse('export-applications')).streaming_content)
+        self.seed(3, 45)
+        expire_export_artifacts()
+        with CaptureQueriesContext(connection) as large:
+            b''.join(self.client.get(reverse('export-applications')).streaming_content)
+        self.assertEqual(len(large), len(small))
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='keyset_admin', password='password123', email='keyset_admin@example.com', role='admin')
+        self.client.login(username='keyset_admin', password='password123')
+        AuditLog.objects.bulk_create([AuditLog(action=f"Keyset action {i}") for i in range(45)])
+        # Ties on the timestamp must still page deterministically by id
+        AuditLog.objects.filter(pk__in=list(AuditLog.objects.values_list('pk', flat=True)[:30])).update(timestamp=timezone.now() - timedelta(days=1))
+        self.expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('pk', flat=True))
+
+    def walk(self, paginator):
+        seen, cursor, pages = [], None, []
+        while True:
+            page = paginator.page(cursor)
+            pages.append(page)
+            seen.extend(log.pk for log in page)
+            if not page.has_next():
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_cursors_cover_every_row_once_in_both_directions(self):
+        paginator = KeysetPaginator(AuditLog.objects.all(), 20, ('-timestamp', '-id'))
+        seen, pages = self.walk(paginator)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertFalse(pages[0].has_previous())
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([log.pk for log in back], self.expected[20:40])
+        oldest = paginator.page(pages[0].last_cursor)
+        self.assertEqual([log.pk for log in oldest], self.expected[-20:])
+        self.assertFalse(oldest.has_next())
+        self.assertTrue(oldest.has_previous())
+
+    def test_deep_pages_cost_the_same_without_offset_or_count(self):
+        paginator = KeysetPaginator(AuditLog.objects.all(), 5, ('-timestamp', '-id'))
+        first_page = paginator.page()
+        cursor = self.walk(paginator)[1][-2].next_cursor
+        with CaptureQueriesContext(connection) as deep:
+            page = paginator.page(cursor)
+        self.assertEqual(page.approximate_total, first_page.approximate_total)
+        self.assertEqual(len(deep), 2)
+        self.assertFalse(any('OFFSET' in q['sql'] or 'COUNT(' in q['sql'] for q in deep.captured_queries))
+
+    def test_audit_log_view_pages_by_cursor(self):
+        response = self.client.get(reverse('audit-logs'))
+        self.assertEqual([log.pk for log in response.context['logs']], self.expected[:20])
+        self.assertContains(response, "About 45 log entries")
+        response = self.client.get(reverse('audit-logs'), {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual([log.pk for log in response.context['logs']], self.expected[20:40])
+        self.assertEqual(self.client.get(reverse('audit-logs'), {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_staff_list_pages_by_created_at(self):
+        users = User.objects.bulk_create([User(username=f'keyset_student_{i}', email=f'keyset_student_{i}@example.com', password='!') for i in range(55)])
+        Application.objects.bulk_create([Application(student=user, academic_year='2025/2026', amount_requested=1000) for user in users])
+        expected = list(Application.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        first = self.client.get(reverse('staff-application-list'))
+        second = self.client.get(reverse('staff-application-list'), {'cursor': first.context['page_obj'].next_cursor})
+        self.assertEqual([app.pk for app in first.context['applications']] + [app.pk for app in second.context['applications']], expected)
+        self.assertFalse(second.context['page_obj'].has_next())
+
+class QueryPlanTests(TestCase):
+    def test_flags_full_scans_and_temporary_sorts(self):
+        self.assertEqual(plan_flags(['SCAN bursary_payment', 'USE TEMP B-TREE FOR ORDER BY'], 'bursary_payment'), ['full scan of bursary_payment', 'temporary sort'])
+        self.assertEqual(plan_flags(['Sort  (cost=1.0..2.0 rows=1 width=8)', '  ->  Seq Scan on bursary_payment  (cost=0.00..1.00)'], 'bursary_payment'), ['temporary sort', 'full scan of bursary_payment'])
+        self.assertEqual(plan_flags(['SEARCH bursary_application USING INDEX application_status_score_idx (status=?)'], 'bursary_application'), [])
+        # Whole-table reads of small configuration tables are expected
+        self.assertEqual(plan_flags(['SCAN bursary_bursarycycle', 'USE TEMP B-TREE FOR ORDER BY'], 'bursary_bursarycycle'), [])
+
+    def test_suggests_equality_columns_before_ordering(self):
+        sql = Application.objects.filter(status='pending', score__gte=10).order_by('-created_at').query.sql_with_params()[0]
+        self.assertEqual(suggest_index(sql, 'bursary_application'), "Application: models.Index(fields=['status', 'score', 'created_at'])")
+        self.assertIsNone(suggest_index(str(Application.objects.all().query), 'bursary_application'))
+
+    def test_hot_listings_use_indexes(self):
+        queries = [
+            Application.objects.filter(status='pending').order_by('-score', '-created_at'),
+            Application.objects.filter(student_id=1).order_by('-created_at'),
+            Payment.objects.order_by('-date_paid'),
+            AuditLog.objects.order_by('-timestamp', '-id'),
+        ]
+        for queryset in queries:
+            sql, params = queryset.query.sql_with_params()
+            self.assertEqual(plan_flags(explain(sql, params), queryset.model._meta.db_table), [], sql)
+
+    def test_check_fails_on_a_plan_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = f"{directory}/plans.json"
+            call_command('explain_views', '--rows', '30', '--snapshot', snapshot, '--update', stdout=io.StringIO())
+            out = io.StringIO()
+            call_command('explain_views', '--rows', '30', '--snapshot', snapshot, '--check', stdout=out)
+            self.assertIn("No plan regressions.", out.getvalue())
+        regressed = {'reports': {'SELECT 1': {'plan': ['SCAN bursary_payment'], 'flags': ['full scan of bursary_payment']}}}
+        self.assertEqual(plan_regressions({'reports': {'SELECT 1': {'flags': []}}}, regressed), ["reports: full scan of bursary_payment in SELECT 1"])
+        self.assertEqual(plan_regressions(regressed, regressed), [])
+
+class ApplicationSearchTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='search_admin', password='password123', email='search_admin@example.com', role='admin')
+        self.client.login(username='search_admin', password='password123')
+        self.wanjiku = self.student('wanjiku', 'Grace', 'Wanjiku', '30112233', 'Kenyatta University', 'ADM/2023/001', 'Peter Kamau')
+        self.otieno = self.student('otieno', 'Brian', 'Otieno', '28998877', 'Moi University', 'MU-4471', 'Grace Achieng')
+
+    def student(self, username, first_name, last_name, national_id, school, admission, guardian):
+        user = User.objects.create_user(username=username, password='password123', email=f'{username}@example.com', first_name=first_name, last_name=last_name, national_id=national_id)
+        StudentProfile.objects.create(user=user, school_name=school, admission_number=admission, guardian_name=guardian)
+        return Application.objects.create(student=user, academic_year='2025/2026', amount_requested=5000)
+
+    def test_matches_names_ids_schools_and_guardians(self):
+        self.assertEqual(search_applications("wanj"), [self.wanjiku])
+        self.assertEqual(search_applications("30112233"), [self.wanjiku])
+        self.assertEqual(search_applications("moi univ"), [self.otieno])
+        self.assertEqual(search_applications("adm 2023/001"), [self.wanjiku])
+        self.assertEqual(search_applications("kamau"), [self.wanjiku])
+        self.assertCountEqual(search_applications("grace university"), [self.wanjiku, self.otieno])
+        self.assertEqual(len(search_applications("grace", limit=1)), 1)
+        self.assertEqual(search_applications('"*) OR ('), [])
+
+    def test_entries_follow_profile_changes_and_deletes(self):
+        profile = self.wanjiku.student.student_profile
+        profile.guardian_name = "Mary Njeri"
+        profile.save()
+        self.assertEqual(search_applications("njeri"), [self.wanjiku])
+        self.assertEqual(search_applications("kamau"), [])
+        user = User.objects.get(pk=self.otieno.student_id)
+        user.last_name = "Odhiambo"
+        user.save()
+        self.assertEqual(search_applications("odhiambo"), [self.otieno])
+        self.otieno.delete()
+        self.assertEqual(search_applications("moi"), [])
+        self.assertEqual(ApplicationSearchEntry.objects.count(), 1)
+
+    def test_rebuild_indexes_rows_written_without_signals(self):
+        user = User.objects.create_user(username='bulk_student', password='!', email='bulk@example.com', first_name='Halima', last_name='Abdi')
+        Application.objects.bulk_create([Application(student=user, academic_year='2025/2026', amount_requested=5000)])
+        self.assertEqual(search_applications("halima"), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn("Indexed 3 applications", out.getvalue())
+        self.assertEqual([app.student_id for app in search_applications("halima")], [user.pk])
+        self.assertEqual(search_applications("wanjiku"), [self.wanjiku])
+
+    def test_staff_list_search_box(self):
+        response = self.client.get(reverse('staff-application-list'), {'q': 'Kenyatta'})
+        self.assertEqual(response.context['applications'], [self.wanjiku])
+        self.assertFalse(response.context['is_paginated'])
+        self.assertContains(response, 'value="Kenyatta"')
+        self.assertContains(response, "1 best match")
+        response = self.client.get(reverse('staff-application-list'), {'q': 'nobody'})
+        self.assertContains(response, "No applications match")
+        response = self.client.get(reverse('staff-application-list'))
+        self.assertEqual(len(response.context['applications']), 2)
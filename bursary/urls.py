@@ -55,6 +55,13 @@ urlpatterns = [
     path('admin-office/audit-logs/', views.AuditLogListView.as_view(), name='audit-logs'),
     path('admin-office/reports/', views.ReportsView.as_view(), name='reports'),
     path('admin-office/reports/pdf/', views.PDFReportView.as_view(), name='generate-pdf-report'),
+    path('admin-office/screening-simulator/', views.ScreeningSimulatorView.as_view(), name='screening-simulator'),
+    path('admin-office/allocation/', views.AllocationView.as_view(), name='budget-allocation'),
+    path('admin-office/reconciliation/', views.ReconciliationView.as_view(), name='mpesa-reconciliation'),
     path('admin-office/disburse/<int:pk>/', views.DisburseFundsView.as_view(), name='disburse-funds'),
     path('admin-office/bulk-disburse/', views.BulkDisburseView.as_view(), name='bulk-disburse'),
+    path('mpesa/b2c/result/<str:token>/', views.MpesaB2CResultView.as_view(), name='mpesa-b2c-result'),
+    path('admin-office/jobs/<int:pk>/', views.JobStatusView.as_view(), name='job-status'),
+    path('admin-office/jobs/<int:pk>/status/', views.JobStatusJSONView.as_view(), name='job-status-json'),
+    path('admin-office/jobs/<int:pk>/download/', views.JobDownloadView.as_view(), name='job-download'),
 ]
@@ -1,54 +1,207 @@
 import csv
-from django.http import HttpResponse
-from .models import Application, Payment, AuditLog
+import re
+import secrets
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+from django.http import FileResponse, StreamingHttpResponse
+from .models import Application
 from django.utils import timezone
 from openpyxl import Workbook
 
-def export_applications_csv(queryset, filename="bursary_list"):
-    # ... (existing code)
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}_{timezone.now().date()}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Student Name', 'National ID', 'School', 'Admission No', 'Amount Allocated', 'Status', 'Date Applied'])
-
-    for app in queryset:
-        writer.writerow([
-            app.student.get_full_name(),
-            app.student.national_id,
-            app.student.student_profile.school_name,
-            app.student.student_profile.admission_number,
-            app.amount_requested,
-            app.get_status_display(),
-            app.created_at.strftime("%Y-%m-%d"),
-        ])
+def export_filename(filename, extension):
+    return f"{filename}_{timezone.now().date()}.{extension}"
 
-    return response
+def stored_export_name(filename):
+    """
+    Storage name for a generated export: ``filename`` under a random
+    directory, so its MEDIA_URL path cannot be derived from the filters or
+    the date. Exports hold student PII and are only streamed by
+    authenticated views.
+    """
+    return f"{secrets.token_hex(16)}/{filename}"
+
+# Statuses included in exports unless the caller asks for others
+EXPORT_STATUSES = ['recommended', 'approved', 'paid']
+
+STATUS_LABELS = dict(Application.STATUS_CHOICES)
+
+def _full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+# Column registry for application exports: key -> (header, lookups, formatter).
+# Rows are read with values_list() over the lookups, so the student and
+# profile joins happen in the one query and only selected columns are read.
+EXPORT_COLUMNS = {
+    'student_name': ("Student Name", ('student__first_name', 'student__last_name'), _full_name),
+    'national_id': ("National ID", ('student__national_id',), None),
+    'phone': ("Phone", ('student__phone',), None),
+    'email': ("Email", ('student__email',), None),
+    'school': ("School", ('student__student_profile__school_name',), None),
+    'admission_number': ("Admission No", ('student__student_profile__admission_number',), None),
+    'ward': ("Ward", ('student__student_profile__ward',), None),
+    'academic_year': ("Academic Year", ('academic_year',), None),
+    'amount': ("Amount Allocated", ('amount_requested',), None),
+    'score': ("Score", ('score',), None),
+    'status': ("Status", ('status',), STATUS_LABELS.get),
+    'date_applied': ("Date Applied", ('created_at',), lambda value: value.strftime("%Y-%m-%d")),
+}
+DEFAULT_EXPORT_COLUMNS = ['student_name', 'national_id', 'school', 'admission_number', 'amount', 'status', 'date_applied']
+
+def export_columns(columns=None):
+    """Validates export column keys; raises ValueError for unknown ones."""
+    columns = list(columns or DEFAULT_EXPORT_COLUMNS)
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)}")
+    return columns
+
+def export_applications_queryset(academic_year=None, statuses=None):
+    """Applications included in an export, in a stable order."""
+    statuses = statuses or EXPORT_STATUSES
+    unknown = [status for status in statuses if status not in STATUS_LABELS]
+    if unknown:
+        raise ValueError(f"Unknown status(es): {', '.join(unknown)}")
+    queryset = Application.objects.for_export().filter(status__in=statuses)
+    if academic_year:
+        queryset = queryset.filter(academic_year=academic_year)
+    return queryset
+
+def _row_builder(columns):
+    """(lookups, build) where build(values) formats one values_list() row."""
+    lookups, slices = [], []
+    for column in export_columns(columns):
+        header, fields, formatter = EXPORT_COLUMNS[column]
+        slices.append((len(lookups), len(lookups) + len(fields), formatter))
+        lookups.extend(fields)
+
+    def build(values, offset=0):
+        row = []
+        for start, stop, formatter in slices:
+            if formatter:
+                row.append(formatter(*values[offset + start:offset + stop]))
+            else:
+                value = values[offset + start]
+                row.append("" if value is None else value)
+        return row
+    return lookups, build
+
+def application_rows(queryset, columns=None, chunk_size=2000):
+    """
+    Yields one list of cell values per application for ``columns``.
+
+    A single query streamed with iterator(), so memory stays flat however
+    many applications are exported.
+    """
+    lookups, build = _row_builder(columns)
+    for values in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield build(values)
 
-def export_applications_excel(queryset, filename="bursary_list"):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Applications"
-
-    # Header
-    headers = ['Student Name', 'National ID', 'School', 'Admission No', 'Amount Allocated', 'Status', 'Date Applied']
-    ws.append(headers)
-
-    for app in queryset:
-        ws.append([
-            app.student.get_full_name(),
-            app.student.national_id,
-            app.student.student_profile.school_name,
-            app.student.student_profile.admission_number,
-            float(app.amount_requested),
-            app.get_status_display(),
-            app.created_at.strftime("%Y-%m-%d"),
-        ])
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}_{timezone.now().date()}.xlsx"'
-    wb.save(response)
+# Ways to split an Excel export into sheets: key -> (lookup, sheet title for a value)
+EXPORT_SHEET_GROUPS = {
+    'status': ('status', lambda value: STATUS_LABELS.get(value, value)),
+    'ward': ('student__student_profile__ward', lambda value: value or "No Ward"),
+}
+
+def grouped_application_rows(queryset, group_by, columns=None, chunk_size=2000):
+    """
+    Yields (sheet title, rows) per ``group_by`` value, where rows is an
+    iterator like application_rows(). Still a single streamed query.
+    """
+    if group_by not in EXPORT_SHEET_GROUPS:
+        raise ValueError(f"Unknown sheet grouping: {group_by}")
+    group_lookup, title = EXPORT_SHEET_GROUPS[group_by]
+    lookups, build = _row_builder(columns)
+    values = queryset.order_by(group_lookup, 'pk').values_list(group_lookup, *lookups).iterator(chunk_size=chunk_size)
+    for group, group_values in groupby(values, key=itemgetter(0)):
+        yield title(group), (build(row, offset=1) for row in group_values)
+
+def export_headers(columns=None):
+    return [EXPORT_COLUMNS[column][0] for column in export_columns(columns)]
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+    def write(self, value):
+        return value
+
+def stream_applications_csv(queryset, columns=None):
+    """Yields the CSV export line by line."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(export_headers(columns))
+    for row in application_rows(queryset, columns):
+        yield writer.writerow(row)
+
+def export_applications_csv(queryset, filename="bursary_list", columns=None, cache=None):
+    """
+    Streams the application list as a CSV download. With an ExportCache,
+    the streamed file is also stored for the next identical request.
+    """
+    lines = stream_applications_csv(queryset, columns)
+    if cache is not None:
+        lines = cache.tee(lines)
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(filename, "csv")}"'
     return response
 
+def write_applications_csv(queryset, stream, progress=None, columns=None):
+    """Writes the application list as CSV into any file-like ``stream``."""
+    writer = csv.writer(stream)
+    writer.writerow(export_headers(columns))
+    for row in application_rows(queryset, columns):
+        writer.writerow(row)
+        if progress:
+            progress(1)
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def export_applications_excel(queryset, filename="bursary_list", columns=None, group_by=None, cache=None):
+    """
+    Builds the workbook in a temporary file on disk and streams it back,
+    so neither the cells nor the finished file are held in memory. With an
+    ExportCache, the file is also stored for the next identical request.
+    """
+    handle = tempfile.TemporaryFile()
+    write_applications_excel(queryset, handle, columns=columns, group_by=group_by)
+    if cache is not None:
+        cache.store(handle)
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=export_filename(filename, "xlsx"), content_type=EXCEL_CONTENT_TYPE)
+
+def _sheet_title(name, used):
+    """Excel sheet titles: at most 31 characters, no []:*?/\\ and unique."""
+    title = re.sub(r'[\[\]:*?/\\]', '-', str(name)).strip()[:31] or "Sheet"
+    base, n = title, 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+def write_applications_excel(queryset, stream, progress=None, columns=None, group_by=None):
+    """
+    Saves the application list as an .xlsx workbook into ``stream``.
+
+    Uses openpyxl's write-only mode, which writes each row straight to the
+    sheet's temporary XML file instead of keeping cell objects in memory.
+    ``group_by`` ('status' or 'ward') puts each group on its own sheet.
+    """
+    wb = Workbook(write_only=True)
+    headers = export_headers(columns)
+    if group_by:
+        sheets = grouped_application_rows(queryset, group_by, columns)
+    else:
+        sheets = [("Applications", application_rows(queryset, columns))]
+
+    used = set()
+    for title, rows in sheets:
+        ws = wb.create_sheet(_sheet_title(title, used))
+        ws.append(headers)
+        for row in rows:
+            ws.append(row)
+            if progress:
+                progress(1)
+    if not used:
+        # No rows for a grouped export: still a valid workbook
+        wb.create_sheet("Applications").append(headers)
+    wb.save(stream)
@@ -3,20 +3,45 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.views import LoginView, LogoutView, PasswordChangeView, PasswordChangeDoneView
 from django.contrib import messages
 from django.views.generic import CreateView, TemplateView, ListView, DetailView, UpdateView, View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db import transaction
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, F
 from django.template.loader import render_to_string
-from django.http import HttpResponse
-from .utils import export_applications_csv, export_applications_excel
-
-from .forms import UserRegistrationForm, StudentProfileForm, ApplicationForm, ApplicationDocumentForm, CommitteeReviewForm, UserProfileUpdateForm, TestimonyForm, DevelopmentProjectForm
-from .models import User, StudentProfile, Application, ApplicationDocument, AuditLog, Payment, DevelopmentProject, Testimony, BoardMember, BursaryCycle, DownloadableDocument
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, FileResponse, Http404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from .utils import EXPORT_SHEET_GROUPS, export_applications_csv, export_applications_excel, export_applications_queryset, export_columns, export_filename
+from .reports import export_cycle_report_pdf
+from .artifacts import ExportCache
+from .cycle_stats import cycle_statistics
+from .reporting import dashboard_report
+from .caching import PublicPageCacheMixin, document_etag, document_max_age
+from .pagination import KeysetPaginationMixin
+from .search import search_applications
+from .jobs import enqueue_job
+from .duplicates import duplicate_matches, find_duplicate_clusters
+from .simulation import ScreeningSimulator
+from .allocation import propose_allocation, approve_allocation
+
+from .forms import UserRegistrationForm, StudentProfileForm, ApplicationForm, ApplicationDocumentForm, CommitteeReviewForm, UserProfileUpdateForm, TestimonyForm, DevelopmentProjectForm, ScreeningSimulationForm, AllocationForm, ReconciliationUploadForm
+from .models import User, StudentProfile, Application, ApplicationDocument, AuditLog, Payment, DevelopmentProject, Testimony, BoardMember, BursaryCycle, DownloadableDocument, AllocationRun, BackgroundJob, ReconciliationRun, ReconciliationIssue, CycleStatistics
+import hmac
+import json
+import logging
+import os
+import time
 import uuid
 
-class HomeView(TemplateView):
+logger = logging.getLogger(__name__)
+
+class HomeView(PublicPageCacheMixin, TemplateView):
     template_name = 'bursary/home.html'
+    cache_groups = ('testimonies',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -24,8 +49,9 @@ class HomeView(TemplateView):
         context['testimonies'] = Testimony.objects.select_related('user', 'user__student_profile').order_by('-is_featured', '-created_at')[:6]
         return context
 
-class AboutView(TemplateView):
+class AboutView(PublicPageCacheMixin, TemplateView):
     template_name = 'bursary/about.html'
+    cache_groups = ('board',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -33,18 +59,20 @@ class AboutView(TemplateView):
         context['previous_board'] = BoardMember.objects.filter(status='previous')
         return context
 
-class GalleryView(TemplateView):
+class GalleryView(PublicPageCacheMixin, TemplateView):
     template_name = 'bursary/gallery.html'
+    cache_groups = ('board',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['serving_board'] = BoardMember.objects.filter(status='serving')
         return context
 
-class DownloadsView(ListView):
+class DownloadsView(PublicPageCacheMixin, ListView):
     model = DownloadableDocument
     template_name = 'bursary/downloads.html'
     context_object_name = 'documents'
+    cache_groups = ('downloads',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -57,17 +85,23 @@ class DownloadsView(ListView):
         return context
 
 class DownloadFileView(View):
-    """Increments count and serves file for preview/download."""
+    """
+    Serves a file for preview/download and counts full downloads.
+    Revalidations that still match the ETag or Last-Modified get a 304
+    without the file being opened.
+    """
     def get(self, request, pk, *args, **kwargs):
-        doc = get_object_or_404(DownloadableDocument, pk=pk)
-        doc.download_count += 1
-        doc.save()
-        
-        # Open file and serve
-        file_handle = doc.file.open()
-        response = HttpResponse(file_handle.read(), content_type='application/pdf')
-        # 'inline' allows browser to preview, 'attachment' forces download
-        response['Content-Disposition'] = f'inline; filename="{doc.file.name}"'
+        doc = get_object_or_404(DownloadableDocument.objects.only('file', 'version', 'uploaded_at'), pk=pk)
+        etag = document_etag(doc)
+        last_modified = int(doc.uploaded_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            DownloadableDocument.objects.filter(pk=doc.pk).update(download_count=F('download_count') + 1)
+            # 'inline' allows browser to preview, 'attachment' forces download
+            response = FileResponse(doc.file.open('rb'), content_type='application/pdf', filename=os.path.basename(doc.file.name))
+            response['Last-Modified'] = http_date(last_modified)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=document_max_age())
         return response
 
 class ContactView(TemplateView):
@@ -77,19 +111,26 @@ class ContactView(TemplateView):
         messages.success(request, "Your message has been sent successfully! Our team will get back to you soon.")
         return redirect('contact')
 
-class PublicDisbursementView(TemplateView):
+def financial_history():
+    """Students paid and amount disbursed per academic year, newest first."""
+    return (
+        CycleStatistics.objects
+        .filter(paid_count__gt=0)
+        .values('academic_year', total_students=F('paid_count'), total_disbursed=F('disbursed_total'))
+        .order_by('-academic_year')
+    )
+
+class PublicDisbursementView(PublicPageCacheMixin, TemplateView):
     template_name = 'bursary/public_disbursement.html'
+    cache_groups = ('disbursements',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_constituency_disbursed'] = Payment.objects.aggregate(Sum('amount_awarded'))['amount_awarded__sum'] or 0
-        context['total_students_helped'] = Payment.objects.count()
+        # Lazy, so a cached fragment skips the query
+        stats = SimpleLazyObject(cycle_statistics)
+        context['stats'] = stats
         context['active_cycles'] = BursaryCycle.objects.filter(is_active=True).order_by('-year')
-        history = Application.objects.filter(status='paid').values('academic_year').annotate(
-            total_students=Count('id'),
-            total_disbursed=Sum('payment_record__amount_awarded')
-        ).order_by('-academic_year')
-        context['financial_history'] = history
+        context['financial_history'] = financial_history()
         return context
 
 class RegisterView(CreateView):
@@ -171,15 +212,16 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         user = self.request.user
         if user.role == 'student':
             context['total_awarded'] = Payment.objects.filter(application__student=user).aggregate(Sum('amount_awarded'))['amount_awarded__sum'] or 0
-            context['constituency_total'] = Payment.objects.aggregate(Sum('amount_awarded'))['amount_awarded__sum'] or 0
+            context['constituency_total'] = cycle_statistics().disbursed_total
             context['profile_completion'] = user.profile_completion
             context['my_applications'] = user.applications.all().order_by('-created_at')
         return context
 
-class DevelopmentListView(ListView):
+class DevelopmentListView(PublicPageCacheMixin, ListView):
     model = DevelopmentProject
     template_name = 'bursary/development_list.html'
     context_object_name = 'projects'
+    cache_groups = ('developments',)
 
 class DevelopmentCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = DevelopmentProject
@@ -311,9 +353,11 @@ class EditApplicationView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
         if app_form.is_valid() and doc_form.is_valid():
             try:
                 with transaction.atomic():
-                    application = app_form.save()
+                    # One write for the form changes and the screening outcome
+                    application = app_form.save(commit=False)
                     documents = doc_form.save()
-                    passed, reason = apply_auto_screening(application)
+                    passed, reason = apply_auto_screening(application, commit=False)
+                    application.save()
                     
                     if not passed:
                         messages.warning(request, f"Application updated but failed auto-screening: {reason}")
@@ -342,13 +386,17 @@ class CommitteeDashboardView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return self.request.user.role in ['committee', 'admin'] or self.request.user.is_superuser
 
     def get_queryset(self):
-        return Application.objects.filter(status='pending').order_by('-score', '-created_at')
+        return Application.objects.for_committee().filter(status='pending').order_by('-score', '-created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_apps = Application.objects.all()
-        context['total_apps'] = all_apps.count()
-        context['system_auto_rejected'] = all_apps.filter(status='rejected', admin_comments__icontains='AUTO-REJECTION').count()
+        stats = cycle_statistics()
+        context['total_apps'] = stats.total_applications
+        context['system_auto_rejected'] = stats.auto_rejected_count
+        # Identity collisions across the cycles currently under review
+        clusters = find_duplicate_clusters(self.object_list.order_by().values('academic_year'))
+        context['duplicate_clusters'] = clusters
+        context['flagged_ids'] = {pk for cluster in clusters for pk in cluster.application_ids}
         return context
 
 class ReviewApplicationView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -361,10 +409,14 @@ class ReviewApplicationView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
     def test_func(self):
         return self.request.user.role in ['committee', 'admin'] or self.request.user.is_superuser
 
+    def get_queryset(self):
+        return Application.objects.for_committee()
+
     def form_valid(self, form):
+        previous_status = form.instance.get_original('status')
         form.instance.status = 'recommended'
         messages.success(self.request, "Application reviewed and recommended for approval.")
-        AuditLog.objects.create(user=self.request.user, action=f"Reviewed application ID {form.instance.id}")
+        AuditLog.objects.create(user=self.request.user, action=f"Reviewed application ID {form.instance.id}", details=f"Status: {previous_status} -> recommended")
         return super().form_valid(form)
 
 class StudentApplicationDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
@@ -376,7 +428,15 @@ class StudentApplicationDetailView(LoginRequiredMixin, UserPassesTestMixin, Deta
     def test_func(self):
         return self.request.user.role in ['committee', 'admin'] or self.request.user.is_superuser
 
-class StaffApplicationListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    def get_queryset(self):
+        return Application.objects.for_committee()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['duplicate_matches'] = duplicate_matches(self.object)
+        return context
+
+class StaffApplicationListView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     model = Application
     template_name = 'bursary/staff_application_list.html'
     context_object_name = 'applications'
@@ -387,7 +447,19 @@ class StaffApplicationListView(LoginRequiredMixin, UserPassesTestMixin, ListView
         return self.request.user.role in ['admin', 'committee'] or self.request.user.is_superuser
 
     def get_queryset(self):
-        return Application.objects.select_related('student', 'student__student_profile').all().order_by('-created_at')
+        self.query = self.request.GET.get('q', '').strip()
+        if self.query:
+            return search_applications(self.query, Application.objects.for_committee())
+        return Application.objects.for_committee()
+
+    def get_paginate_by(self, queryset):
+        # Search results are ranked and capped at APPLICATION_SEARCH_LIMIT
+        return None if self.query else self.paginate_by
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
 
 class FinancialHistoryView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     template_name = 'bursary/financial_history.html'
@@ -398,12 +470,8 @@ class FinancialHistoryView(LoginRequiredMixin, UserPassesTestMixin, TemplateView
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        history = Application.objects.filter(status='paid').values('academic_year').annotate(
-            total_students=Count('id'),
-            total_disbursed=Sum('payment_record__amount_awarded')
-        ).order_by('-academic_year')
-        context['financial_history'] = history
-        context['all_payments'] = Payment.objects.all().order_by('-date_paid')
+        context['financial_history'] = financial_history()
+        context['all_payments'] = Payment.objects.for_finance().order_by('-date_paid')
         return context
 
 class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, ListView):
@@ -416,28 +484,33 @@ class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return self.request.user.role == 'admin' or self.request.user.is_superuser
 
     def get_queryset(self):
-        return Application.objects.filter(status='recommended')
+        return Application.objects.for_admin().filter(status='recommended')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_apps = Application.objects.all()
-        context['total_apps'] = all_apps.count()
-        context['total_approved'] = all_apps.filter(status='approved').count()
-        context['total_paid'] = all_apps.filter(status='paid').count()
-        context['total_rejected'] = all_apps.filter(status='rejected').count()
-        context['system_auto_rejected'] = all_apps.filter(status='rejected', admin_comments__icontains='AUTO-REJECTION').count()
-        context['total_budget_used'] = Payment.objects.aggregate(total=Sum('amount_awarded'))['total'] or 0
-        context['avg_score'] = all_apps.aggregate(avg=Avg('score'))['avg'] or 0
+        report = dashboard_report()
+        context['report'] = report
+        context['total_apps'] = report.total
+        context['total_approved'] = report.status_counts['approved']
+        context['total_paid'] = report.status_counts['paid']
+        context['total_rejected'] = report.status_counts['rejected']
+        context['system_auto_rejected'] = report.auto_rejected
+        context['total_budget_used'] = report.amount_disbursed
+        context['avg_score'] = report.average_score
+        context['recent_jobs'] = BackgroundJob.objects.order_by('-created_at')[:5]
         return context
 
-class AuditLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class AuditLogListView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     model = AuditLog
     template_name = 'bursary/audit_logs.html'
     context_object_name = 'logs'
     paginate_by = 20
-    ordering = ['-timestamp']
+    keyset_ordering = ('-timestamp', '-id')
     raise_exception = True
 
+    def get_queryset(self):
+        return AuditLog.objects.select_related('user')
+
     def test_func(self):
         return self.request.user.role == 'admin' or self.request.user.is_superuser
 
@@ -450,94 +523,281 @@ class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_apps = Application.objects.all()
-        context['total_apps'] = all_apps.count()
-        approved_count = all_apps.filter(status__in=['approved', 'paid']).count()
-        context['total_approved'] = approved_count
-        context['total_paid'] = all_apps.filter(status='paid').count()
-        context['total_budget_used'] = Payment.objects.aggregate(total=Sum('amount_awarded'))['total'] or 0
-        context['avg_score'] = all_apps.aggregate(avg=Avg('score'))['avg'] or 0
-        context['approval_rate'] = (approved_count / all_apps.count() * 100) if all_apps.count() > 0 else 0
-        status_counts = {}
-        for status, label in Application.STATUS_CHOICES:
-            status_counts[label] = all_apps.filter(status=status).count()
-        context['status_counts'] = status_counts
-        score_ranges = [0, 0, 0, 0, 0]
-        for app in all_apps:
-            score = app.score
-            if score <= 20: score_ranges[0] += 1
-            elif score <= 40: score_ranges[1] += 1
-            elif score <= 60: score_ranges[2] += 1
-            elif score <= 80: score_ranges[3] += 1
-            else: score_ranges[4] += 1
-        context['score_distribution'] = score_ranges
-        context['recent_payments'] = Payment.objects.select_related('application__student').order_by('-date_paid')[:10]
+        academic_year = self.request.GET.get('academic_year') or None
+        report = dashboard_report(academic_year)
+        context['report'] = report
+        context['academic_year'] = academic_year
+        context['academic_years'] = CycleStatistics.objects.order_by('-academic_year').values_list('academic_year', flat=True)
+        context['total_apps'] = report.total
+        context['total_approved'] = report.approved
+        context['total_paid'] = report.status_counts['paid']
+        context['total_budget_used'] = report.amount_disbursed
+        context['avg_score'] = report.average_score
+        context['approval_rate'] = report.approval_rate
+        context['status_counts'] = report.status_labels
+        context['score_distribution'] = report.score_histogram
+        payments = Payment.objects.for_finance().order_by('-date_paid')
+        if academic_year:
+            payments = payments.filter(application__academic_year=academic_year)
+        context['recent_payments'] = payments[:10]
+        return context
+
+class ScreeningSimulatorView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Read-only what-if comparison of the current screening policy against a candidate."""
+    template_name = 'bursary/screening_simulator.html'
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.role == 'admin' or self.request.user.is_superuser
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ScreeningSimulationForm(self.request.GET or None)
+        context['form'] = form
+        if form.is_valid():
+            simulator = ScreeningSimulator(form.cleaned_data['academic_year'])
+            started = time.perf_counter()
+            try:
+                context['baseline'], context['candidate'] = simulator.run_many([{}, form.overrides()])
+            except ValueError as e:
+                form.add_error(None, str(e))
+                return context
+            context['elapsed_ms'] = (time.perf_counter() - started) * 1000
+            context['base_policy'] = simulator.base_policy.as_params()
+        return context
+
+class AllocationView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Propose budget-constrained awards for a cycle and approve them in bulk."""
+    template_name = 'bursary/allocation.html'
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.role == 'admin' or self.request.user.is_superuser
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('form', AllocationForm())
+        runs = AllocationRun.objects.select_related('cycle', 'created_by').order_by('-created_at')
+        context['runs'] = runs[:10]
+        run_id = self.request.GET.get('run')
+        selected = runs.filter(pk=run_id).first() if run_id else runs.first()
+        if selected:
+            context['selected_run'] = selected
+            context['selected_items'] = selected.items.select_related('application__student')[:100]
+        return context
+
+    def post(self, request, *args, **kwargs):
+        if request.POST.get('action') == 'approve':
+            run = get_object_or_404(AllocationRun, pk=request.POST.get('run'))
+            try:
+                approve_allocation(run, user=request.user)
+                messages.success(request, f"Allocation #{run.pk} approved: KES {run.total_allocated} across {run.funded_count} students.")
+            except ValueError as e:
+                messages.error(request, str(e))
+            return redirect(f"{reverse('budget-allocation')}?run={run.pk}")
+
+        form = AllocationForm(request.POST)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
+        run = propose_allocation(
+            form.cleaned_data['cycle'],
+            strategy=form.cleaned_data['strategy'],
+            tie_break=form.cleaned_data['tie_break'],
+            max_award=form.cleaned_data['max_award'],
+            min_award=form.cleaned_data['min_award'],
+            user=request.user,
+        )
+        AuditLog.objects.create(user=request.user, action=f"Proposed budget allocation #{run.pk} for {run.cycle.year}")
+        messages.success(request, f"Proposed allocation #{run.pk}: {run.funded_count} of {run.candidate_count} recommended applications funded.")
+        return redirect(f"{reverse('budget-allocation')}?run={run.pk}")
+
+class ReconciliationView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'bursary/reconciliation.html'
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.role == 'admin' or self.request.user.is_superuser
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('form', ReconciliationUploadForm())
+        runs = ReconciliationRun.objects.order_by('-created_at')
+        context['runs'] = runs[:10]
+        run_id = self.request.GET.get('run')
+        selected = runs.filter(pk=run_id).first() if run_id else runs.first()
+        if selected:
+            context['selected_run'] = selected
+            issues = selected.issues.select_related('payment__application__student')
+            kind = self.request.GET.get('kind')
+            if kind:
+                issues = issues.filter(kind=kind)
+            context['selected_kind'] = kind
+            context['issue_kinds'] = ReconciliationIssue.KIND_CHOICES
+            context['selected_issues'] = issues[:200]
         return context
 
-class PDFReportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def post(self, request, *args, **kwargs):
+        form = ReconciliationUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
+        run = form.save(commit=False)
+        run.created_by = request.user
+        run.save()
+        job = enqueue_job('reconcile_statement', {'run_id': run.pk}, user=request.user)
+        AuditLog.objects.create(user=request.user, action=f"Uploaded M-Pesa statement for reconciliation #{run.pk}", details=run.statement.name)
+        messages.info(request, f"Reconciliation #{run.pk} queued. Results appear here once job #{job.pk} finishes.")
+        return redirect(f"{reverse('mpesa-reconciliation')}?run={run.pk}")
+
+class BackgroundExportMixin:
+    """
+    Hands large exports to the job queue instead of building them in the
+    request thread. ``?background=1`` forces the queue for any size; views
+    that stream their output set ``background_by_size = False``.
+    """
+    background_by_size = True
+
+    def run_in_background(self, queryset):
+        if self.request.GET.get('background') == '1':
+            return True
+        if not self.background_by_size:
+            return False
+        return queryset.count() > getattr(settings, 'BACKGROUND_EXPORT_THRESHOLD', 2000)
+
+    def export_params(self):
+        """
+        Filters shared by the application exports: ``?academic_year=``,
+        repeated ``?status=`` and ``?columns=key,key`` (EXPORT_COLUMNS keys).
+        """
+        return {
+            'academic_year': self.request.GET.get('academic_year') or None,
+            'statuses': self.request.GET.getlist('status') or None,
+            'columns': [column for column in self.request.GET.get('columns', '').split(',') if column] or None,
+        }
+
+    def enqueue(self, kind, params=None):
+        job = enqueue_job(kind, params, user=self.request.user)
+        messages.info(self.request, f"{job.get_kind_display()} queued. This page updates as it runs.")
+        return redirect('job-status', pk=job.pk)
+
+class PDFReportView(LoginRequiredMixin, UserPassesTestMixin, BackgroundExportMixin, View):
+    """
+    Full cycle report as PDF. Filters: ``?academic_year=``, repeated
+    ``?status=`` (default: every status) and ``?sections=status|ward``.
+    """
     raise_exception = True
     def test_func(self):
         return self.request.user.role == 'admin' or self.request.user.is_superuser
 
     def get(self, request, *args, **kwargs):
-        all_apps = Application.objects.all()
-        total_apps = all_apps.count()
-        total_approved = all_apps.filter(status__in=['approved', 'paid']).count()
-        total_budget_used = Payment.objects.aggregate(total=Sum('amount_awarded'))['total'] or 0
+        params = {
+            'academic_year': request.GET.get('academic_year') or None,
+            'statuses': request.GET.getlist('status') or [status for status, label in Application.STATUS_CHOICES],
+            'group_by': request.GET.get('sections') or None,
+        }
+        if params['group_by'] and params['group_by'] not in EXPORT_SHEET_GROUPS:
+            return HttpResponseBadRequest(f"Unknown report sections: {params['group_by']}")
         try:
-            from fpdf import FPDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", 'B', 16)
-            pdf.cell(190, 10, "Alexia's Global Tech System Report", ln=True, align='C')
-            pdf.ln(10)
-            pdf.set_font("Arial", '', 12)
-            pdf.cell(100, 10, f"Total Applications: {total_apps}")
-            pdf.ln(8)
-            pdf.cell(100, 10, f"Total Approved/Paid: {total_approved}")
-            pdf.ln(8)
-            pdf.cell(100, 10, f"Total Disbursed: KES {total_budget_used}")
-            pdf.ln(15)
-            pdf.set_font("Arial", 'B', 10)
-            pdf.cell(60, 10, "Student", 1)
-            pdf.cell(40, 10, "Year", 1)
-            pdf.cell(40, 10, "Status", 1)
-            pdf.cell(30, 10, "Score", 1)
-            pdf.ln()
-            pdf.set_font("Arial", '', 9)
-            for app in all_apps[:50]:
-                pdf.cell(60, 10, str(app.student.get_full_name())[:30], 1)
-                pdf.cell(40, 10, str(app.academic_year), 1)
-                pdf.cell(40, 10, str(app.get_status_display()), 1)
-                pdf.cell(30, 10, str(app.score), 1)
-                pdf.ln()
-            response = HttpResponse(pdf.output(), content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="alexias_global_tech_report.pdf"'
-            return response
+            queryset = export_applications_queryset(params['academic_year'], params['statuses'])
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        cache = ExportCache('pdf', queryset, params)
+        if cache.artifact:
+            return cache.response(export_filename("alexias_global_tech_report", "pdf"))
+        if self.run_in_background(queryset):
+            return self.enqueue('pdf_report', params)
+        try:
+            return export_cycle_report_pdf(queryset, params, cache=cache)
         except Exception as e:
             return HttpResponse(f"Error generating PDF: {e}", status=500)
 
-class ExportApplicationsView(LoginRequiredMixin, UserPassesTestMixin, View):
+class ExportApplicationsView(LoginRequiredMixin, UserPassesTestMixin, BackgroundExportMixin, View):
+    """Streams the application list as CSV (filters: see export_params)."""
     raise_exception = True
+    # Streaming keeps memory flat, so size alone never needs the job queue
+    background_by_size = False
+
     def test_func(self):
         return self.request.user.role == 'admin' or self.request.user.is_superuser
 
     def get(self, request, *args, **kwargs):
-        queryset = Application.objects.filter(status__in=['recommended', 'approved', 'paid'])
+        params = self.export_params()
+        try:
+            queryset = export_applications_queryset(params['academic_year'], params['statuses'])
+            export_columns(params['columns'])
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
         AuditLog.objects.create(user=request.user, action="Exported Application List (CSV)")
-        return export_applications_csv(queryset)
-
-class ExportApplicationsExcelView(LoginRequiredMixin, UserPassesTestMixin, View):
+        cache = ExportCache('csv', queryset, params)
+        if cache.artifact:
+            return cache.response(export_filename("bursary_list", "csv"))
+        if self.run_in_background(queryset):
+            return self.enqueue('export_csv', params)
+        return export_applications_csv(queryset, columns=params['columns'], cache=cache)
+
+class ExportApplicationsExcelView(LoginRequiredMixin, UserPassesTestMixin, BackgroundExportMixin, View):
+    """
+    Exports the application list as .xlsx (filters: see export_params).
+    ``?sheets=status`` or ``?sheets=ward`` splits it into one sheet per group.
+    """
     raise_exception = True
     def test_func(self):
         return self.request.user.role == 'admin' or self.request.user.is_superuser
 
     def get(self, request, *args, **kwargs):
-        queryset = Application.objects.filter(status__in=['recommended', 'approved', 'paid'])
+        params = self.export_params()
+        params['group_by'] = request.GET.get('sheets') or None
+        if params['group_by'] and params['group_by'] not in EXPORT_SHEET_GROUPS:
+            return HttpResponseBadRequest(f"Unknown sheet grouping: {params['group_by']}")
+        try:
+            queryset = export_applications_queryset(params['academic_year'], params['statuses'])
+            export_columns(params['columns'])
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
         AuditLog.objects.create(user=request.user, action="Exported Application List (Excel)")
-        return export_applications_excel(queryset)
+        cache = ExportCache('xlsx', queryset, params)
+        if cache.artifact:
+            return cache.response(export_filename("bursary_list", "xlsx"))
+        if self.run_in_background(queryset):
+            return self.enqueue('export_excel', params)
+        return export_applications_excel(queryset, columns=params['columns'], group_by=params['group_by'], cache=cache)
+
+class JobAccessMixin(LoginRequiredMixin, UserPassesTestMixin):
+    raise_exception = True
+    def test_func(self):
+        return self.request.user.role == 'admin' or self.request.user.is_superuser
+
+class JobStatusView(JobAccessMixin, DetailView):
+    model = BackgroundJob
+    template_name = 'bursary/job_status.html'
+    context_object_name = 'job'
+
+class JobStatusJSONView(JobAccessMixin, View):
+    """Polled by the job status page."""
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(BackgroundJob, pk=pk)
+        return JsonResponse({
+            'id': job.pk,
+            'kind': job.kind,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'progress_done': job.progress_done,
+            'progress_total': job.progress_total,
+            'percent': job.percent,
+            'finished': job.is_finished,
+            'result': job.result,
+            'error': job.error,
+            'download_url': reverse('job-download', args=[job.pk]) if job.result_file else None,
+        })
 
-from .mpesa import process_bursary_disbursement
+class JobDownloadView(JobAccessMixin, View):
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(BackgroundJob, pk=pk, status='succeeded')
+        if not job.result_file:
+            raise Http404("This job did not produce a file.")
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=os.path.basename(job.result_file.name))
+
+from .mpesa import parse_b2c_result, process_bursary_disbursement
+from .disbursement import settle_b2c_result
 
 class DisburseFundsView(LoginRequiredMixin, UserPassesTestMixin, View):
     raise_exception = True
@@ -550,21 +810,50 @@ class DisburseFundsView(LoginRequiredMixin, UserPassesTestMixin, View):
             messages.warning(request, "Funds have already been disbursed for this application.")
             return redirect('admin-dashboard')
         if application.status == 'recommended':
-            with transaction.atomic():
-                application.status = 'approved'
-                application.save()
-                success, result = process_bursary_disbursement(application)
-                if success:
-                    application.status = 'paid'
-                    application.save()
-                    AuditLog.objects.create(user=request.user, action=f"Disbursed funds (M-Pesa) for App ID {application.id}")
-                    messages.success(request, f"Funds successfully disbursed to {application.student.get_full_name()} via M-Pesa. Ref: {result}")
-                else:
-                    messages.error(request, f"M-Pesa Disbursement failed: {result}")
+            # The application is claimed before B2C is called and marked
+            # paid with its Payment; a refused payment releases it for retry
+            success, result = process_bursary_disbursement(application, user=request.user)
+            if success and Payment.objects.filter(application=application).exists():
+                messages.success(request, f"Funds successfully disbursed to {application.student.get_full_name()} via M-Pesa. Ref: {result}")
+            elif success:
+                messages.info(request, f"M-Pesa accepted the payment to {application.student.get_full_name()}. It is recorded once M-Pesa confirms it. Ref: {result}")
+            else:
+                messages.error(request, f"M-Pesa Disbursement failed: {result}")
         else:
             messages.warning(request, "This application is not ready for disbursement.")
         return redirect('admin-dashboard')
 
+@method_decorator(csrf_exempt, name='dispatch')
+class MpesaB2CResultView(View):
+    """
+    ResultURL of B2C payment requests (MPESA_RESULT_URL). Daraja posts the
+    outcome of every accepted request here; the claim it answers is looked
+    up by OriginatorConversationID.
+
+    Daraja does not sign callbacks, so the caller is verified before any
+    state changes: the URL carries MPESA_RESULT_TOKEN (nothing is accepted
+    while it is unset) and, when MPESA_CALLBACK_ALLOWED_IPS is set, the
+    request must come from one of those addresses.
+    """
+    def caller_verified(self, request, token):
+        expected = getattr(settings, 'MPESA_RESULT_TOKEN', '')
+        if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+            return False
+        allowed = getattr(settings, 'MPESA_CALLBACK_ALLOWED_IPS', [])
+        return not allowed or request.META.get('REMOTE_ADDR') in allowed
+
+    def post(self, request, token, *args, **kwargs):
+        if not self.caller_verified(request, token):
+            logger.warning(f"Rejected M-PESA B2C result from {request.META.get('REMOTE_ADDR')}")
+            return JsonResponse({'ResultCode': 1, 'ResultDesc': 'Forbidden'}, status=403)
+        try:
+            result = parse_b2c_result(json.loads(request.body))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JsonResponse({'ResultCode': 1, 'ResultDesc': 'Malformed result'}, status=400)
+        if settle_b2c_result(result) is None:
+            logger.warning(f"M-PESA B2C result for unknown or settled payment {result['originator_conversation_id']}")
+        return JsonResponse({'ResultCode': 0, 'ResultDesc': 'Accepted'})
+
 class BulkDisburseView(LoginRequiredMixin, UserPassesTestMixin, View):
     raise_exception = True
     def test_func(self):
@@ -575,32 +864,10 @@ class BulkDisburseView(LoginRequiredMixin, UserPassesTestMixin, View):
         if not application_ids:
             messages.warning(request, "No applications selected for disbursement.")
             return redirect('admin-dashboard')
-        success_count = 0
-        fail_count = 0
-        for app_id in application_ids:
-            application = get_object_or_404(Application, pk=app_id)
-            if hasattr(application, 'payment_record') or application.status != 'recommended':
-                fail_count += 1
-                continue
-            try:
-                with transaction.atomic():
-                    application.status = 'approved'
-                    application.save()
-                    success, result = process_bursary_disbursement(application)
-                    if success:
-                        application.status = 'paid'
-                        application.save()
-                        AuditLog.objects.create(user=request.user, action=f"Bulk Disbursed (M-Pesa) for App ID {application.id}")
-                        success_count += 1
-                    else:
-                        fail_count += 1
-            except Exception:
-                fail_count += 1
-        if success_count > 0:
-            messages.success(request, f"Successfully disbursed funds to {success_count} students.")
-        if fail_count > 0:
-            messages.error(request, f"Failed to disburse to {fail_count} applications. They may have already been paid.")
-        return redirect('admin-dashboard')
+        job = enqueue_job('bulk_disburse', {'application_ids': [int(pk) for pk in application_ids if pk.isdigit()]}, user=request.user)
+        AuditLog.objects.create(user=request.user, action=f"Queued bulk disbursement job #{job.pk}", details=f"{len(application_ids)} applications selected")
+        messages.info(request, f"Disbursement to {len(application_ids)} applications queued. This page updates as payments complete.")
+        return redirect('job-status', pk=job.pk)
 
 class DownloadAwardLetterView(LoginRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
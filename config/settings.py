@@ -88,6 +88,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Public page invalidation and ETags rely on every worker process seeing
+# the same generation tokens, so the default is shared between processes.
+# Across several hosts use a cache server (Redis, Memcached). With a
+# per-process backend (LocMemCache) public page caching turns itself off.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -149,3 +164,77 @@ LOGIN_REDIRECT_URL = 'home'
 # Email Backend for Development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'support@alexiasglobaltech.org'
+
+# Screening: seconds a cached policy version token is trusted before re-checking the database
+SCREENING_POLICY_VERSION_TTL = 60
+
+# M-Pesa B2C bulk disbursement: concurrent calls and requests per second
+MPESA_B2C_MAX_WORKERS = 8
+MPESA_B2C_RATE_LIMIT = 20
+
+# Background jobs (run with `manage.py run_jobs`)
+BACKGROUND_EXPORT_THRESHOLD = 2000
+BACKGROUND_JOB_STALE_AFTER = 300
+# Seconds between heartbeats of a running job; keep well under BACKGROUND_JOB_STALE_AFTER
+BACKGROUND_JOB_HEARTBEAT_INTERVAL = 60
+BACKGROUND_JOB_MAX_ATTEMPTS = 3
+BACKGROUND_JOB_PROGRESS_INTERVAL = 1.0
+
+# M-Pesa statement reconciliation: CSV columns holding the receipt number and the amount paid out
+MPESA_STATEMENT_REFERENCE_COLUMN = 'Receipt No.'
+MPESA_STATEMENT_AMOUNT_COLUMN = 'Withdrawn'
+
+# M-Pesa Daraja API. MPESA_CLIENT = 'daraja' switches disbursements from the mock client to the real API.
+MPESA_CLIENT = 'mock'
+MPESA_BASE_URL = 'https://sandbox.safaricom.co.ke'
+MPESA_CONSUMER_KEY = ''
+MPESA_CONSUMER_SECRET = ''
+MPESA_SHORTCODE = ''
+MPESA_INITIATOR_NAME = ''
+MPESA_SECURITY_CREDENTIAL = ''
+# Public URL of the mpesa-b2c-result view including the secret token,
+# e.g. https://bursary.example.org/mpesa/b2c/result/<MPESA_RESULT_TOKEN>/
+MPESA_RESULT_URL = ''
+# Secret path token the result view requires (results are refused while blank)
+MPESA_RESULT_TOKEN = ''
+# Addresses Daraja calls back from; empty accepts any address with the token
+MPESA_CALLBACK_ALLOWED_IPS = []
+MPESA_TIMEOUT_URL = ''
+MPESA_HTTP_TIMEOUT = 30
+
+# Notification outbox (delivered by `manage.py dispatch_notifications`)
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_STALE_AFTER = 300
+
+# SMS gateway backend and how many messages the provider accepts per request
+SMS_BACKEND = 'bursary.sms.LogSMSBackend'
+SMS_BATCH_SIZE = 100
+
+# Cycle-wide notifications: emails per SMTP batch and SMS handed to the gateway at once
+MASS_NOTIFICATION_BATCH_SIZE = 500
+
+# Cached export files: evicted when unused for EXPORT_ARTIFACT_MAX_AGE seconds or, least recently used first, above EXPORT_ARTIFACT_MAX_BYTES in total
+EXPORT_ARTIFACT_MAX_AGE = 86400
+EXPORT_ARTIFACT_MAX_BYTES = 500 * 1024 * 1024
+
+# Upper edges of the score histogram on the reports page (the last bucket is open-ended).
+# The default matches CycleStatistics, so the page is served from the precomputed counters.
+REPORT_SCORE_EDGES = (20, 40, 60, 80)
+
+# Public pages (home, about, gallery, downloads, developments, disbursements): cache alias for
+# whole pages and fragments, and seconds before content not covered by invalidation signals refreshes
+PUBLIC_PAGE_CACHE_ALIAS = 'default'
+PUBLIC_PAGE_CACHE_TIMEOUT = 600
+
+# Browser/proxy freshness (Cache-Control max-age, in seconds) of anonymous public pages and of
+# downloadable documents; both then revalidate with their ETag and get 304 when unchanged
+PUBLIC_PAGE_MAX_AGE = 60
+PUBLIC_DOCUMENT_MAX_AGE = 3600
+
+# EXPLAIN snapshots of the registered views, one JSON file per database vendor
+# (manage.py explain_views --update writes them, --check compares against them in CI)
+QUERY_PLAN_SNAPSHOT_DIR = BASE_DIR / 'bursary' / 'plan_snapshots'
+
+# Most results the staff application search returns, best match first
+APPLICATION_SEARCH_LIMIT = 100